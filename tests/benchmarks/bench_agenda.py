@@ -0,0 +1,255 @@
+# -*- coding:utf8 -*-
+"""
+Benchmark the agenda queries, pagination, template rendering and the
+occurrence detail route of an EventIndex at realistic data sizes.
+
+    python -m tests.benchmarks.bench_agenda [--occurrences 10000 100000 1000000]
+        [--events 200] [--repeat 3] [--output results.json]
+
+A test database is created and destroyed for each number of occurrences.
+The wall time & query count of each case are written as JSON, so runs can be
+compared, and the query counts are checked against QUERY_BUDGETS, which
+don't depend on the number of occurrences: exceeding one, e.g. because of an
+N+1 query, makes the benchmark fail.
+"""
+
+from __future__ import unicode_literals
+
+import argparse
+import json
+import os
+import platform
+import sys
+from datetime import timedelta
+from timeit import default_timer
+
+import django
+
+#: Maximum number of queries of each case, the agenda pages list 10 occurrences.
+#: Slices & pages run a query checking for recurring rows, then fetch the concrete rows with a LIMIT.
+#: Calendars count their days, then read the ids of the first occurrences of each day & fetch them.
+QUERY_BUDGETS = {
+    'children:day': 2,
+    'children:week': 2,
+    'children:month': 2,
+    'children:year': 2,
+    'children:calendar': 3,
+    'context:day': 2,
+    'context:week': 2,
+    'context:month': 2,
+    'context:year': 2,
+    'context:calendar': 3,
+    'page:first': 2,
+    'page:middle': 2,
+    'page:last': 2,
+    'render:year': 7,
+    'render:calendar': 7,
+    'detail': 3,
+}
+
+#: Number of occurrences inserted at a time.
+BATCH_SIZE = 5000
+
+
+def create_data(occurrences, events):
+    """
+    Create an EventIndex with EventDetail pages and their occurrences, spread
+    over the two years around now.
+
+    :param occurrences: total number of occurrences
+    :param events: number of EventDetail pages
+    :return: EventIndex instance
+    """
+    from django.utils import timezone
+    from wagtail_factories import SiteFactory
+
+    from tests import factories
+    from wagtail_events.models import EventOccurrence
+
+    index = factories.EventIndexFactory.create(parent=None, paginate_by=10)
+    SiteFactory.create(root_page=index)
+    details = [
+        factories.EventDetailFactory.create(parent=index, show_in_menus=True)
+        for i in range(events)
+    ]
+
+    start = timezone.now() - timedelta(days=365)
+    step = timedelta(days=730) / occurrences
+    for first in range(0, occurrences, BATCH_SIZE):
+        EventOccurrence.objects.bulk_create([
+            EventOccurrence(
+                event=details[i % events],
+                title='Occurrence {}'.format(i),
+                start_date=start + step * i,
+                end_date=start + step * i + timedelta(hours=2),
+                body='<p>Occurrence {} information.</p>'.format(i),
+                index_page_id=index.pk,
+                live=True,
+                show_in_menus=True,
+            )
+            for i in range(first, min(first + BATCH_SIZE, occurrences))
+        ])
+    return index
+
+
+def measure(function, repeat):
+    """
+    Call a function several times.
+
+    :param function: callable
+    :param repeat: number of calls
+    :return: dict of the fastest wall time in seconds & the queries run by
+        the last call
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    # Warm the site root paths & other process caches.
+    function()
+    times = []
+    for i in range(repeat):
+        with CaptureQueriesContext(connection) as queries:
+            start = default_timer()
+            function()
+            times.append(default_timer() - start)
+    return {'seconds': min(times), 'queries': len(queries)}
+
+
+def get_cases(index):
+    """
+    Get the cases to measure.
+
+    :param index: EventIndex instance
+    :return: list of (name, callable) tuples
+    """
+    from django.test import RequestFactory
+
+    from wagtail_events.models import EventOccurrence
+
+    def get_request(**params):
+        request = RequestFactory().get('', params)
+        request.is_preview = False
+        return request
+
+    def children(scope):
+        def function():
+            agenda = index._get_children(get_request(scope=scope))
+            return list(agenda['weeks'] if 'weeks' in agenda else agenda['items'][:10])
+        return function
+
+    def context(**params):
+        def function():
+            children = index.get_context(get_request(**params))['children']
+            if 'weeks' in children:
+                items = [item for week in children['weeks'] for day in week for item in day['items']]
+            else:
+                items = children['items']
+            return [occurrence.url for occurrence in items]
+        return function
+
+    def render(scope):
+        return lambda: index.serve(get_request(scope=scope)).render()
+
+    year = index.get_context(get_request(scope='year'))['paginator']
+    occurrence = EventOccurrence.objects.filter(event__isnull=False).order_by('pk').first()
+    detail = occurrence.event
+
+    cases = []
+    for scope in sorted(index.time_periods.keys()):
+        cases.append(('children:{}'.format(scope), children(scope)))
+        cases.append(('context:{}'.format(scope), context(scope=scope)))
+    cases.extend([
+        ('page:first', context(scope='year', page=1)),
+        ('page:middle', context(scope='year', page=max(year.num_pages // 2, 1))),
+        ('page:last', context(scope='year', page=year.num_pages)),
+        ('render:year', render('year')),
+        ('render:calendar', render('calendar')),
+        ('detail', lambda: detail.event_view(get_request(), pk=occurrence.pk).render()),
+    ])
+    return cases
+
+
+def run(occurrences, events, repeat):
+    """
+    Measure every case with a new test database.
+
+    :return: dict of case names to measurements
+    """
+    from django.db import connection
+
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        start = default_timer()
+        index = create_data(occurrences, events)
+        sys.stdout.write('{:,} occurrences created in {:.1f}s\n'.format(occurrences, default_timer() - start))
+
+        results = {}
+        for name, function in get_cases(index):
+            results[name] = measure(function, repeat)
+            sys.stdout.write('{:<20}{:>10.2f}ms{:>6} queries\n'.format(
+                name,
+                results[name]['seconds'] * 1000,
+                results[name]['queries'],
+            ))
+        return results
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def check_budgets(results):
+    """
+    Find the cases running more queries than their budget.
+
+    :param results: dict of occurrence counts to measurements
+    :return: list of error messages
+    """
+    errors = []
+    for occurrences, cases in sorted(results.items()):
+        for name, result in sorted(cases.items()):
+            if result['queries'] > QUERY_BUDGETS[name]:
+                errors.append('{} with {:,} occurrences: {} queries, the budget is {}'.format(
+                    name,
+                    occurrences,
+                    result['queries'],
+                    QUERY_BUDGETS[name],
+                ))
+    return errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the EventIndex agendas.')
+    parser.add_argument('--occurrences', type=int, nargs='+', default=[10000])
+    parser.add_argument('--events', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='Path of the JSON results file.')
+    options = parser.parse_args(argv)
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tests.settings')
+    django.setup()
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    results = dict(
+        (occurrences, run(occurrences, options.events, options.repeat))
+        for occurrences in options.occurrences
+    )
+
+    if options.output:
+        with open(options.output, 'w') as output:
+            json.dump({
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'events': options.events,
+                'repeat': options.repeat,
+                'results': dict(('{}'.format(key), value) for key, value in results.items()),
+            }, output, indent=2, sort_keys=True)
+
+    errors = check_budgets(results)
+    assert not errors, 'Query budgets exceeded:\n' + '\n'.join(errors)
+
+
+if __name__ == '__main__':
+    main()
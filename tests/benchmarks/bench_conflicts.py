@@ -0,0 +1,63 @@
+# -*- coding:utf8 -*-
+"""
+Benchmark finding the overlapping occurrences of a calendar with the sweep
+of wagtail_events.conflicts, and by comparing every pair of occurrences.
+
+    python -m tests.benchmarks.bench_conflicts [occurrences] [pairwise occurrences]
+
+The pairwise comparison is quadratic, so it's only run on the first
+occurrences of the calendar.
+"""
+
+from __future__ import unicode_literals
+
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from wagtail_events.conflicts import Interval, find_conflicts
+
+
+def get_intervals(count, seed=0):
+    """Occurrences of a few hours spread over a year, a few of them overlapping."""
+    rng = random.Random(seed)
+    start = datetime(2026, 1, 1)
+    intervals = []
+    for pk in range(count):
+        day = start + timedelta(minutes=rng.randrange(365 * 24 * 60))
+        intervals.append(Interval(day, day + timedelta(minutes=rng.randint(30, 180)), pk, pk % 500))
+    return intervals
+
+
+def find_pairwise(intervals):
+    """Compare every pair of intervals."""
+    conflicts = []
+    for position, first in enumerate(intervals):
+        for second in intervals[position + 1:]:
+            if first.start < second.end and second.start < first.end or first.start == second.start:
+                conflicts.append((first, second))
+    return conflicts
+
+
+def main(count=100000, pairwise_count=2000):
+    intervals = get_intervals(count)
+    sample = intervals[:pairwise_count]
+    assert len(find_conflicts(sample)) == len(find_pairwise(sample))
+
+    results = []
+    for name, function, values in (
+        ('sweep', find_conflicts, intervals),
+        ('sweep (sample)', find_conflicts, sample),
+        ('pairwise (sample)', find_pairwise, sample),
+    ):
+        started = time.time()
+        conflicts = function(values)
+        results.append((name, len(values), len(conflicts), time.time() - started))
+
+    for name, size, found, seconds in results:
+        sys.stdout.write('{:<20}{:>8} occurrences{:>8} conflicts{:>10.3f} s\n'.format(name, size, found, seconds))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,98 @@
+# -*- coding:utf8 -*-
+"""
+Benchmark the memory used and bytes read by the year agenda listing, with
+every occurrence field fetched and with the listing fields only.
+
+    python -m tests.benchmarks.bench_listing [occurrences] [body length]
+
+A test database is created and destroyed.
+"""
+
+from __future__ import unicode_literals
+
+import os
+import sys
+from datetime import timedelta
+
+import django
+
+try:
+    import tracemalloc
+except ImportError:
+    # Python 2, only the bytes read are measured.
+    tracemalloc = None
+
+
+def measure(queryset):
+    """
+    Evaluate a queryset.
+
+    :return: tuple of bytes read & peak memory allocated in bytes, or None
+    """
+    from django.db import connection
+
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        read = sum(len('{}'.format(value).encode('utf-8')) for row in cursor.fetchall() for value in row)
+
+    peak = None
+    if tracemalloc is not None:
+        tracemalloc.start()
+        list(queryset._clone())
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return read, peak
+
+
+def main(occurrences=2000, body_length=20000):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tests.settings')
+    django.setup()
+
+    from django.db import connection
+    from django.test import RequestFactory
+    from django.test.utils import setup_test_environment
+    from django.utils import timezone
+
+    from tests import factories
+    from wagtail_events.models import EventOccurrence
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        index = factories.EventIndexFactory.create(parent=None)
+        detail = factories.EventDetailFactory.create(parent=index, show_in_menus=True)
+        now = timezone.now()
+        body = '<p>{}</p>'.format('x' * body_length)
+        EventOccurrence.objects.bulk_create([
+            EventOccurrence(
+                event=detail,
+                title='Occurrence {}'.format(i),
+                start_date=now + timedelta(minutes=i),
+                body=body,
+                index_page_id=index.pk,
+                live=True,
+                show_in_menus=True,
+            )
+            for i in range(occurrences)
+        ])
+
+        request = RequestFactory().get('', {'scope': 'year'})
+        request.is_preview = False
+        results = [
+            ('all fields', index.get_agenda(request)['items']),
+            ('listing fields', index.get_listing_agenda(request)['items']),
+        ]
+        for name, queryset in results:
+            read, peak = measure(queryset)
+            sys.stdout.write('{:<16}{:>14,} bytes read {:>18} peak memory\n'.format(
+                name,
+                read,
+                '{:,} bytes'.format(peak) if peak is not None else 'n/a',
+            ))
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
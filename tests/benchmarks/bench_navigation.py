@@ -0,0 +1,67 @@
+# -*- coding:utf8 -*-
+"""
+Benchmark rendering the agenda links with the template tags reading the
+request querystring, and with an AgendaNavigation.
+
+    python -m tests.benchmarks.bench_navigation [renders]
+"""
+
+from __future__ import unicode_literals
+
+import os
+import sys
+import timeit
+from datetime import datetime
+
+import django
+
+# The links of a typical agenda page: scope tabs, previous & next periods
+# and pagination, some of them rendered twice, above & below the listing.
+TEMPLATE = '{% load wagtail_events_tags %}' + ''.join([
+    '<a href="{% patch_scope "day" %}"></a>'
+    '<a href="{% patch_scope "week" %}"></a>'
+    '<a href="{% patch_scope "month" %}"></a>'
+    '<a href="{% patch_scope "year" %}"></a>'
+    '<a href="{% patch_scope "calendar" %}"></a>'
+    '<a href="{% patch_start_date previous_date %}"></a>'
+    '<a href="{% patch_start_date next_date %}"></a>'
+    '<a href="?{% querystring "page" page=1 %}"></a>'
+    '<a href="?{% querystring "page" page=3 %}"></a>'
+    '<a href="?{% querystring "page" page=4 %}"></a>'
+] * 4)
+
+
+def main(number=2000):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tests.settings')
+    django.setup()
+
+    from django.template import Context, Template
+    from django.test import RequestFactory
+
+    from wagtail_events.navigation import AgendaNavigation
+
+    request = RequestFactory().get('', {'scope': 'week', 'start_date': '2026.01.12', 'page': '2'})
+    agenda = {'previous_date': datetime(2026, 1, 5), 'next_date': datetime(2026, 1, 19)}
+    scopes = ['calendar', 'day', 'month', 'week', 'year']
+    template = Template(TEMPLATE)
+
+    def render(navigation=None):
+        context = dict(agenda, request=request, navigation=navigation)
+        return template.render(Context(context))
+
+    assert render() == render(AgendaNavigation(request, agenda, scopes))
+
+    results = [
+        ('template tags', timeit.timeit(render, number=number)),
+        ('navigation', timeit.timeit(
+            # The navigation is built once for each page rendered.
+            lambda: render(AgendaNavigation(request, agenda, scopes)),
+            number=number,
+        )),
+    ]
+    for name, seconds in results:
+        sys.stdout.write('{:<16}{:>10.1f} us/render\n'.format(name, seconds / number * 1e6))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
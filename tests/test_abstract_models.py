@@ -65,3 +65,17 @@ class TestAbstractEventOccurrence(TestCase):
         self.assertIsInstance(field, models.DateTimeField)
         self.assertTrue(field.blank)
         self.assertTrue(field.null)
+
+    def test_recurrence(self):
+        """Test the AbstractEventOccurrence.recurrence field."""
+        field = self.model._meta.get_field('recurrence')
+        self.assertIsInstance(field, models.TextField)
+        self.assertTrue(field.blank)
+        self.assertFalse(field.null)
+
+    def test_recurrence_id(self):
+        """Test the AbstractEventOccurrence.recurrence_id field."""
+        field = self.model._meta.get_field('recurrence_id')
+        self.assertIsInstance(field, models.DateTimeField)
+        self.assertTrue(field.blank)
+        self.assertTrue(field.null)
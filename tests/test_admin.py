@@ -0,0 +1,73 @@
+# -*- coding:utf8 -*-
+
+from __future__ import unicode_literals
+
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from tests import factories
+from wagtail_events.admin import EventOccurrenceAdmin, EventOccurrenceFormMixin, RescheduleForm
+from wagtail_events.models import EventOccurrence
+
+
+class TestEventOccurrenceAdmin(TestCase):
+    """Tests for the admin listing of detached occurrences."""
+    def test_listing(self):
+        """The listing should be paginated & searchable."""
+        self.assertEqual(EventOccurrenceAdmin.model, EventOccurrence)
+        self.assertEqual(EventOccurrenceAdmin.list_per_page, 50)
+        self.assertIn('event__title', EventOccurrenceAdmin.search_fields)
+
+    def test_form(self):
+        """The form should include the occurrence panels & the EventDetail."""
+        view = EventOccurrenceFormMixin()
+        view.model = EventOccurrence
+        form_class = view.get_edit_handler_class().get_form_class(EventOccurrence)
+
+        self.assertEqual(
+            list(form_class.base_fields),
+            ['event', 'title', 'start_date', 'end_date', 'recurrence', 'recurrence_id', 'body'],
+        )
+
+
+@override_settings(WAGTAIL_EVENTS_DETACHED_OCCURRENCES=True)
+class TestRescheduleForm(TestCase):
+    """Tests for the form rescheduling the occurrences of an event."""
+    def setUp(self):
+        self.detail = factories.EventDetailFactory.create(parent=None)
+        self.start = timezone.now().replace(microsecond=0)
+        for day in range(3):
+            factories.EventOccurrenceFactory.create(event=self.detail, start_date=self.start + timedelta(days=day))
+
+    def get_form(self, **data):
+        """Build a bound form for occurrences starting from tomorrow."""
+        data.setdefault('start_date', timezone.localtime(self.start + timedelta(days=1)).strftime('%Y-%m-%d %H:%M'))
+        return RescheduleForm(data)
+
+    def test_shift(self):
+        """The occurrences within the range should be moved."""
+        form = self.get_form(action='shift', days=7, hours=1)
+
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.save(self.detail), 2)
+        self.assertEqual(
+            list(self.detail.events.order_by('start_date').values_list('start_date', flat=True)),
+            [self.start, self.start + timedelta(days=8, hours=1), self.start + timedelta(days=9, hours=1)],
+        )
+
+    def test_delete(self):
+        """The occurrences within the range should be deleted."""
+        form = self.get_form(action='delete', days='')
+
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.save(self.detail), 2)
+        self.assertEqual(self.detail.events.count(), 1)
+
+    def test_offset_required(self):
+        """Moving the occurrences should require an offset."""
+        form = self.get_form(action='shift', days=0, hours=0)
+
+        self.assertFalse(form.is_valid())
+        self.assertIn('days', form.errors)
@@ -0,0 +1,133 @@
+# -*- coding:utf8 -*-
+
+from __future__ import unicode_literals
+
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from tests import factories
+from wagtail_events import cache
+from wagtail_events.cache import AgendaCache
+
+
+class TestVersions(TestCase):
+    """Tests for the cache version counters."""
+    def setUp(self):
+        cache.get_cache().clear()
+
+    def test_get_version(self):
+        """get_version should return the same value until it's bumped."""
+        version = cache.get_version('foo')
+
+        self.assertEqual(cache.get_version('foo'), version)
+        self.assertEqual(cache.bump_version('foo'), version + 1)
+        self.assertEqual(cache.get_version('foo'), version + 1)
+
+    def test_bump_missing_version(self):
+        """Bumping a version that doesn't exist should create it."""
+        version = cache.bump_version('bar')
+
+        self.assertEqual(cache.get_version('bar'), version)
+
+    def test_index_version(self):
+        """Index versions should be independent of each other."""
+        version = cache.get_index_version(1)
+        cache.bump_index_version(2)
+
+        self.assertEqual(cache.get_index_version(1), version)
+
+
+@override_settings(WAGTAIL_EVENTS_AGENDA_CACHE=True)
+class TestAgendaCache(TestCase):
+    """Tests for the EventIndex agenda cache."""
+    def setUp(self):
+        cache.get_cache().clear()
+        self.index = factories.EventIndexFactory.create(parent=None)
+        self.detail = factories.EventDetailFactory.create(
+            parent=self.index,
+            show_in_menus=True,
+        )
+        self.instance = factories.EventOccurrenceFactory.create(
+            event=self.detail,
+            start_date=timezone.now(),
+        )
+
+    def get_request(self, **params):
+        """Create a request to the index page."""
+        request = RequestFactory().get('', params)
+        request.is_preview = False
+        return request
+
+    def test_get_agenda_cache(self):
+        """get_agenda_cache should return an AgendaCache instance."""
+        self.assertIsInstance(self.index.get_agenda_cache(), AgendaCache)
+
+        with self.settings(WAGTAIL_EVENTS_AGENDA_CACHE=False):
+            self.assertIsNone(self.index.get_agenda_cache())
+
+    def test_cached(self):
+        """The second request for an agenda should not query the database."""
+        response = self.index._get_children(self.get_request(scope='month'))
+        self.assertEqual(response['items'], [self.instance])
+
+        with self.assertNumQueries(0):
+            response = self.index._get_children(self.get_request(scope='month'))
+        self.assertEqual(response['items'], [self.instance])
+        self.assertEqual(response['scope'], 'Month')
+
+    def test_max_items(self):
+        """Agendas with more items than max_items should not be cached."""
+        factories.EventOccurrenceFactory.create(event=self.detail, start_date=timezone.now())
+
+        with self.settings(WAGTAIL_EVENTS_AGENDA_CACHE_MAX_ITEMS=1):
+            response = self.index._get_children(self.get_request(scope='month'))
+            self.assertNotIsInstance(response['items'], list)
+            # The agenda isn't evaluated again to find out it's too large.
+            with self.assertNumQueries(0):
+                response = self.index._get_children(self.get_request(scope='month'))
+            self.assertNotIsInstance(response['items'], list)
+        self.assertEqual(len(response['items']), 2)
+
+    def test_keyed_by_scope(self):
+        """Different scopes should be cached separately."""
+        response = self.index._get_children(self.get_request(scope='month'))
+        self.assertEqual(response['scope'], 'Month')
+
+        response = self.index._get_children(self.get_request(scope='year'))
+        self.assertEqual(response['scope'], 'Year')
+
+    def test_preview(self):
+        """Previews should bypass the cache."""
+        self.index._get_children(self.get_request(scope='month'))
+        request = self.get_request(scope='month')
+        request.is_preview = True
+
+        response = self.index._get_children(request)
+        self.assertNotIsInstance(response['items'], list)
+
+    def test_occurrence_saved(self):
+        """Saving an occurrence should invalidate the cached agendas."""
+        self.index._get_children(self.get_request(scope='month'))
+        instance = factories.EventOccurrenceFactory.create(
+            event=self.detail,
+            start_date=timezone.now(),
+        )
+
+        response = self.index._get_children(self.get_request(scope='month'))
+        self.assertIn(instance, response['items'])
+
+    def test_occurrence_deleted(self):
+        """Deleting an occurrence should invalidate the cached agendas."""
+        self.index._get_children(self.get_request(scope='month'))
+        self.instance.delete()
+
+        response = self.index._get_children(self.get_request(scope='month'))
+        self.assertEqual(response['items'], [])
+
+    def test_event_detail_unpublished(self):
+        """Unpublishing an EventDetail should invalidate the cached agendas."""
+        self.index._get_children(self.get_request(scope='month'))
+        self.detail.unpublish()
+
+        response = self.index._get_children(self.get_request(scope='month'))
+        self.assertEqual(response['items'], [])
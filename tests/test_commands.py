@@ -0,0 +1,274 @@
+# -*- coding:utf8 -*-
+
+from __future__ import unicode_literals
+
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.utils.six import StringIO
+from mock import patch
+from wagtail.wagtailcore.models import Page
+
+from tests import factories
+from wagtail_events import models
+from wagtail_events.cache import get_index_version
+from wagtail_events.models import EventOccurrence
+
+
+class TestBackfillEventVisibility(TestCase):
+    """Tests for the backfill_event_visibility command."""
+    def setUp(self):
+        self.index = factories.EventIndexFactory.create(parent=None)
+        self.details = [
+            factories.EventDetailFactory.create(parent=self.index, show_in_menus=show_in_menus)
+            for show_in_menus in (True, False, True)
+        ]
+        for detail in self.details:
+            factories.EventOccurrenceFactory.create(event=detail, start_date=timezone.now())
+
+    def test_backfill(self):
+        """The visibility of every EventDetail should be copied."""
+        EventOccurrence.objects.update(index_page=None, live=False, show_in_menus=False)
+        out = StringIO()
+
+        call_command('backfill_event_visibility', batch_size=2, stdout=out)
+
+        self.assertIn('Updated 3 occurrences.', out.getvalue())
+        for detail in self.details:
+            occurrence = detail.events.get()
+            self.assertEqual(occurrence.index_page_id, self.index.pk)
+            self.assertTrue(occurrence.live)
+            self.assertEqual(occurrence.show_in_menus, detail.show_in_menus)
+
+
+class TestGenerateEvents(TestCase):
+    """Tests for the generate_events command."""
+    def setUp(self):
+        self.root = factories.EventIndexFactory.create(parent=None)
+
+    def generate(self, **options):
+        """Run the command, returning the EventIndex created."""
+        options.setdefault('parent', self.root.pk)
+        options.setdefault('start', '2026-01-01')
+        call_command('generate_events', stdout=StringIO(), **options)
+        return Page.objects.child_of(self.root).get().specific
+
+    def get_dates(self, index):
+        """Get the start & end dates of the occurrences of an EventIndex."""
+        return list(EventOccurrence.objects.filter(index_page=index).order_by('pk').values_list(
+            'start_date',
+            'end_date',
+        ))
+
+    def test_generate(self):
+        """The pages & occurrences should be created in a valid tree."""
+        index = self.generate(pages=5, occurrences=3, batch_size=4)
+
+        self.assertIsInstance(index, models.EventIndex)
+        details = index.get_children().specific()
+        self.assertEqual(len(details), 5)
+        self.assertEqual(index.numchild, 5)
+        self.assertEqual(details[0].url_path, index.url_path + details[0].slug + '/')
+        self.assertEqual(EventOccurrence.objects.filter(index_page=index, live=True).count(), 15)
+        self.assertEqual([list(problems) for problems in Page.find_problems()], [[]] * 5)
+
+    def test_seed(self):
+        """The same seed should generate the same occurrences."""
+        dates = self.get_dates(self.generate(pages=2, occurrences=5, seed=3))
+        Page.objects.child_of(self.root).get().delete()
+
+        self.assertEqual(self.get_dates(self.generate(pages=2, occurrences=5, seed=3)), dates)
+
+    def test_weekend(self):
+        """The weekend distribution should only create Saturday & Sunday occurrences."""
+        dates = self.get_dates(self.generate(pages=2, occurrences=20, distribution='weekend'))
+
+        self.assertEqual(set(timezone.localtime(start).weekday() for start, end in dates), {5, 6})
+
+    def test_long(self):
+        """The long distribution should create multi-day occurrences."""
+        dates = self.get_dates(self.generate(pages=2, occurrences=20, distribution='long'))
+
+        self.assertTrue(all(end - start > timedelta(days=1) for start, end in dates))
+
+
+@override_settings(WAGTAIL_EVENTS_DETACHED_OCCURRENCES=True)
+class TestImportOccurrences(TestCase):
+    """Tests for the import_occurrences command."""
+    def setUp(self):
+        self.index = factories.EventIndexFactory.create(parent=None)
+        self.detail = factories.EventDetailFactory.create(parent=self.index)
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name, content):
+        """Write a file to import, returning its path."""
+        path = os.path.join(self.directory, name)
+        with open(path, 'wb') as f:
+            f.write(content.encode('utf-8'))
+        return path
+
+    def run_import(self, path, **options):
+        """Run the command, returning its output."""
+        out = StringIO()
+        call_command('import_occurrences', path, stdout=out, **options)
+        return out.getvalue()
+
+    def test_csv(self):
+        """Rows should be created, updated & deleted to match the file."""
+        path = self.write('dates.csv', (
+            'uid,event,title,start_date,end_date\n'
+            'a,{0},First,2026-03-01T10:00:00,2026-03-01T12:00:00\n'
+            'b,{0},Second,2026-03-02T10:00:00,\n'
+            'c,{0},Third,2026-03-03T10:00:00,2026-03-05T10:00:00\n'
+        ).format(self.detail.pk))
+        manual = factories.EventOccurrenceFactory.create(event=self.detail, start_date=timezone.now())
+
+        output = self.run_import(path)
+
+        self.assertIn('3 created, 0 updated, 0 deleted, 0 unchanged', output)
+        self.assertIn('rows/sec', output)
+        occurrence = EventOccurrence.objects.get(uid='c')
+        self.assertEqual(occurrence.title, 'Third')
+        self.assertEqual(occurrence.index_page_id, self.index.pk)
+        self.assertTrue(occurrence.live)
+        self.assertEqual(occurrence.duration_bucket, 1)
+
+        path = self.write('dates.csv', (
+            'uid,event,title,start_date,end_date\n'
+            'a,{0},First,2026-03-01T10:00:00,2026-03-01T12:00:00\n'
+            'b,{0},Second,2026-03-02T11:00:00,2026-03-02T12:00:00\n'
+        ).format(self.detail.pk))
+        version = get_index_version(self.index.pk)
+
+        output = self.run_import(path)
+
+        self.assertIn('0 created, 1 updated, 1 deleted, 1 unchanged', output)
+        self.assertEqual(get_index_version(self.index.pk), version + 1)
+        occurrence = EventOccurrence.objects.get(uid='b')
+        self.assertEqual(timezone.localtime(occurrence.start_date).hour, 11)
+        self.assertEqual(occurrence.duration_bucket, 0)
+        self.assertEqual(
+            set(self.detail.events.values_list('pk', flat=True)),
+            {manual.pk, EventOccurrence.objects.get(uid='a').pk, occurrence.pk},
+        )
+
+    def test_ics(self):
+        """VEVENTs should be imported to the EventDetail given."""
+        path = self.write('dates.ics', (
+            'BEGIN:VCALENDAR\r\n'
+            'BEGIN:VEVENT\r\n'
+            'UID:weekly@example.com\r\n'
+            'SUMMARY:Weekly\\, indoors\r\n'
+            'DTSTART;TZID=Europe/London:20260301T100000\r\n'
+            'DURATION:PT2H\r\n'
+            'RRULE:FREQ=WEEKLY;COUNT=4\r\n'
+            'END:VEVENT\r\n'
+            'BEGIN:VEVENT\r\n'
+            'UID:weekly@example.com\r\n'
+            'RECURRENCE-ID;TZID=Europe/London:20260308T100000\r\n'
+            'SUMMARY:Moved\r\n'
+            'DTSTART:20260309T100000Z\r\n'
+            'END:VEVENT\r\n'
+            'END:VCALENDAR\r\n'
+        ))
+
+        self.run_import(path, event=self.detail.pk)
+
+        weekly = EventOccurrence.objects.get(uid='weekly@example.com')
+        self.assertEqual(weekly.title, 'Weekly, indoors')
+        self.assertTrue(weekly.is_recurring)
+        self.assertEqual(weekly.end_date - weekly.start_date, timedelta(hours=2))
+        moved = EventOccurrence.objects.get(uid='weekly@example.com/20260308T100000Z')
+        self.assertEqual(moved.recurrence_id, timezone.make_aware(datetime(2026, 3, 8, 10), timezone.utc))
+
+    def test_invalid_row(self):
+        """An invalid row should leave the occurrences of its EventDetail unchanged."""
+        path = self.write('dates.csv', (
+            'uid,title,start_date,end_date\n'
+            'a,First,2026-03-01T10:00:00,\n'
+            'b,Second,2026-03-02T10:00:00,2026-03-01T10:00:00\n'
+        ))
+
+        with self.assertRaises(CommandError):
+            self.run_import(path, event=self.detail.pk)
+        self.assertFalse(EventOccurrence.objects.exists())
+
+    def test_chunks(self):
+        """Rows should be written in chunks, a later row replacing an earlier one."""
+        path = self.write('dates.csv', 'uid,title,start_date\n' + ''.join(
+            '{},Row {},2026-03-0{}T10:00:00\n'.format(uid, position, position + 1)
+            for position, uid in enumerate('abcab')
+        ))
+
+        output = self.run_import(path, event=self.detail.pk, batch_size=2)
+
+        self.assertIn('Imported 5 rows', output)
+        self.assertIn('3 created, 2 updated, 0 deleted, 0 unchanged', output)
+        self.assertEqual(
+            list(self.detail.events.order_by('uid').values_list('uid', 'title')),
+            [('a', 'Row 3'), ('b', 'Row 4'), ('c', 'Row 2')],
+        )
+
+    def test_conflicts(self):
+        """Overlapping rows should be rejected with a single sweep."""
+        path = self.write('dates.csv', (
+            'uid,title,start_date,end_date\n'
+            'a,First,2026-03-01T10:00:00,2026-03-01T12:00:00\n'
+            'b,Second,2026-03-01T11:00:00,2026-03-01T13:00:00\n'
+        ))
+
+        with patch.object(models.EventDetail, 'allow_overlapping_occurrences', False):
+            with self.assertRaisesMessage(CommandError, 'Row "b"'):
+                self.run_import(path, event=self.detail.pk)
+        self.assertFalse(EventOccurrence.objects.exists())
+
+    def test_attached(self):
+        """Attached occurrences should not be imported."""
+        path = self.write('dates.csv', 'uid,title,start_date\na,First,2026-03-01T10:00:00\n')
+
+        with self.settings(WAGTAIL_EVENTS_DETACHED_OCCURRENCES=False):
+            with self.assertRaises(CommandError):
+                self.run_import(path, event=self.detail.pk)
+        self.assertFalse(EventOccurrence.objects.exists())
+
+
+class TestFindConflicts(TestCase):
+    """Tests for the find_conflicts command."""
+    def setUp(self):
+        self.index = factories.EventIndexFactory.create(parent=None)
+        self.details = [factories.EventDetailFactory.create(parent=self.index) for position in range(2)]
+        self.start = timezone.now().replace(microsecond=0) + timedelta(days=1)
+        self.first = factories.EventOccurrenceFactory.create(
+            event=self.details[0],
+            start_date=self.start,
+            end_date=self.start + timedelta(hours=2),
+        )
+        self.second = factories.EventOccurrenceFactory.create(
+            event=self.details[1],
+            start_date=self.start + timedelta(hours=1),
+        )
+
+    def find(self, **options):
+        """Run the command, returning its output."""
+        out = StringIO()
+        call_command('find_conflicts', stdout=out, **options)
+        return out.getvalue()
+
+    def test_index(self):
+        """The overlapping occurrences of each EventIndex should be reported."""
+        output = self.find()
+
+        self.assertIn('occurrence {} of event {}'.format(self.first.pk, self.details[0].pk), output)
+        self.assertIn('overlaps occurrence {}'.format(self.second.pk), output)
+        self.assertIn('Found 1 conflicts between 2 occurrences', output)
+
+    def test_same_event(self):
+        """Occurrences of different events should not conflict with --same-event."""
+        self.assertIn('Found 0 conflicts', self.find(same_event=True))
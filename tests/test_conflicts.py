@@ -0,0 +1,148 @@
+# -*- coding:utf8 -*-
+
+from __future__ import unicode_literals
+
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from mock import patch
+
+from tests import factories
+from wagtail_events import conflicts
+from wagtail_events.conflicts import Interval
+from wagtail_events.models import EventDetail, EventOccurrence
+
+
+class TestFindConflicts(TestCase):
+    """Tests for the sweep over occurrence intervals."""
+    def setUp(self):
+        self.start = timezone.now().replace(microsecond=0)
+
+    def interval(self, pk, start_hours, end_hours=None, event_id=1):
+        """Build an interval starting & ending some hours after the start."""
+        start = self.start + timedelta(hours=start_hours)
+        end = self.start + timedelta(hours=end_hours) if end_hours is not None else start
+        return Interval(start, end, pk, event_id)
+
+    def get_pairs(self, intervals, **kwargs):
+        """Find the conflicts as sets of interval ids."""
+        return set(frozenset([first.pk, second.pk]) for first, second in conflicts.find_conflicts(intervals, **kwargs))
+
+    def test_overlapping(self):
+        """Overlapping intervals should conflict, in any order."""
+        intervals = [
+            self.interval(1, 0, 10),
+            self.interval(2, 2, 3),
+            self.interval(3, 9, 12),
+            self.interval(4, 12, 13),
+        ]
+
+        self.assertEqual(self.get_pairs(reversed(intervals)), {frozenset([1, 2]), frozenset([1, 3])})
+
+    def test_same_start(self):
+        """Intervals starting at the same time should conflict, even without an end."""
+        intervals = [self.interval(1, 5), self.interval(2, 5), self.interval(3, 6)]
+
+        self.assertEqual(self.get_pairs(intervals), {frozenset([1, 2])})
+
+    def test_same_event(self):
+        """Only the intervals of the same event should conflict when asked."""
+        intervals = [
+            self.interval(1, 0, 2, event_id=1),
+            self.interval(2, 1, 3, event_id=2),
+            self.interval(3, 1, 2, event_id=1),
+        ]
+
+        self.assertEqual(self.get_pairs(intervals, same_event=True), {frozenset([1, 3])})
+
+    def test_get_intervals(self):
+        """Intervals should be read sorted, with recurring occurrences expanded."""
+        detail = factories.EventDetailFactory.create(parent=None)
+        weekly = factories.EventOccurrenceFactory.create(
+            event=detail,
+            start_date=self.start,
+            end_date=self.start + timedelta(hours=1),
+            recurrence='RRULE:FREQ=WEEKLY;COUNT=3',
+        )
+        single = factories.EventOccurrenceFactory.create(event=detail, start_date=self.start + timedelta(days=1))
+
+        intervals = list(conflicts.get_intervals(
+            EventOccurrence.objects.all(),
+            self.start,
+            self.start + timedelta(days=30),
+        ))
+
+        self.assertEqual([interval.pk for interval in intervals], [weekly.pk, single.pk, weekly.pk, weekly.pk])
+        self.assertEqual(intervals[1].end, single.start_date)
+
+
+class TestOccurrenceValidation(TestCase):
+    """Tests for the validation of overlapping occurrences."""
+    def setUp(self):
+        patcher = patch.object(EventDetail, 'allow_overlapping_occurrences', False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.detail = factories.EventDetailFactory.create(parent=None)
+        self.start = timezone.now().replace(microsecond=0)
+        self.instance = factories.EventOccurrenceFactory.create(
+            event=self.detail,
+            start_date=self.start,
+            end_date=self.start + timedelta(hours=2),
+        )
+
+    def test_attached(self):
+        """Attached occurrences should be checked by the page form rather than clean."""
+        occurrence = EventOccurrence(event=self.detail, title='Other', start_date=self.start + timedelta(hours=1))
+
+        occurrence.clean()
+
+    @override_settings(WAGTAIL_EVENTS_DETACHED_OCCURRENCES=True)
+    def test_detached(self):
+        """Detached occurrences should not overlap another occurrence of their event."""
+        occurrence = EventOccurrence(event=self.detail, title='Other', start_date=self.start + timedelta(hours=1))
+
+        with self.assertRaises(ValidationError) as context:
+            occurrence.clean()
+        self.assertIn('start_date', context.exception.message_dict)
+
+        occurrence.start_date = self.start + timedelta(hours=2)
+        occurrence.clean()
+        self.instance.clean()
+
+    @override_settings(WAGTAIL_EVENTS_DETACHED_OCCURRENCES=True)
+    def test_allowed(self):
+        """Overlapping dates should be accepted when the EventDetail allows them."""
+        occurrence = EventOccurrence(event=self.detail, title='Other', start_date=self.start + timedelta(hours=1))
+
+        with patch.object(EventDetail, 'allow_overlapping_occurrences', True):
+            occurrence.clean()
+
+    def test_form(self):
+        """The page form should reject overlapping dates of its formset."""
+        form_class = EventDetail.get_edit_handler().get_form_class(EventDetail)
+        data = {
+            'title': self.detail.title,
+            'slug': self.detail.slug,
+            'body': '<p>Body</p>',
+            'events-TOTAL_FORMS': '2',
+            'events-INITIAL_FORMS': '0',
+            'events-MIN_NUM_FORMS': '0',
+            'events-MAX_NUM_FORMS': '1000',
+        }
+        for position, hours in enumerate((0, 1)):
+            start = timezone.localtime(self.start + timedelta(hours=hours))
+            data.update({
+                'events-{}-title'.format(position): 'Date {}'.format(position),
+                'events-{}-start_date'.format(position): start.strftime('%Y-%m-%d %H:%M'),
+                'events-{}-end_date'.format(position): (start + timedelta(hours=2)).strftime('%Y-%m-%d %H:%M'),
+                'events-{}-body'.format(position): '<p>Body</p>',
+                'events-{}-ORDER'.format(position): '{}'.format(position),
+            })
+
+        form = form_class(data, instance=EventDetail(), parent_page=self.detail.get_parent())
+
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.formsets['events'].errors[0], {})
+        self.assertIn('start_date', form.formsets['events'].errors[1])
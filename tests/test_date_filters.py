@@ -2,13 +2,16 @@
 
 from __future__ import unicode_literals
 
-from datetime import timedelta
+from datetime import date, datetime, timedelta
 
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
+from mock import patch
 
 from tests.factories import EventDetailFactory, EventOccurrenceFactory
-from wagtail_events import date_filters
+from wagtail_events import date_filters, utils
 from wagtail_events.models import EventDetail, EventOccurrence
 
 
@@ -85,3 +88,314 @@ class TestAgendas(TestCase):
         self.assertEqual(response['scope'], 'Day')
         self.assertIn(self.instance_one, response['items'])
         self.assertNotIn(instance_two, response['items'])
+
+
+class TestMonthGrid(TestCase):
+    """Tests for the get_month_grid method."""
+    def setUp(self):
+        self.detail = EventDetailFactory.create(parent=None)
+        self.start = timezone.make_aware(datetime(2026, 1, 14, 10), timezone.get_current_timezone())
+        self.instances = [
+            EventOccurrenceFactory.create(
+                event=self.detail,
+                start_date=self.start + timedelta(hours=i),
+            )
+            for i in range(3)
+        ]
+
+    def get_day(self, response, date):
+        """Find the grid cell for a date."""
+        for week in response['weeks']:
+            for day in week:
+                if day['date'] == date:
+                    return day
+
+    def test_grid(self):
+        """The grid should contain six weeks starting on a Monday."""
+        with self.assertNumQueries(1):
+            response = date_filters.get_month_grid(
+                EventOccurrence,
+                EventDetail.objects.all(),
+                self.start,
+            )
+
+        self.assertEqual(response['scope'], 'Calendar')
+        self.assertEqual(len(response['weeks']), 6)
+        self.assertTrue(all(len(week) == 7 for week in response['weeks']))
+        self.assertEqual(response['weeks'][0][0]['date'], date(2025, 12, 29))
+        self.assertFalse(response['weeks'][0][0]['in_month'])
+        self.assertEqual(self.get_day(response, date(2026, 1, 14))['count'], 3)
+        self.assertEqual(self.get_day(response, date(2026, 1, 14))['items'], [])
+        self.assertEqual(response['count'], 3)
+
+    def test_per_day(self):
+        """The first occurrences of each day should be included."""
+        with self.assertNumQueries(3):
+            response = date_filters.get_month_grid(
+                EventOccurrence,
+                EventDetail.objects.all(),
+                self.start,
+                per_day=2,
+            )
+            day = self.get_day(response, date(2026, 1, 14))
+
+        self.assertEqual(day['count'], 3)
+        self.assertEqual(day['items'], self.instances[:2])
+
+    def test_per_day_quiet(self):
+        """Days without more than per_day occurrences should be read with a single query."""
+        with self.assertNumQueries(2):
+            response = date_filters.get_month_grid(
+                EventOccurrence,
+                EventDetail.objects.all(),
+                self.start,
+                per_day=3,
+            )
+
+        self.assertEqual(self.get_day(response, date(2026, 1, 14))['items'], self.instances)
+
+    def test_per_day_rows(self):
+        """Only the occurrences listed should be read, including occurrences starting together."""
+        others = [
+            EventOccurrenceFactory.create(event=self.detail, start_date=self.start + timedelta(days=1))
+            for i in range(4)
+        ]
+
+        with patch.object(EventOccurrence, 'from_db', side_effect=EventOccurrence.from_db) as from_db:
+            with CaptureQueriesContext(connection) as queries:
+                response = date_filters.get_month_grid(
+                    EventOccurrence,
+                    EventDetail.objects.all(),
+                    self.start,
+                    per_day=2,
+                )
+
+        self.assertEqual(len(queries), 3)
+        self.assertIn('UNION ALL', queries[1]['sql'])
+        self.assertEqual(from_db.call_count, 4)
+        self.assertEqual(self.get_day(response, date(2026, 1, 14))['items'], self.instances[:2])
+        day = self.get_day(response, date(2026, 1, 15))
+        self.assertEqual(day['count'], 4)
+        self.assertEqual(day['items'], others[:2])
+
+    def test_recurring(self):
+        """Recurring occurrences should be counted on each day they occur."""
+        EventOccurrenceFactory.create(
+            event=self.detail,
+            start_date=self.start - timedelta(days=7, hours=1),
+            recurrence='RRULE:FREQ=WEEKLY',
+        )
+        response = date_filters.get_month_grid(
+            EventOccurrence,
+            EventDetail.objects.all(),
+            self.start,
+            per_day=2,
+        )
+        day = self.get_day(response, date(2026, 1, 14))
+
+        self.assertEqual(day['count'], 4)
+        self.assertEqual(day['items'][0].start_date, self.start - timedelta(hours=1))
+        self.assertEqual(self.get_day(response, date(2026, 1, 21))['count'], 1)
+        self.assertEqual(response['count'], 3 + 5)
+
+
+class TestBatchAgendas(TestCase):
+    """Tests for the get_agendas method."""
+    def setUp(self):
+        self.detail = EventDetailFactory.create(parent=None)
+        self.start = timezone.make_aware(datetime(2026, 1, 14, 10), timezone.get_current_timezone())
+
+    def test_get_period_start(self):
+        """get_period_start should return the first day of the period."""
+        day = date(2026, 1, 14)
+
+        self.assertEqual(date_filters.get_period_start('year', day, 1), date(2027, 1, 1))
+        self.assertEqual(date_filters.get_period_start('month', day, -1), date(2025, 12, 1))
+        self.assertEqual(date_filters.get_period_start('week', day), date(2026, 1, 12))
+        self.assertEqual(date_filters.get_period_start('day', day, 2), date(2026, 1, 16))
+        with self.assertRaises(ValueError):
+            date_filters.get_period_start('decade', day)
+
+    def test_get_agendas(self):
+        """The occurrences should be split into their periods."""
+        instances = [
+            EventOccurrenceFactory.create(
+                event=self.detail,
+                start_date=self.start + timedelta(weeks=i),
+            )
+            for i in (0, 2, 2, 9)
+        ]
+        with self.assertNumQueries(1):
+            response = date_filters.get_agendas(
+                EventOccurrence,
+                EventDetail.objects.all(),
+                'week',
+                self.start,
+                8,
+            )
+
+        self.assertEqual(len(response), 8)
+        self.assertEqual(response[0]['scope'], 'Week')
+        self.assertEqual(response[0]['start_date'].date(), date(2026, 1, 12))
+        self.assertEqual(response[0]['next_date'], response[1]['start_date'])
+        self.assertEqual(response[1]['previous_date'], response[0]['start_date'])
+        self.assertEqual(response[0]['items'], instances[:1])
+        self.assertEqual(response[1]['items'], [])
+        self.assertEqual(response[2]['items'], instances[1:3])
+        self.assertEqual(sum(len(agenda['items']) for agenda in response), 3)
+        self.assertEqual(response[7]['next_nonempty_date'], utils.date_to_datetime(date(2026, 3, 18)))
+        self.assertEqual(response[1]['previous_nonempty_date'], utils.date_to_datetime(date(2026, 1, 14)))
+
+    def test_recurring(self):
+        """Recurring occurrences should be expanded into each period."""
+        EventOccurrenceFactory.create(
+            event=self.detail,
+            start_date=self.start,
+            recurrence='RRULE:FREQ=MONTHLY',
+        )
+        response = date_filters.get_agendas(
+            EventOccurrence,
+            EventDetail.objects.all(),
+            'month',
+            self.start,
+            12,
+        )
+
+        self.assertEqual([len(agenda['items']) for agenda in response], [1] * 12)
+
+
+class TestNonEmptyDates(TestCase):
+    """Tests for the next_nonempty_date & previous_nonempty_date values."""
+    def setUp(self):
+        self.detail = EventDetailFactory.create(parent=None)
+        self.start = timezone.make_aware(datetime(2026, 1, 14, 10), timezone.get_current_timezone())
+        self.day = timezone.make_aware(datetime(2026, 1, 14), timezone.get_current_timezone())
+
+    def get_agenda(self):
+        """Get the day agenda of the start date."""
+        return date_filters.get_day_agenda(
+            EventOccurrence,
+            EventDetail.objects.all(),
+            self.day,
+        )
+
+    def test_lazy(self):
+        """The dates should only be looked up when they are used."""
+        with self.assertNumQueries(0):
+            response = self.get_agenda()
+
+        with self.assertNumQueries(2):
+            self.assertFalse(response['next_nonempty_date'])
+
+    def test_next_nonempty_date(self):
+        """next_nonempty_date should be the next day with an event."""
+        EventOccurrenceFactory.create(event=self.detail, start_date=self.start + timedelta(days=10))
+        EventOccurrenceFactory.create(event=self.detail, start_date=self.start + timedelta(days=20))
+        response = self.get_agenda()
+
+        self.assertEqual(response['next_nonempty_date'], self.day + timedelta(days=10))
+        self.assertFalse(response['previous_nonempty_date'])
+
+    def test_previous_nonempty_date(self):
+        """previous_nonempty_date should be the previous day with an event."""
+        EventOccurrenceFactory.create(event=self.detail, start_date=self.start - timedelta(days=30))
+        EventOccurrenceFactory.create(event=self.detail, start_date=self.start - timedelta(days=3))
+        response = self.get_agenda()
+
+        self.assertEqual(response['previous_nonempty_date'], self.day - timedelta(days=3))
+
+    def test_next_period_start(self):
+        """next_nonempty_date should include the events starting as the next period starts."""
+        EventOccurrenceFactory.create(event=self.detail, start_date=self.day + timedelta(days=1))
+        EventOccurrenceFactory.create(event=self.detail, start_date=self.day + timedelta(days=18))
+
+        self.assertEqual(self.get_agenda()['next_nonempty_date'], self.day + timedelta(days=1))
+        response = date_filters.get_month_agenda(EventOccurrence, EventDetail.objects.all(), self.day)
+        self.assertEqual(response['next_nonempty_date'], self.day + timedelta(days=18))
+        self.assertEqual(response['end_date'], self.day + timedelta(days=18, microseconds=-1))
+
+    def test_recurring_next_period_start(self):
+        """next_nonempty_date should include the instances starting as the next period starts."""
+        EventOccurrenceFactory.create(
+            event=self.detail,
+            start_date=self.day - timedelta(days=7),
+            recurrence='RRULE:FREQ=DAILY',
+        )
+
+        self.assertEqual(self.get_agenda()['next_nonempty_date'], self.day + timedelta(days=1))
+        response = date_filters.get_week_agenda(EventOccurrence, EventDetail.objects.all(), self.day)
+        self.assertEqual(response['next_nonempty_date'], self.day + timedelta(days=5))
+
+    def test_recurring(self):
+        """Recurring occurrences should be taken into account."""
+        EventOccurrenceFactory.create(event=self.detail, start_date=self.start + timedelta(days=10))
+        EventOccurrenceFactory.create(
+            event=self.detail,
+            start_date=self.start - timedelta(days=14),
+            recurrence='RRULE:FREQ=WEEKLY',
+        )
+        response = self.get_agenda()
+
+        self.assertEqual(response['next_nonempty_date'], self.day + timedelta(days=7))
+        self.assertEqual(response['previous_nonempty_date'], self.day - timedelta(days=7))
+
+
+class TestOverlap(TestCase):
+    """Tests for the agendas of occurrences overlapping their period."""
+    def setUp(self):
+        self.detail = EventDetailFactory.create(parent=None)
+        self.day = timezone.make_aware(datetime(2026, 1, 14), timezone.get_current_timezone())
+
+    def get_agenda(self, overlap=True):
+        """Get the day agenda of the day."""
+        return date_filters.get_day_agenda(
+            EventOccurrence,
+            EventDetail.objects.all(),
+            self.day,
+            overlap=overlap,
+        )
+
+    def test_get_duration_bucket(self):
+        """Occurrences should be grouped by their duration in days, as powers of two."""
+        self.assertEqual(utils.get_duration_bucket(self.day, None), 0)
+        self.assertEqual(utils.get_duration_bucket(self.day, self.day + timedelta(hours=3)), 0)
+        self.assertEqual(utils.get_duration_bucket(self.day, self.day + timedelta(days=3)), 2)
+        self.assertEqual(utils.get_duration_bucket(self.day, self.day + timedelta(days=10000)), 11)
+
+    def test_overlap(self):
+        """Occurrences which started before the day should be listed until they end."""
+        festival = EventOccurrenceFactory.create(
+            event=self.detail,
+            start_date=self.day - timedelta(days=6),
+            end_date=self.day + timedelta(days=7),
+        )
+        exhibition = EventOccurrenceFactory.create(
+            event=self.detail,
+            start_date=self.day - timedelta(days=5000),
+            end_date=self.day + timedelta(days=1),
+        )
+        today = EventOccurrenceFactory.create(event=self.detail, start_date=self.day + timedelta(hours=23))
+        EventOccurrenceFactory.create(event=self.detail, start_date=self.day - timedelta(hours=1))
+        EventOccurrenceFactory.create(
+            event=self.detail,
+            start_date=self.day - timedelta(days=6),
+            end_date=self.day - timedelta(days=1),
+        )
+        EventOccurrenceFactory.create(event=self.detail, start_date=self.day + timedelta(days=1))
+
+        self.assertEqual(list(self.get_agenda()['items']), [exhibition, festival, today])
+        self.assertEqual(list(self.get_agenda(overlap=False)['items']), [today])
+
+    def test_recurring(self):
+        """Instances of recurring occurrences which started before the day should be listed."""
+        EventOccurrenceFactory.create(
+            event=self.detail,
+            start_date=self.day - timedelta(days=14, hours=2),
+            end_date=self.day - timedelta(days=13, hours=22),
+            recurrence='RRULE:FREQ=WEEKLY',
+        )
+        response = list(self.get_agenda()['items'])
+
+        self.assertEqual(len(response), 1)
+        self.assertEqual(response[0].start_date, self.day - timedelta(hours=2))
+        self.assertEqual(list(self.get_agenda(overlap=False)['items']), [])
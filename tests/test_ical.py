@@ -0,0 +1,173 @@
+# -*- coding:utf8 -*-
+
+from __future__ import unicode_literals
+
+from datetime import datetime, timedelta
+
+from django.http import StreamingHttpResponse
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+from wagtail_factories import SiteFactory
+
+from tests import factories
+from wagtail_events import ical
+
+
+class TestICalHelpers(TestCase):
+    """Tests for the iCalendar helpers."""
+    def test_escape(self):
+        """escape should escape special characters."""
+        self.assertEqual(ical.escape('a,b;c\\d\ne'), 'a\\,b\\;c\\\\d\\ne')
+
+    def test_fold(self):
+        """fold should split lines longer than 75 octets."""
+        response = ical.fold('X' * 160)
+        lines = response.split('\r\n')
+
+        self.assertEqual([len(line) for line in lines], [75, 75, 12, 0])
+        self.assertTrue(lines[1].startswith(' '))
+
+    def test_format_datetime(self):
+        """format_datetime should format the date as UTC."""
+        value = timezone.make_aware(datetime(2026, 1, 5, 10, 30), timezone.utc)
+
+        self.assertEqual(ical.format_datetime(value), '20260105T103000Z')
+
+    def test_iter_events(self):
+        """iter_events should unfold, unescape & parse the VEVENT properties."""
+        lines = [
+            'BEGIN:VCALENDAR\r\n',
+            'BEGIN:VEVENT\r\n',
+            'UID:1@example.com\r\n',
+            'SUMMARY:Talks\\; workshops\r\n',
+            'DESCRIPTION:First line\\nSecond \r\n',
+            ' line\r\n',
+            'DTSTART;VALUE=DATE:20260105\r\n',
+            'DTEND:20260105T170000Z\r\n',
+            'EXDATE;TZID="Europe/London":20260112T000000\r\n',
+            'RRULE:FREQ=WEEKLY;COUNT=3\r\n',
+            'END:VEVENT\r\n',
+            'END:VCALENDAR\r\n',
+        ]
+
+        event, = ical.iter_events(lines)
+
+        self.assertEqual(event['uid'], '1@example.com')
+        self.assertEqual(event['title'], 'Talks; workshops')
+        self.assertEqual(event['body'], '<p>First line<br />Second line</p>')
+        self.assertEqual(timezone.localtime(event['start_date']).date(), datetime(2026, 1, 5).date())
+        self.assertEqual(event['end_date'], timezone.make_aware(datetime(2026, 1, 5, 17), timezone.utc))
+        self.assertEqual(event['recurrence'], 'EXDATE:20260112T000000\nRRULE:FREQ=WEEKLY;COUNT=3')
+
+    def test_timezone_lines(self):
+        """The VTIMEZONE should describe the daylight saving time transitions of the current timezone."""
+        with timezone.override('Europe/London'):
+            lines = ical.get_timezone_lines(timezone.make_aware(datetime(2026, 1, 5), timezone.utc))
+
+        self.assertEqual(lines[:2], ['BEGIN:VTIMEZONE', 'TZID:Europe/London'])
+        self.assertEqual(lines[lines.index('BEGIN:DAYLIGHT'):lines.index('END:DAYLIGHT')], [
+            'BEGIN:DAYLIGHT',
+            'DTSTART:19700329T010000',
+            'RRULE:FREQ=YEARLY;BYMONTH=3;BYDAY=-1SU',
+            'TZOFFSETFROM:+0000',
+            'TZOFFSETTO:+0100',
+            'TZNAME:BST',
+        ])
+        self.assertIn('RRULE:FREQ=YEARLY;BYMONTH=10;BYDAY=-1SU', lines)
+        self.assertEqual(lines[-1], 'END:VTIMEZONE')
+
+    def test_recurrence_line(self):
+        """Floating local times of recurrence lines should be written in the current timezone."""
+        with timezone.override('Europe/London'):
+            self.assertEqual(
+                ical.get_recurrence_line('FREQ=DAILY;UNTIL=20260705T100000', 'TZID=Europe/London'),
+                'RRULE:FREQ=DAILY;UNTIL=20260705T090000Z',
+            )
+            self.assertEqual(
+                ical.get_recurrence_line('EXDATE:20260105T100000', 'TZID=Europe/London'),
+                'EXDATE;TZID=Europe/London:20260105T100000',
+            )
+            event, = ical.iter_events([
+                'BEGIN:VEVENT',
+                'DTSTART;TZID=Europe/London:20260701T100000',
+                'RRULE:FREQ=DAILY;UNTIL=20260705T090000Z',
+                'END:VEVENT',
+            ])
+        self.assertEqual(event['recurrence'], 'RRULE:FREQ=DAILY;UNTIL=20260705T100000')
+
+
+class TestFeedView(TestCase):
+    """Tests for the EventIndex iCalendar feed route."""
+    def setUp(self):
+        self.index = factories.EventIndexFactory.create(parent=None)
+        SiteFactory.create(root_page=self.index)
+        self.detail = factories.EventDetailFactory.create(
+            parent=self.index,
+            show_in_menus=True,
+        )
+        self.instance = factories.EventOccurrenceFactory.create(
+            event=self.detail,
+            start_date=timezone.now() - timedelta(days=400),
+        )
+
+    def get_response(self, **params):
+        """Request the feed and return the response."""
+        request = RequestFactory().get('/feed.ics', params)
+        view, args, kwargs = self.index.resolve_subpage('/feed.ics/')
+        return view(request, *args, **kwargs)
+
+    def get_content(self, response):
+        """Read the content of a streaming response."""
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_feed(self):
+        """The feed should contain every occurrence by default."""
+        response = self.get_response()
+        content = self.get_content(response)
+
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertTrue(response['Content-Type'].startswith('text/calendar'))
+        self.assertTrue(content.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertIn('UID:wagtail-events-occurrence-{}@'.format(self.instance.pk), content)
+        self.assertIn(ical.format_datetime(self.instance.start_date), content)
+        self.assertTrue(content.endswith('END:VCALENDAR\r\n'))
+
+    def test_scope(self):
+        """The scope querystring value should limit the feed."""
+        content = self.get_content(self.get_response(scope='month'))
+
+        self.assertNotIn('BEGIN:VEVENT', content)
+
+    def test_recurring(self):
+        """Recurring occurrences should be written with their rules."""
+        self.instance.recurrence = 'FREQ=WEEKLY'
+        self.instance.save()
+        override = factories.EventOccurrenceFactory.create(
+            event=self.detail,
+            start_date=self.instance.start_date + timedelta(days=8),
+            recurrence_id=self.instance.start_date + timedelta(days=7),
+        )
+        content = self.get_content(self.get_response())
+
+        self.assertEqual(content.count('BEGIN:VEVENT'), 2)
+        self.assertIn('RRULE:FREQ=WEEKLY', content)
+        self.assertIn('DTSTART;TZID=UTC:{}'.format(ical.format_local_datetime(self.instance.start_date)), content)
+        self.assertIn('EXDATE;TZID=UTC:{}'.format(ical.format_local_datetime(override.recurrence_id)), content)
+        self.assertIn('BEGIN:VTIMEZONE\r\nTZID:UTC\r\n', content)
+
+    def test_since(self):
+        """Only events published since the date should be included."""
+        self.detail.last_published_at = timezone.now() - timedelta(days=10)
+        self.detail.save()
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+
+        content = self.get_content(self.get_response(since=since))
+        self.assertNotIn('BEGIN:VEVENT', content)
+
+    def test_not_modified(self):
+        """Conditional requests should be answered with a 304."""
+        response = self.get_response()
+        request = RequestFactory().get('/feed.ics', HTTP_IF_NONE_MATCH=response['ETag'])
+        response = self.index.feed_view(request)
+
+        self.assertEqual(response.status_code, 304)
@@ -0,0 +1,109 @@
+# -*- coding:utf8 -*-
+
+from __future__ import unicode_literals
+
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from wagtail_factories import SiteFactory
+
+from tests import factories
+from wagtail_events import cache
+from wagtail_events import instrumentation
+from wagtail_events.signals import stage_finished
+
+
+class TestInstrumentation(TestCase):
+    """Tests for the agenda rendering instrumentation."""
+    def setUp(self):
+        cache.get_cache().clear()
+        self.index = factories.EventIndexFactory.create(parent=None, paginate_by=2)
+        SiteFactory.create(root_page=self.index)
+        self.detail = factories.EventDetailFactory.create(
+            parent=self.index,
+            show_in_menus=True,
+        )
+        for i in range(3):
+            factories.EventOccurrenceFactory.create(
+                event=self.detail,
+                start_date=timezone.now(),
+            )
+        self.stages = []
+        stage_finished.connect(self.receiver)
+
+    def tearDown(self):
+        stage_finished.disconnect(self.receiver)
+        # Wagtail caches the site root paths.
+        cache.get_cache().clear()
+
+    def receiver(self, sender, **kwargs):
+        """Record the stages measured."""
+        self.stages.append(kwargs)
+
+    def get_request(self, **params):
+        """Create a request to the index page."""
+        request = RequestFactory().get('', params)
+        request.is_preview = False
+        return request
+
+    def get_stage(self, name):
+        """Find the measurements of a stage."""
+        return [stage for stage in self.stages if stage['stage'] == name]
+
+    def test_disabled(self):
+        """Nothing should be measured by default."""
+        self.index.get_context(self.get_request(scope='month'))
+
+        self.assertEqual(self.stages, [])
+
+    @override_settings(WAGTAIL_EVENTS_INSTRUMENTATION=True)
+    def test_get_context(self):
+        """Each stage should be measured with the scope requested."""
+        self.index.get_context(self.get_request(scope='month'))
+
+        self.assertEqual(
+            [stage['stage'] for stage in self.stages],
+            ['_get_children', 'paginate_queryset', 'url', 'url', 'get_context'],
+        )
+        self.assertTrue(all(stage['scope'] == 'month' for stage in self.stages))
+        self.assertEqual(self.get_stage('get_context')[0]['rows'], 2)
+        self.assertIsNone(self.get_stage('_get_children')[0]['rows'])
+        self.assertGreater(self.get_stage('get_context')[0]['queries'], 0)
+        self.assertTrue(all(stage['duration'] >= 0 for stage in self.stages))
+
+    @override_settings(WAGTAIL_EVENTS_INSTRUMENTATION=True)
+    def test_render(self):
+        """Template rendering should be measured by the render stage."""
+        response = self.index.serve(self.get_request(scope='week'))
+
+        self.assertTrue(response.is_rendered)
+        render = self.get_stage('render')[0]
+        self.assertEqual(render['scope'], 'week')
+        self.assertGreaterEqual(render['queries'], self.get_stage('get_context')[0]['queries'])
+
+    @override_settings(WAGTAIL_EVENTS_INSTRUMENTATION=True)
+    def test_stage(self):
+        """Stages should count the queries run & inherit the scope."""
+        with instrumentation.Stage('outer', scope='day'):
+            with instrumentation.Stage('inner') as stage:
+                list(self.detail.events.all())
+                stage.rows = 3
+
+        self.assertEqual(
+            self.stages,
+            [
+                {'signal': stage_finished, 'stage': 'inner', 'scope': 'day', 'duration': self.stages[0]['duration'],
+                 'queries': 1, 'rows': 3},
+                {'signal': stage_finished, 'stage': 'outer', 'scope': 'day', 'duration': self.stages[1]['duration'],
+                 'queries': 1, 'rows': None},
+            ],
+        )
+
+    def test_count_rows(self):
+        """Rows should only be counted once they've been fetched."""
+        queryset = self.detail.events.all()
+
+        self.assertIsNone(instrumentation.count_rows(queryset))
+        self.assertIsNone(instrumentation.count_rows({'items': queryset}))
+        list(queryset)
+        self.assertEqual(instrumentation.count_rows({'items': queryset}), 3)
+        self.assertEqual(instrumentation.count_rows([1, 2]), 2)
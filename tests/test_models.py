@@ -2,11 +2,17 @@
 
 from __future__ import unicode_literals
 
-from datetime import timedelta
+import json
+from datetime import datetime, timedelta
 
-from django.core.exceptions import ValidationError
+from django.apps import apps as django_apps
+from django.core.exceptions import ImproperlyConfigured, ValidationError
 from django.core.paginator import Page as PaginatorPage, Paginator
-from django.test import RequestFactory, TestCase
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.db.models.sql.where import ExtraWhere
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from mock import patch, Mock
 from modelcluster.fields import ParentalKey
@@ -17,7 +23,13 @@ from wagtail_factories import SiteFactory
 
 from tests import factories
 from wagtail_events import abstract_models
+from wagtail_events import date_filters
 from wagtail_events import models
+from wagtail_events import utils
+from wagtail_events.cache import get_index_version
+from wagtail_events.navigation import AgendaNavigation
+from wagtail_events.paginators import CursorPaginator
+from wagtail_events.rich_text import render_rich_text
 from wagtail_events.views import EventOccurrenceDetailView
 from wagtail_events.utils import _DATE_FORMAT_RE
 
@@ -58,6 +70,63 @@ class TestEventDetail(TestCase):
             EventOccurrenceDetailView,
         )
 
+    def test_get_context(self):
+        """The occurrences should be added to the context with their bodies rendered."""
+        request = RequestFactory().get('')
+        request.is_preview = False
+        detail = factories.EventDetailFactory.create(parent=None)
+        instance = factories.EventOccurrenceFactory.create(
+            event=detail,
+            start_date=timezone.now(),
+        )
+        context = detail.get_context(request)
+
+        self.assertEqual(context['occurrences'], [instance])
+        with self.assertNumQueries(0):
+            self.assertEqual(render_rich_text(context['occurrences'][0]), instance.body)
+            self.assertEqual(render_rich_text(detail), detail.body)
+
+    def test_event_view_not_modified(self):
+        """event_view should answer conditional requests with a 304."""
+        detail = factories.EventDetailFactory.create(parent=None)
+        instance = factories.EventOccurrenceFactory.create(
+            event=detail,
+            start_date=timezone.now(),
+        )
+        request = RequestFactory().get('')
+        response = detail.event_view(request, pk=instance.pk)
+        self.assertTrue(response.has_header('ETag'))
+
+        request = RequestFactory().get('', HTTP_IF_NONE_MATCH=response['ETag'])
+        response = detail.event_view(request, pk=instance.pk)
+        self.assertEqual(response.status_code, 304)
+
+        instance.title = 'Changed'
+        instance.save()
+        response = detail.event_view(request, pk=instance.pk)
+        self.assertEqual(response.status_code, 200)
+
+    def test_event_view_body_modified(self):
+        """The event_view ETag should change with the body, without a Last-Modified header."""
+        index = factories.EventIndexFactory.create(parent=None)
+        detail = factories.EventDetailFactory.create(parent=index)
+        instance = factories.EventOccurrenceFactory.create(
+            event=detail,
+            start_date=timezone.now(),
+        )
+        response = detail.event_view(RequestFactory().get(''), pk=instance.pk)
+        self.assertFalse(response.has_header('Last-Modified'))
+
+        request = RequestFactory().get('', HTTP_IF_NONE_MATCH=response['ETag'])
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(detail.event_view(request, pk=instance.pk).status_code, 304)
+        self.assertNotIn('"body"', queries[0]['sql'])
+
+        instance.body = '<p>Changed</p>'
+        instance.save()
+        response = detail.event_view(request, pk=instance.pk)
+        self.assertEqual(response.status_code, 200)
+
 
 class TestEventIndex(TestCase):
     """Tests for the EventIndex model."""
@@ -87,11 +156,12 @@ class TestEventIndex(TestCase):
         self.request.is_preview = False
 
     def test_parent_class(self):
-        """EventIndex should inherit from AbstractEventIndex."""
+        """EventIndex should inherit from AbstractEventIndex & RoutablePageMixin."""
         self.assertTrue(issubclass(
             self.model,
             abstract_models.AbstractEventIndex
         ))
+        self.assertTrue(issubclass(self.model, RoutablePageMixin))
 
     def test_body(self):
         """Test the EventIndex.body field."""
@@ -196,6 +266,111 @@ class TestEventIndex(TestCase):
         self.assertTrue(response['is_paginated'])
         self.assertIn(self.instance, response['children']['items'].object_list)
 
+    def test_get_context_url_queries(self):
+        """Resolving the occurrence urls should not cost a query per item."""
+        SiteFactory.create(root_page=self.index)
+        for i in range(3):
+            detail = factories.EventDetailFactory.create(
+                parent=self.index,
+                show_in_menus=True,
+            )
+            for j in range(4):
+                factories.EventOccurrenceFactory.create(
+                    event=detail,
+                    start_date=timezone.now(),
+                )
+
+        def count_queries(paginate_by):
+            self.index.paginate_by = paginate_by
+            with CaptureQueriesContext(connection) as queries:
+                context = self.index.get_context(self.request)
+                urls = [item.url for item in context['children']['items']]
+            self.assertEqual(len(urls), paginate_by)
+            return len(queries)
+
+        # Warm wagtail's site root path cache.
+        count_queries(1)
+        self.assertEqual(count_queries(2), count_queries(10))
+
+    def test_serve_not_modified(self):
+        """serve should answer conditional requests without rendering."""
+        response = self.index.serve(RequestFactory().get(''))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.has_header('ETag'))
+
+        request = RequestFactory().get('', HTTP_IF_NONE_MATCH=response['ETag'])
+        with patch.object(models.EventIndex, 'get_context') as get_context:
+            response = self.index.serve(request)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(get_context.called)
+
+    def test_serve_modified(self):
+        """The ETag should change when the agenda changes."""
+        response = self.index.serve(RequestFactory().get(''))
+        factories.EventOccurrenceFactory.create(
+            event=self.detail,
+            start_date=timezone.now(),
+        )
+
+        request = RequestFactory().get('', HTTP_IF_NONE_MATCH=response['ETag'])
+        response = self.index.serve(request)
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(WAGTAIL_EVENTS_DETACHED_OCCURRENCES=True)
+    def test_serve_bulk_modified(self):
+        """The ETag should change after a bulk change, without a Last-Modified header."""
+        response = self.index.serve(RequestFactory().get(''))
+        self.assertFalse(response.has_header('Last-Modified'))
+        models.EventOccurrence.objects.filter(event=self.detail).bulk_shift(timedelta(minutes=5))
+
+        request = RequestFactory().get('', HTTP_IF_NONE_MATCH=response['ETag'])
+        response = self.index.serve(request)
+        self.assertEqual(response.status_code, 200)
+
+    def test_listing_fields(self):
+        """The listing should not fetch the RichText bodies."""
+        response = self.index._get_children(self.request)
+        sql = str(response['items'].query)
+
+        self.assertNotIn('"body"', sql)
+        self.assertIn('"url_path"', sql)
+        self.assertEqual(list(response['items']), [self.instance])
+
+    def test_listing_fields_disabled(self):
+        """Setting listing_fields to None should fetch every field."""
+        self.index.listing_fields = None
+        response = self.index._get_children(self.request)
+
+        self.assertIn('"body"', str(response['items'].query))
+
+    def test_get_context_navigation(self):
+        """get_context should add the agenda navigation links."""
+        request = RequestFactory().get('', {'scope': 'month'})
+        request.is_preview = False
+        context = self.index.get_context(request)
+
+        self.assertIsInstance(context['navigation'], AgendaNavigation)
+        self.assertEqual(context['navigation'].scope_urls['week'], '?scope=week')
+        self.assertIs(context['navigation'].page, context['children']['items'])
+
+    def test_serve_calendar(self):
+        """The calendar scope should render a month grid."""
+        response = self.index.serve(RequestFactory().get('', {'scope': 'calendar'}))
+        response.render()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'<table>', response.content)
+        self.assertIn(self.instance.title.encode('utf-8'), response.content)
+
+    def test_calendar_not_paginated(self):
+        """The calendar scope should not paginate the occurrences of its grid."""
+        request = RequestFactory().get('', {'scope': 'calendar'})
+        request.is_preview = False
+        context = self.index.get_context(request)
+
+        self.assertFalse(context['is_paginated'])
+        self.assertIsNone(context['paginator'])
+
     def test_show_in_menus(self):
         """ Should take in account child.show_in_menus """
         request = RequestFactory().get('')
@@ -207,6 +382,83 @@ class TestEventIndex(TestCase):
         self.assertNotIn(self.instance_2, context['children']['items'].object_list)
 
 
+class TestEventIndexJSON(TestCase):
+    """Tests for the EventIndex JSON agenda route."""
+    def setUp(self):
+        self.index = factories.EventIndexFactory.create(parent=None)
+        SiteFactory.create(root_page=self.index)
+        self.detail = factories.EventDetailFactory.create(
+            parent=self.index,
+            show_in_menus=True,
+        )
+        self.instances = [
+            factories.EventOccurrenceFactory.create(
+                event=self.detail,
+                start_date=timezone.now() + timedelta(minutes=i),
+            )
+            for i in range(3)
+        ]
+
+    def get_data(self, **params):
+        """Request the JSON agenda and return the decoded data."""
+        request = RequestFactory().get('/agenda.json/', params)
+        response = self.index.agenda_json_view(request)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content.decode('utf-8'))
+
+    def test_agenda(self):
+        """The JSON agenda should contain the agenda data."""
+        data = self.get_data(scope='month')
+
+        self.assertEqual(data['scope'], 'Month')
+        for key in ('start_date', 'end_date', 'next_date', 'previous_date'):
+            self.assertIn(key, data)
+        self.assertEqual([item['id'] for item in data['items']], [i.pk for i in self.instances])
+        self.assertEqual(data['items'][0], {
+            'id': self.instances[0].pk,
+            'title': self.instances[0].title,
+            'start_date': DjangoJSONEncoder().default(self.instances[0].start_date),
+            'end_date': None,
+            'url': self.instances[0].url,
+            'event_id': self.detail.pk,
+        })
+
+    def test_fields(self):
+        """The fields querystring value should select the fields returned."""
+        data = self.get_data(scope='month', fields='title,body,url')
+
+        self.assertEqual(set(data['items'][0].keys()), set(['title', 'url']))
+
+    def test_no_body(self):
+        """The RichText bodies should not be fetched."""
+        request = RequestFactory().get('/agenda.json/', {'scope': 'month'})
+        with CaptureQueriesContext(connection) as queries:
+            self.index.agenda_json_view(request)
+
+        for query in queries:
+            self.assertNotIn('"body"', query['sql'])
+
+    def test_pagination(self):
+        """Paginated agendas should link to the next page."""
+        self.index.paginate_by = 2
+        data = self.get_data(scope='month')
+
+        self.assertEqual(len(data['items']), 2)
+        self.assertIsNone(data['previous'])
+        self.assertIn('page=2', data['next'])
+
+    def test_cursor_pagination(self):
+        """Cursor paginated agendas should link to the next cursor."""
+        self.index.paginate_by = 2
+        self.index.paginator_class = CursorPaginator
+        data = self.get_data(scope='month')
+        self.assertIn('cursor=', data['next'])
+
+        request = RequestFactory().get('/agenda.json/' + data['next'])
+        data = json.loads(self.index.agenda_json_view(request).content.decode('utf-8'))
+        self.assertEqual([item['id'] for item in data['items']], [self.instances[2].pk])
+
+
 class TestEventOccurrence(TestCase):
     """Tests for the EventOccurrence model."""
     def setUp(self):
@@ -246,6 +498,24 @@ class TestEventOccurrence(TestCase):
         )
         self.assertEqual(instance.url, '{}{}/'.format(detail.url, instance.pk))
 
+    def test_prime_occurrence_urls(self):
+        """prime_occurrence_urls should set the url of every occurrence."""
+        index = factories.EventIndexFactory.create(parent=None)
+        SiteFactory.create(root_page=index)
+        detail = factories.EventDetailFactory.create(parent=index)
+        for i in range(2):
+            factories.EventOccurrenceFactory.create(event=detail, start_date=timezone.now())
+        occurrences = list(self.model.objects.select_related('event'))
+        detail.url  # Warm wagtail's site root path cache.
+
+        with self.assertNumQueries(0):
+            utils.prime_occurrence_urls(occurrences)
+            urls = [occurrence.url for occurrence in occurrences]
+
+        self.assertEqual(urls, [
+            '{}{}/'.format(detail.url, occurrence.pk) for occurrence in occurrences
+        ])
+
     def test_clean(self):
         """Clean should raise a validation error when end_date is before the start_date."""
         now = timezone.now()
@@ -256,3 +526,323 @@ class TestEventOccurrence(TestCase):
         )
         with self.assertRaises(ValidationError):
             instance.clean()
+
+
+class TestEventOccurrenceIndexes(TestCase):
+    """The agenda range queries should be answered from an index."""
+    def setUp(self):
+        self.detail = factories.EventDetailFactory.create(parent=None)
+        factories.EventOccurrenceFactory.create(
+            event=self.detail,
+            start_date=timezone.now(),
+        )
+
+    def get_plan(self, queryset):
+        """Returns the query plan of the queryset as a single string."""
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # Tiny test tables are cheaper to scan, so make the planner
+                # show whether an index *can* be used at all.
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute('EXPLAIN ' + sql, params)
+            elif connection.vendor == 'sqlite':
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            else:
+                self.skipTest('No EXPLAIN support for {}'.format(connection.vendor))
+            return '\n'.join(' '.join(str(col) for col in row) for row in cursor.fetchall())
+
+    def assertIndexScan(self, queryset):
+        """Assert that the occurrence table is not read sequentially."""
+        table = models.EventOccurrence._meta.db_table
+        plan = self.get_plan(queryset)
+
+        self.assertIn(table, plan)
+        self.assertNotIn('Seq Scan on {}'.format(table), plan)
+        self.assertNotIn('SCAN TABLE {}'.format(table), plan)
+        self.assertNotIn('SCAN {}\n'.format(table), plan + '\n')
+
+    def test_in_date_range_uses_index(self):
+        """in_date_range should be answered from the start_date index."""
+        now = timezone.now()
+        queryset = models.EventOccurrence.objects.in_date_range(
+            now - timedelta(days=1),
+            now + timedelta(days=1),
+        )
+        self.assertIndexScan(queryset)
+
+    def test_in_date_range_overlap_uses_index(self):
+        """Overlapping occurrences should be found from the duration bucket index."""
+        now = timezone.now()
+        queryset = models.EventOccurrence.objects.in_date_range(
+            now - timedelta(days=1),
+            now + timedelta(days=1),
+            overlap=True,
+        )
+        self.assertIndexScan(queryset)
+
+    def test_range_overlap_naive_bounds(self):
+        """The PostgreSQL overlap filter should read naive bounds like the field lookups do."""
+        start = datetime(2026, 1, 1)
+        queryset = models.EventOccurrence.objects.all()._filter_range_overlap(start, start + timedelta(days=31))
+        params = [child.params for child in queryset.query.where.children if isinstance(child, ExtraWhere)][0]
+
+        self.assertTrue(all(timezone.is_aware(param) for param in params))
+        self.assertEqual(params[0], timezone.make_aware(start, timezone.get_default_timezone()))
+
+    def test_agenda_uses_index(self):
+        """The agenda query filtered by event should use an index."""
+        agenda = date_filters.get_month_agenda(
+            models.EventOccurrence,
+            models.EventDetail.objects.filter(pk=self.detail.pk),
+            timezone.now(),
+        )
+        self.assertIndexScan(agenda['items'])
+
+    def test_index_agenda_uses_index(self):
+        """The EventIndex agenda query should be a single table index scan."""
+        index = factories.EventIndexFactory.create(parent=None)
+        request = RequestFactory().get('', {'scope': 'month'})
+        request.is_preview = False
+        items = index.get_agenda(request)['items']
+
+        self.assertIndexScan(items)
+        self.assertNotIn('wagtailcore_page"."path', str(items.query))
+
+
+class TestEventOccurrenceVisibility(TestCase):
+    """The visibility of an EventDetail should be copied onto its occurrences."""
+    def setUp(self):
+        self.index = factories.EventIndexFactory.create(parent=None)
+        self.detail = factories.EventDetailFactory.create(
+            parent=self.index,
+            show_in_menus=True,
+        )
+        self.instance = factories.EventOccurrenceFactory.create(
+            event=self.detail,
+            start_date=timezone.now(),
+        )
+
+    def get_visibility(self):
+        """Read the visibility values of the occurrence."""
+        return models.EventOccurrence.objects.filter(pk=self.instance.pk).values(
+            'index_page_id',
+            'live',
+            'show_in_menus',
+        )[0]
+
+    def test_save(self):
+        """Saving an occurrence should copy the visibility."""
+        self.assertEqual(self.get_visibility(), {
+            'index_page_id': self.index.pk,
+            'live': True,
+            'show_in_menus': True,
+        })
+
+    def test_event_detail_saved(self):
+        """Saving the EventDetail should update its occurrences."""
+        self.detail.show_in_menus = False
+        self.detail.save()
+
+        self.assertFalse(self.get_visibility()['show_in_menus'])
+
+    def test_unpublish(self):
+        """Unpublishing the EventDetail should update its occurrences."""
+        self.detail.unpublish()
+
+        self.assertFalse(self.get_visibility()['live'])
+
+    def test_move(self):
+        """Moving the EventDetail should update its occurrences."""
+        index = factories.EventIndexFactory.create(parent=None)
+        self.detail.move(index, pos='last-child')
+
+        self.assertEqual(self.get_visibility()['index_page_id'], index.pk)
+
+    def save_inline_occurrences(self, count):
+        """
+        Save a new EventDetail with inline occurrences.
+
+        :param count: number of occurrences added
+        :return: tuple of the number of queries & of index version bumps
+        """
+        detail = factories.EventDetailFactory.create(parent=self.index, show_in_menus=True)
+        detail.events = [
+            models.EventOccurrence(title='Inline {}'.format(number), body='', start_date=timezone.now())
+            for number in range(count)
+        ]
+        version = get_index_version(self.index.pk)
+        with CaptureQueriesContext(connection) as queries:
+            detail.save()
+        self.assertEqual(
+            set(detail.events.values_list('index_page_id', 'live', 'show_in_menus')),
+            {(self.index.pk, True, True)},
+        )
+        return len(queries), get_index_version(self.index.pk) - version
+
+    def test_event_detail_saved_inline(self):
+        """Saving inline occurrences should only add their own queries, & invalidate the index once."""
+        queries, bumps = self.save_inline_occurrences(2)
+        more_queries, more_bumps = self.save_inline_occurrences(6)
+
+        # Each row only adds its INSERT.
+        self.assertEqual(more_queries - queries, 4)
+        self.assertEqual(bumps, more_bumps)
+
+
+class TestDetachedOccurrences(TestCase):
+    """Tests for occurrences stored outside of the EventDetail revisions."""
+    def setUp(self):
+        self.detail = factories.EventDetailFactory.create(parent=None)
+        self.instance = factories.EventOccurrenceFactory.create(
+            event=self.detail,
+            start_date=timezone.now(),
+        )
+
+    def test_attached(self):
+        """Revisions should include the occurrences by default."""
+        self.assertEqual(len(self.detail.serializable_data()['events']), 1)
+
+    @override_settings(WAGTAIL_EVENTS_DETACHED_OCCURRENCES=True)
+    def test_serializable_data(self):
+        """Revisions should not include detached occurrences."""
+        self.assertNotIn('events', self.detail.serializable_data())
+
+    def test_publish_revision(self):
+        """Publishing an older revision should keep the detached occurrences."""
+        revision = self.detail.save_revision()
+        instance = factories.EventOccurrenceFactory.create(
+            event=self.detail,
+            start_date=timezone.now(),
+        )
+
+        with self.settings(WAGTAIL_EVENTS_DETACHED_OCCURRENCES=True):
+            revision.publish()
+
+        self.assertEqual(set(self.detail.events.all()), {self.instance, instance})
+
+    @override_settings(WAGTAIL_EVENTS_DETACHED_OCCURRENCES=True)
+    def test_modeladmin_required(self):
+        """Detached occurrences should require the modeladmin app to edit them."""
+        app_config = django_apps.get_app_config('wagtail_events')
+
+        with patch.object(django_apps, 'is_installed', return_value=False):
+            with self.assertRaises(ImproperlyConfigured):
+                app_config.check_settings()
+        with patch.object(django_apps, 'is_installed', return_value=True):
+            app_config.check_settings()
+
+
+@override_settings(WAGTAIL_EVENTS_DETACHED_OCCURRENCES=True)
+class TestBulkOperations(TestCase):
+    """Tests for the set-based occurrence operations."""
+    def setUp(self):
+        self.index = factories.EventIndexFactory.create(parent=None)
+        self.detail = factories.EventDetailFactory.create(parent=self.index)
+        self.start = timezone.now().replace(microsecond=0)
+        self.instances = [
+            factories.EventOccurrenceFactory.create(
+                event=self.detail,
+                start_date=self.start + timedelta(days=day),
+                end_date=self.start + timedelta(days=day, hours=2),
+            )
+            for day in range(3)
+        ]
+        self.queryset = models.EventOccurrence.objects.filter(event=self.detail)
+
+    def get_dates(self):
+        """Read the dates & duration buckets of the occurrences."""
+        return list(self.queryset.order_by('start_date').values_list('start_date', 'end_date', 'duration_bucket'))
+
+    def test_bulk_shift(self):
+        """Occurrences should be moved with a single query, invalidating the index once."""
+        version = get_index_version(self.index.pk)
+
+        with self.assertNumQueries(2):
+            count = self.queryset.filter(start_date__gt=self.start).bulk_shift(timedelta(days=7))
+
+        self.assertEqual(count, 2)
+        self.assertEqual([start for start, end, bucket in self.get_dates()], [
+            self.start,
+            self.start + timedelta(days=8),
+            self.start + timedelta(days=9),
+        ])
+        self.assertEqual(get_index_version(self.index.pk), version + 1)
+
+    def test_bulk_shift_end(self):
+        """Moving the end dates should update the duration buckets."""
+        self.queryset.bulk_shift(timedelta(0), timedelta(days=3))
+
+        self.assertEqual(self.get_dates()[0], (self.start, self.start + timedelta(days=3, hours=2), 2))
+
+    def test_bulk_shift_invalid(self):
+        """Occurrences should not be moved to end before they start."""
+        with self.assertRaises(ValidationError):
+            self.queryset.bulk_shift(timedelta(hours=3), timedelta(0))
+        self.assertEqual(self.get_dates()[0], (self.start, self.start + timedelta(hours=2), 0))
+
+    def test_bulk_clone(self):
+        """Occurrences should be copied with a single INSERT ... SELECT."""
+        detail = factories.EventDetailFactory.create(parent=self.index)
+
+        count = self.queryset.filter(start_date__gt=self.start).bulk_clone(timedelta(weeks=1), event_id=detail.pk)
+
+        self.assertEqual(count, 2)
+        copies = list(detail.events.order_by('start_date'))
+        self.assertEqual([copy.start_date for copy in copies], [
+            self.start + timedelta(days=8),
+            self.start + timedelta(days=9),
+        ])
+        self.assertEqual(copies[0].title, self.instances[1].title)
+        self.assertEqual(copies[0].index_page_id, self.index.pk)
+        self.assertEqual(self.queryset.count(), 3)
+
+    def test_bulk_delete(self):
+        """Occurrences should be deleted with a single DELETE."""
+        version = get_index_version(self.index.pk)
+
+        with self.assertNumQueries(2):
+            count = self.queryset.filter(start_date__gt=self.start).bulk_delete()
+
+        self.assertEqual(count, 2)
+        self.assertEqual(list(self.queryset), [self.instances[0]])
+        self.assertEqual(get_index_version(self.index.pk), version + 1)
+
+    def test_attached(self):
+        """Attached occurrences should not be changed in bulk."""
+        with self.settings(WAGTAIL_EVENTS_DETACHED_OCCURRENCES=False):
+            for operation in (lambda: self.queryset.bulk_shift(timedelta(days=1)), self.queryset.bulk_delete):
+                with self.assertRaises(ImproperlyConfigured):
+                    operation()
+        self.assertEqual(self.queryset.count(), 3)
+
+    def test_recurring(self):
+        """Overrides should be moved, copied & deleted with their recurring occurrence."""
+        rule = factories.EventOccurrenceFactory.create(
+            event=self.detail,
+            start_date=self.start + timedelta(days=10),
+            recurrence='RRULE:FREQ=DAILY;COUNT=3',
+        )
+        override = factories.EventOccurrenceFactory.create(
+            event=self.detail,
+            start_date=self.start + timedelta(days=11, hours=3),
+            recurrence_id=self.start + timedelta(days=11),
+        )
+        recurrence_end = rule.recurrence_end
+
+        self.queryset.filter(pk=rule.pk).bulk_shift(timedelta(days=1))
+        rule.refresh_from_db()
+        override.refresh_from_db()
+        self.assertEqual(rule.recurrence_end, recurrence_end + timedelta(days=1))
+        self.assertEqual(override.start_date, self.start + timedelta(days=12, hours=3))
+        self.assertEqual(override.recurrence_id, self.start + timedelta(days=12))
+
+        detail = factories.EventDetailFactory.create(parent=self.index)
+        self.queryset.filter(pk=rule.pk).bulk_clone(timedelta(0), event_id=detail.pk)
+        self.assertEqual(
+            sorted(detail.events.values_list('recurrence_id', flat=True), key=lambda value: value is not None),
+            [None, self.start + timedelta(days=12)],
+        )
+
+        self.queryset.filter(pk=rule.pk).bulk_delete()
+        self.assertEqual(self.queryset.count(), 3)
@@ -0,0 +1,69 @@
+# -*- coding:utf8 -*-
+
+from __future__ import unicode_literals
+
+from datetime import datetime
+
+from django.core.paginator import Paginator
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase
+
+from wagtail_events.navigation import AgendaNavigation
+from wagtail_events.paginators import CursorPaginator
+from wagtail_events.templatetags import wagtail_events_tags
+
+
+class TestAgendaNavigation(TestCase):
+    """Tests for the AgendaNavigation class."""
+    def setUp(self):
+        self.request = RequestFactory().get('', {'scope': 'day', 'page': '2'})
+        self.agenda = {
+            'previous_date': datetime(2026, 1, 13),
+            'next_date': datetime(2026, 1, 15),
+            'next_nonempty_date': None,
+        }
+
+    def test_links(self):
+        """The links should match the template tags."""
+        navigation = AgendaNavigation(self.request, self.agenda, scopes=['day', 'week'])
+        context = {'request': self.request}
+
+        self.assertEqual(navigation.scope_urls['week'], wagtail_events_tags._patch(context, 'scope', 'week'))
+        self.assertEqual(navigation.previous_url, '?scope=day&page=2&start_date=2026.01.13')
+        self.assertEqual(navigation.next_url, '?scope=day&page=2&start_date=2026.01.15')
+        self.assertEqual(navigation.next_nonempty_url, '')
+        self.assertEqual(
+            navigation.querystring(('page',), page=3),
+            wagtail_events_tags.querystring(context, 'page', page=3),
+        )
+
+    def test_page_links(self):
+        """The page links should use the page number."""
+        page = Paginator(list(range(10)), 2).page(2)
+        navigation = AgendaNavigation(self.request, page=page)
+
+        self.assertEqual(navigation.previous_page_url, '?scope=day&page=1')
+        self.assertEqual(navigation.next_page_url, '?scope=day&page=3')
+
+    def test_cursor_page_links(self):
+        """The page links of cursor pages should use the cursors."""
+        page = CursorPaginator([], 2).page(1)
+        navigation = AgendaNavigation(self.request, page=page, page_kwarg='cursor')
+
+        self.assertIsNone(navigation.previous_page_url)
+        self.assertIsNone(navigation.next_page_url)
+
+    def test_encoded_once(self):
+        """Each link should only be encoded once."""
+        navigation = AgendaNavigation(self.request, self.agenda)
+
+        self.assertIs(navigation.scope_url('week'), navigation.scope_url('week'))
+
+    def test_template_tags(self):
+        """The template tags should read the links from the navigation."""
+        navigation = AgendaNavigation(self.request, self.agenda)
+        navigation._urls[('patch', 'scope', 'week')] = '?cached'
+        template = Template('{% load wagtail_events_tags %}{% patch_scope "week" %}')
+
+        response = template.render(Context({'request': self.request, 'navigation': navigation}))
+        self.assertEqual(response, '?cached')
@@ -0,0 +1,172 @@
+# -*- coding:utf8 -*-
+
+from __future__ import unicode_literals
+
+from datetime import datetime, timedelta
+
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+from wagtail_factories import SiteFactory
+
+from tests import factories
+from wagtail_events import cache
+from wagtail_events.models import EventOccurrence
+from wagtail_events.occurrence_index import OccurrenceIndex, OccurrenceRange, registry, to_timestamp
+from wagtail_events.paginators import CursorPaginator
+
+
+def make_datetime(*args):
+    """Create an aware datetime in the current timezone."""
+    return timezone.make_aware(datetime(*args), timezone.get_current_timezone())
+
+
+class TestOccurrenceIndex(TestCase):
+    """Tests for the OccurrenceIndex class."""
+    def setUp(self):
+        self.detail = factories.EventDetailFactory.create(parent=None)
+        self.start = make_datetime(2026, 1, 14, 10)
+        self.instances = [
+            factories.EventOccurrenceFactory.create(
+                event=self.detail,
+                start_date=self.start + timedelta(days=i),
+            )
+            for i in range(5)
+        ]
+
+    def test_to_timestamp(self):
+        """to_timestamp should keep the microseconds."""
+        value = datetime(1970, 1, 1, 0, 0, 1, 5, tzinfo=timezone.utc)
+
+        self.assertEqual(to_timestamp(value), 1000005)
+
+    def test_build(self):
+        """The index should hold the occurrences sorted by start date."""
+        index = OccurrenceIndex.build(EventOccurrence.objects.all())
+
+        self.assertEqual(len(index), 5)
+        self.assertEqual(list(index.pks), [i.pk for i in self.instances])
+        self.assertEqual(list(index.starts), [to_timestamp(i.start_date) for i in self.instances])
+
+    def test_build_recurring(self):
+        """Recurring occurrences can't be indexed."""
+        factories.EventOccurrenceFactory.create(
+            event=self.detail,
+            start_date=self.start,
+            recurrence='RRULE:FREQ=DAILY',
+        )
+
+        self.assertIsNone(OccurrenceIndex.build(EventOccurrence.objects.all()))
+
+    def test_get_range(self):
+        """get_range should find the occurrences without a query."""
+        index = OccurrenceIndex.build(EventOccurrence.objects.all())
+        with self.assertNumQueries(0):
+            response = index.get_range(self.start + timedelta(days=1), self.start + timedelta(days=3))
+
+        self.assertIsInstance(response, OccurrenceRange)
+        self.assertEqual(len(response), 3)
+        with self.assertNumQueries(1):
+            self.assertEqual(list(response), self.instances[1:4])
+        with self.assertNumQueries(0):
+            self.assertEqual(response[1:], self.instances[2:4])
+
+    def test_cursor_paginator(self):
+        """The CursorPaginator should bisect the index."""
+        index = OccurrenceIndex.build(EventOccurrence.objects.all())
+        paginator = CursorPaginator(index.get_range(self.start, self.start + timedelta(days=10)), 2)
+        page = paginator.page(paginator.page(1).next_cursor)
+
+        self.assertEqual(list(page), self.instances[2:4])
+        self.assertEqual(list(paginator.page(page.previous_cursor)), self.instances[:2])
+
+
+class TestIndexedEventIndex(TestCase):
+    """Tests for EventIndex pages using the occurrence index."""
+    def setUp(self):
+        cache.get_cache().clear()
+        registry.clear()
+        self.index = factories.EventIndexFactory.create(parent=None, paginate_by=2)
+        self.index.use_occurrence_index = True
+        SiteFactory.create(root_page=self.index)
+        self.detail = factories.EventDetailFactory.create(
+            parent=self.index,
+            show_in_menus=True,
+        )
+        self.instances = [
+            factories.EventOccurrenceFactory.create(
+                event=self.detail,
+                start_date=timezone.now() + timedelta(minutes=i),
+            )
+            for i in range(3)
+        ]
+
+    def tearDown(self):
+        # Wagtail caches the site root paths.
+        cache.get_cache().clear()
+
+    def get_request(self, **params):
+        """Create a request to the index page."""
+        request = RequestFactory().get('', params)
+        request.is_preview = False
+        return request
+
+    def test_get_children(self):
+        """Agendas should be looked up in the index once it's built."""
+        self.index._get_children(self.get_request(scope='month'))
+
+        with self.assertNumQueries(0):
+            response = self.index._get_children(self.get_request(scope='month'))
+        self.assertIsInstance(response['items'], OccurrenceRange)
+        self.assertEqual(len(response['items']), 3)
+        self.assertEqual(response['scope'], 'Month')
+
+    def test_get_children_year(self):
+        """Year agendas should be looked up in the index, without the next year's occurrences."""
+        year = timezone.localtime(timezone.now()).year
+        factories.EventOccurrenceFactory.create(event=self.detail, start_date=make_datetime(year + 1, 1, 1))
+        self.index._get_children(self.get_request(scope='year'))
+
+        with self.assertNumQueries(0):
+            response = self.index._get_children(self.get_request(scope='year'))
+        self.assertIsInstance(response['items'], OccurrenceRange)
+        self.assertEqual(len(response['items']), 3)
+        self.assertEqual(response['scope'], 'Year')
+
+    def test_get_context(self):
+        """Only the page displayed should be fetched."""
+        self.index.get_context(self.get_request(scope='month'))
+
+        with self.assertNumQueries(1):
+            context = self.index.get_context(self.get_request(scope='month'))
+            self.assertEqual(list(context['children']['items']), self.instances[:2])
+
+    def test_rebuilt(self):
+        """The index should be rebuilt when an occurrence is saved."""
+        self.index._get_children(self.get_request(scope='month'))
+        instance = factories.EventOccurrenceFactory.create(
+            event=self.detail,
+            start_date=timezone.now(),
+        )
+
+        response = self.index._get_children(self.get_request(scope='month'))
+        self.assertIn(instance, list(response['items']))
+
+    def test_recurring(self):
+        """Indexes with recurring occurrences should query the database."""
+        factories.EventOccurrenceFactory.create(
+            event=self.detail,
+            start_date=timezone.now(),
+            recurrence='RRULE:FREQ=DAILY',
+        )
+
+        response = self.index._get_children(self.get_request(scope='month'))
+        self.assertNotIsInstance(response['items'], OccurrenceRange)
+
+    def test_not_modified(self):
+        """Conditional requests should be answered from the index."""
+        response = self.index.serve(self.get_request(scope='month'))
+        request = RequestFactory().get('', {'scope': 'month'}, HTTP_IF_NONE_MATCH=response['ETag'])
+
+        with self.assertNumQueries(0):
+            response = self.index.serve(request)
+        self.assertEqual(response.status_code, 304)
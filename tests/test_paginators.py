@@ -0,0 +1,125 @@
+# -*- coding:utf8 -*-
+
+from __future__ import unicode_literals
+
+from datetime import timedelta
+
+from django.core.paginator import PageNotAnInteger
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from tests import factories
+from wagtail_events.models import EventOccurrence
+from wagtail_events.paginators import CursorPage, CursorPaginator
+
+
+class TestCursorPaginator(TestCase):
+    """Tests for the CursorPaginator."""
+    def setUp(self):
+        self.detail = factories.EventDetailFactory.create(parent=None)
+        now = timezone.now().replace(microsecond=0)
+        # Two occurrences share a start_date so the pk tie-breaker is used.
+        self.occurrences = [
+            factories.EventOccurrenceFactory.create(event=self.detail, start_date=now),
+            factories.EventOccurrenceFactory.create(event=self.detail, start_date=now),
+        ] + [
+            factories.EventOccurrenceFactory.create(
+                event=self.detail,
+                start_date=now + timedelta(hours=i),
+            )
+            for i in range(1, 4)
+        ]
+        self.paginator = CursorPaginator(EventOccurrence.objects.all(), 2)
+
+    def test_first_page(self):
+        """The first page should have a next cursor and no previous cursor."""
+        page = self.paginator.page(1)
+
+        self.assertIsInstance(page, CursorPage)
+        self.assertEqual(list(page), self.occurrences[:2])
+        self.assertTrue(page.has_next())
+        self.assertFalse(page.has_previous())
+
+    def test_next_page(self):
+        """Following the next cursor should return the following rows."""
+        page = self.paginator.page(self.paginator.page(1).next_cursor)
+
+        self.assertEqual(list(page), self.occurrences[2:4])
+        self.assertTrue(page.has_next())
+        self.assertTrue(page.has_previous())
+
+    def test_last_page(self):
+        """The last page should not have a next cursor."""
+        page = self.paginator.page(1)
+        page = self.paginator.page(page.next_cursor)
+        page = self.paginator.page(page.next_cursor)
+
+        self.assertEqual(list(page), self.occurrences[4:])
+        self.assertFalse(page.has_next())
+
+    def test_previous_page(self):
+        """Following the previous cursor should return the preceding rows."""
+        page = self.paginator.page(self.paginator.page(1).next_cursor)
+        page = self.paginator.page(page.previous_cursor)
+
+        self.assertEqual(list(page), self.occurrences[:2])
+        self.assertTrue(page.has_next())
+        self.assertFalse(page.has_previous())
+
+    def test_invalid_cursor(self):
+        """Invalid cursors should raise PageNotAnInteger."""
+        with self.assertRaises(PageNotAnInteger):
+            self.paginator.page('not-a-cursor')
+
+    def test_no_count_or_offset(self):
+        """Fetching a page should not issue COUNT or OFFSET queries."""
+        cursor = self.paginator.page(1).next_cursor
+        with CaptureQueriesContext(connection) as queries:
+            list(self.paginator.page(cursor))
+
+        self.assertEqual(len(queries), 1)
+        sql = queries[0]['sql'].upper()
+        self.assertNotIn('COUNT(', sql)
+        self.assertNotIn('OFFSET', sql)
+
+
+class TestCursorPaginatedIndex(TestCase):
+    """Tests for using the CursorPaginator on an index page."""
+    def setUp(self):
+        self.index = factories.EventIndexFactory.create(parent=None, paginate_by=1)
+        self.index.paginator_class = CursorPaginator
+        detail = factories.EventDetailFactory.create(parent=self.index, show_in_menus=True)
+        self.occurrences = [
+            factories.EventOccurrenceFactory.create(
+                event=detail,
+                start_date=timezone.now() + timedelta(minutes=i),
+            )
+            for i in range(2)
+        ]
+
+    def test_get_context(self):
+        """The cursor querystring value should select the page."""
+        request = RequestFactory().get('', {'scope': 'all'})
+        request.is_preview = False
+        context = self.index.get_context(request)
+        page = context['children']['items']
+
+        self.assertEqual(context['page_kwarg'], 'cursor')
+        self.assertIsInstance(context['paginator'], CursorPaginator)
+        self.assertEqual(list(page), self.occurrences[:1])
+
+        request = RequestFactory().get('', {'scope': 'all', 'cursor': page.next_cursor})
+        request.is_preview = False
+        context = self.index.get_context(request)
+
+        self.assertEqual(list(context['children']['items']), self.occurrences[1:])
+
+    def test_bad_cursor(self):
+        """Invalid cursors should fall back to the first page."""
+        request = RequestFactory().get('', {'scope': 'all', 'cursor': '???'})
+        request.is_preview = False
+        context = self.index.get_context(request)
+
+        self.assertEqual(list(context['children']['items']), self.occurrences[:1])
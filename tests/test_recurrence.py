@@ -0,0 +1,257 @@
+# -*- coding:utf8 -*-
+
+from __future__ import unicode_literals
+
+from datetime import datetime, timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from tests.factories import EventDetailFactory, EventOccurrenceFactory
+from wagtail_events import date_filters, recurrence
+from wagtail_events.models import EventDetail, EventOccurrence
+from wagtail_events.paginators import CursorPaginator
+
+
+def make_datetime(*args):
+    """Create an aware datetime in the current timezone."""
+    return timezone.make_aware(datetime(*args), timezone.get_current_timezone())
+
+
+class TestRecurrenceRules(TestCase):
+    """Tests for the recurrence rule helpers."""
+    def setUp(self):
+        self.start = make_datetime(2026, 1, 5, 10)
+
+    def test_is_finite(self):
+        """Rules with a COUNT or UNTIL should be finite."""
+        self.assertTrue(recurrence.is_finite('RRULE:FREQ=WEEKLY;COUNT=3'))
+        self.assertTrue(recurrence.is_finite('FREQ=DAILY;UNTIL=20260110T000000'))
+        self.assertTrue(recurrence.is_finite('RDATE:20260110T100000'))
+        self.assertFalse(recurrence.is_finite('RRULE:FREQ=WEEKLY'))
+
+    def test_get_recurrence_end(self):
+        """get_recurrence_end should return the end of the last instance."""
+        response = recurrence.get_recurrence_end(
+            'RRULE:FREQ=WEEKLY;COUNT=3',
+            self.start,
+            self.start + timedelta(hours=2),
+        )
+        self.assertEqual(response, make_datetime(2026, 1, 19, 12))
+
+    def test_get_recurrence_end_infinite(self):
+        """Rules repeating forever have no end."""
+        self.assertIsNone(recurrence.get_recurrence_end('RRULE:FREQ=DAILY', self.start))
+
+    def test_validate_recurrence(self):
+        """Invalid rules should raise a ValueError."""
+        with self.assertRaises(ValueError):
+            recurrence.validate_recurrence('RRULE:FREQ=SOMETIMES', self.start)
+
+
+class TestRecurringOccurrences(TestCase):
+    """Tests for expanding recurring occurrences."""
+    def setUp(self):
+        self.detail = EventDetailFactory.create(parent=None)
+        self.start = make_datetime(2026, 1, 5, 10)
+        self.weekly = EventOccurrenceFactory.create(
+            event=self.detail,
+            start_date=self.start,
+            end_date=self.start + timedelta(hours=1),
+            recurrence='RRULE:FREQ=WEEKLY',
+        )
+
+    def get_range(self, start, end):
+        """Get the start dates of the occurrences in the date range."""
+        return [
+            occurrence.start_date
+            for occurrence in EventOccurrence.objects.in_date_range(start, end)
+        ]
+
+    def test_save(self):
+        """Saving should store whether the occurrence repeats and until when."""
+        self.assertTrue(self.weekly.is_recurring)
+        self.assertIsNone(self.weekly.recurrence_end)
+
+        self.weekly.recurrence = ''
+        self.weekly.save()
+        self.assertFalse(self.weekly.is_recurring)
+
+    def test_clean(self):
+        """Clean should raise a validation error for invalid rules."""
+        self.weekly.recurrence = 'RRULE:FREQ=SOMETIMES'
+        with self.assertRaises(ValidationError):
+            self.weekly.clean()
+
+    def test_in_date_range(self):
+        """Only the instances within the range should be generated."""
+        response = self.get_range(make_datetime(2027, 3, 1), make_datetime(2027, 3, 31))
+
+        self.assertEqual(len(response), 5)
+        self.assertEqual(response[0], make_datetime(2027, 3, 1, 10))
+
+    def test_instances(self):
+        """Instances should keep the duration of the recurring occurrence."""
+        occurrences = list(EventOccurrence.objects.in_date_range(
+            make_datetime(2026, 1, 12),
+            make_datetime(2026, 1, 13),
+        ))
+
+        self.assertEqual(len(occurrences), 1)
+        self.assertEqual(occurrences[0].pk, self.weekly.pk)
+        self.assertEqual(occurrences[0].start_date, make_datetime(2026, 1, 12, 10))
+        self.assertEqual(occurrences[0].end_date, make_datetime(2026, 1, 12, 11))
+
+    def test_merged_with_concrete(self):
+        """Instances should be merged in start_date order with concrete rows."""
+        concrete = EventOccurrenceFactory.create(
+            event=self.detail,
+            start_date=make_datetime(2026, 1, 8, 9),
+        )
+        occurrences = list(EventOccurrence.objects.in_date_range(
+            make_datetime(2026, 1, 5),
+            make_datetime(2026, 1, 13),
+        ))
+
+        self.assertEqual([o.pk for o in occurrences], [self.weekly.pk, concrete.pk, self.weekly.pk])
+
+    def test_exdate(self):
+        """Excluded dates should not be generated."""
+        self.weekly.recurrence = 'RRULE:FREQ=WEEKLY\nEXDATE:20260112T100000'
+        self.weekly.save()
+
+        response = self.get_range(make_datetime(2026, 1, 5), make_datetime(2026, 1, 20))
+        self.assertEqual(response, [make_datetime(2026, 1, 5, 10), make_datetime(2026, 1, 19, 10)])
+
+    def test_override(self):
+        """An occurrence with a recurrence_id should replace that instance."""
+        override = EventOccurrenceFactory.create(
+            event=self.detail,
+            start_date=make_datetime(2026, 1, 13, 15),
+            recurrence_id=make_datetime(2026, 1, 12, 10),
+        )
+        occurrences = list(EventOccurrence.objects.in_date_range(
+            make_datetime(2026, 1, 12),
+            make_datetime(2026, 1, 14),
+        ))
+
+        self.assertEqual(occurrences, [override])
+
+    def test_finished(self):
+        """Recurring occurrences that have finished should not be fetched."""
+        self.weekly.recurrence = 'RRULE:FREQ=WEEKLY;COUNT=2'
+        self.weekly.save()
+
+        self.assertEqual(self.get_range(make_datetime(2026, 2, 1), make_datetime(2026, 3, 1)), [])
+
+    def test_values(self):
+        """values() querysets should be expanded too."""
+        response = EventOccurrence.objects.in_date_range(
+            make_datetime(2026, 1, 5),
+            make_datetime(2026, 1, 20),
+        ).values('pk', 'start_date', 'recurrence', 'event_id')
+
+        self.assertEqual(len(response), 3)
+        self.assertEqual(response[2]['start_date'], make_datetime(2026, 1, 19, 10))
+
+    def test_count_and_slicing(self):
+        """count and slicing should include the generated instances."""
+        queryset = EventOccurrence.objects.in_date_range(
+            make_datetime(2026, 1, 5),
+            make_datetime(2026, 1, 31),
+        )
+
+        self.assertEqual(queryset.count(), 4)
+        self.assertEqual(queryset[1:3][0].start_date, make_datetime(2026, 1, 12, 10))
+
+    def test_slicing_merges_concrete_rows(self):
+        """Slices should merge the first concrete rows with the generated instances."""
+        concrete = EventOccurrenceFactory.create(event=self.detail, start_date=make_datetime(2026, 1, 12, 10))
+        queryset = EventOccurrence.objects.in_date_range(
+            make_datetime(2026, 1, 5),
+            make_datetime(2026, 1, 31),
+        ).order_by('start_date')
+
+        self.assertEqual(queryset.count(), 5)
+        self.assertEqual(
+            [(o.pk, o.start_date) for o in queryset[1:4]],
+            [
+                (concrete.pk, make_datetime(2026, 1, 12, 10)),
+                (self.weekly.pk, make_datetime(2026, 1, 12, 10)),
+                (self.weekly.pk, make_datetime(2026, 1, 19, 10)),
+            ],
+        )
+        self.assertEqual(queryset[4].start_date, make_datetime(2026, 1, 26, 10))
+
+    def test_slicing_without_recurring_rows(self):
+        """Without recurring rows, slices & counts should run in SQL."""
+        self.weekly.delete()
+        EventOccurrenceFactory.create_batch(3, event=self.detail, start_date=make_datetime(2026, 1, 12, 10))
+        queryset = EventOccurrence.objects.in_date_range(
+            make_datetime(2026, 1, 5),
+            make_datetime(2026, 1, 31),
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(queryset.count(), 3)
+            self.assertEqual(len(queryset[:2]), 2)
+
+        self.assertEqual(len(queries), 2)
+        self.assertIn('COUNT(', queries[0]['sql'].upper())
+        self.assertIn('LIMIT 2', queries[1]['sql'].upper())
+
+    def test_iterator(self):
+        """iterator should expand the recurring occurrences."""
+        queryset = EventOccurrence.objects.in_date_range(
+            make_datetime(2026, 1, 5),
+            make_datetime(2026, 1, 31),
+        )
+
+        self.assertEqual(len(list(queryset.iterator())), 4)
+
+    def test_agenda(self):
+        """The agendas should contain the generated instances."""
+        response = date_filters.get_month_agenda(
+            EventOccurrence,
+            EventDetail.objects.all(),
+            make_datetime(2026, 2, 1),
+        )
+
+        self.assertEqual(len(response['items']), 4)
+
+    def test_cursor_pagination(self):
+        """The CursorPaginator should page through the generated instances."""
+        paginator = CursorPaginator(EventOccurrence.objects.in_date_range(
+            make_datetime(2026, 1, 5),
+            make_datetime(2026, 1, 31),
+        ), 3)
+        page = paginator.page(1)
+        next_page = paginator.page(page.next_cursor)
+
+        self.assertEqual(len(page), 3)
+        self.assertEqual([o.start_date for o in next_page], [make_datetime(2026, 1, 26, 10)])
+
+    def test_cursor_pagination_merges_concrete_rows(self):
+        """The CursorPaginator should seek the concrete rows in SQL & merge the generated instances."""
+        concrete = EventOccurrenceFactory.create(event=self.detail, start_date=make_datetime(2026, 1, 20, 10))
+        paginator = CursorPaginator(EventOccurrence.objects.in_date_range(
+            make_datetime(2026, 1, 5),
+            make_datetime(2026, 1, 31),
+        ), 2)
+        page = paginator.page(paginator.page(1).next_cursor)
+        previous_page = paginator.page(page.previous_cursor)
+
+        self.assertEqual(
+            [(o.pk, o.start_date) for o in page],
+            [(self.weekly.pk, make_datetime(2026, 1, 19, 10)), (concrete.pk, make_datetime(2026, 1, 20, 10))],
+        )
+        self.assertEqual(
+            [o.start_date for o in previous_page],
+            [make_datetime(2026, 1, 5, 10), make_datetime(2026, 1, 12, 10)],
+        )
+        with CaptureQueriesContext(connection) as queries:
+            paginator.page(page.next_cursor)
+        self.assertTrue(any('LIMIT 3' in query['sql'].upper() for query in queries))
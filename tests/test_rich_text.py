@@ -0,0 +1,101 @@
+# -*- coding:utf8 -*-
+
+from __future__ import unicode_literals
+
+from django.test import TestCase
+from django.utils import timezone
+from wagtail_factories import SiteFactory
+
+from tests import factories
+from wagtail_events import cache
+from wagtail_events import rich_text
+from wagtail_events.models import EventOccurrence
+from wagtail_events.templatetags.wagtail_events_tags import cached_richtext
+
+
+class TestRichText(TestCase):
+    """Tests for the rendered rich text cache."""
+    def setUp(self):
+        cache.get_cache().clear()
+        self.index = factories.EventIndexFactory.create(parent=None)
+        SiteFactory.create(root_page=self.index)
+        self.target = factories.EventDetailFactory.create(parent=self.index, slug='target')
+        self.detail = factories.EventDetailFactory.create(parent=self.index)
+        self.body = '<p><a linktype="page" id="{}">Target</a></p>'.format(self.target.pk)
+        self.occurrences = [
+            factories.EventOccurrenceFactory.create(
+                event=self.detail,
+                start_date=timezone.now(),
+                body=self.body,
+            )
+            for i in range(3)
+        ]
+        # Warm the site root paths cache used to build page urls.
+        self.target.url
+
+    def tearDown(self):
+        # Wagtail caches the site root paths.
+        cache.get_cache().clear()
+
+    def get_occurrences(self):
+        """Fetch the occurrences from the database."""
+        return list(EventOccurrence.objects.filter(event=self.detail).order_by('pk'))
+
+    def test_get_page_ids(self):
+        """get_page_ids should only find internal page links."""
+        html = '<a linktype="page" id="3">a</a><a href="/b/">b</a><a linktype="page" id="x">c</a>'
+
+        self.assertEqual(rich_text.get_page_ids(html), {3})
+
+    def test_expand_rich_text(self):
+        """Page links should be expanded from the urls given."""
+        html = '<a linktype="page" id="3">a</a><a linktype="page" id="4">b</a><a href="/c/">c</a>'
+
+        self.assertEqual(
+            rich_text.expand_rich_text(html, {3: '/a/?b&c'}),
+            '<a href="/a/?b&amp;c">a</a><a>b</a><a href="/c/">c</a>',
+        )
+
+    def test_prime_rich_text(self):
+        """The page links of every body should be resolved with one query."""
+        occurrences = self.get_occurrences()
+        with self.assertNumQueries(2):
+            rich_text.prime_rich_text(occurrences)
+
+        expected = '<p><a href="{}">Target</a></p>'.format(self.target.url)
+        with self.assertNumQueries(0):
+            self.assertEqual([rich_text.render_rich_text(o) for o in occurrences], [expected] * 3)
+
+    def test_cached(self):
+        """Rendered bodies should be reused by other instances."""
+        rich_text.prime_rich_text(self.get_occurrences())
+        occurrences = self.get_occurrences()
+        with self.assertNumQueries(0):
+            rich_text.prime_rich_text(occurrences)
+
+    def test_content_changed(self):
+        """Changing a body should change its cache key."""
+        occurrence = self.occurrences[0]
+        rich_text.render_rich_text(occurrence)
+        occurrence.body = '<p>Changed</p>'
+        occurrence.save()
+
+        self.assertEqual(rich_text.render_rich_text(self.get_occurrences()[0]), '<p>Changed</p>')
+
+    def test_page_moved(self):
+        """Publishing a linked page should invalidate the rendered bodies."""
+        rich_text.render_rich_text(self.occurrences[0])
+        self.target.slug = 'moved'
+        self.target.save_revision().publish()
+
+        self.assertIn('/moved/', rich_text.render_rich_text(self.get_occurrences()[0]))
+
+    def test_cached_richtext(self):
+        """The filter should wrap the rendered html like wagtail's richtext."""
+        response = cached_richtext(self.get_occurrences()[0])
+
+        self.assertEqual(
+            response,
+            '<div class="rich-text"><p><a href="{}">Target</a></p></div>'.format(self.target.url),
+        )
+        self.assertEqual(cached_richtext(None), '')
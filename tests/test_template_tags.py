@@ -2,9 +2,13 @@
 
 from __future__ import unicode_literals
 
-from django.test import RequestFactory, TestCase
+from datetime import timedelta
+
+from django.test import RequestFactory, TestCase, override_settings
 from django.utils import timezone
 
+from tests import factories
+from wagtail_events.cache import get_cache
 from wagtail_events.templatetags import wagtail_events_tags
 
 
@@ -68,3 +72,76 @@ class TestPatch(TestCase):
             response,
             '?start_date={}'.format(time.strftime('%Y.%m.%d')),
         )
+
+    def test_patch_start_date_empty(self):
+        """Test patch_start_date handles agendas without a non-empty date."""
+        response = wagtail_events_tags.patch_start_date(self.context, None)
+
+        self.assertEqual(response, '')
+
+
+class TestUpcomingEvents(TestCase):
+    """Tests for the upcoming_events template tag."""
+    def setUp(self):
+        get_cache().clear()
+        self.index = factories.EventIndexFactory.create(parent=None)
+        self.detail = factories.EventDetailFactory.create(parent=self.index, show_in_menus=True)
+        self.now = timezone.now().replace(microsecond=0)
+        self.context = {'request': RequestFactory().get('/')}
+        self.past = factories.EventOccurrenceFactory.create(
+            event=self.detail,
+            start_date=self.now - timedelta(days=1),
+        )
+        self.instances = [
+            factories.EventOccurrenceFactory.create(event=self.detail, start_date=self.now + timedelta(days=days))
+            for days in (3, 1, 2)
+        ]
+
+    def test_upcoming(self):
+        """The next occurrences should be listed in start_date order."""
+        response = wagtail_events_tags.upcoming_events(self.context, self.index, 2)
+
+        self.assertEqual(response, [self.instances[1], self.instances[2]])
+
+    def test_count(self):
+        """Counts given as strings should be read, & counts below one should list nothing."""
+        self.assertEqual(wagtail_events_tags.upcoming_events(self.context, self.index, '1'), [self.instances[1]])
+        for count in (0, -1):
+            with self.assertNumQueries(0):
+                self.assertEqual(wagtail_events_tags.upcoming_events(self.context, self.index, count), [])
+
+    def test_recurring(self):
+        """The instances of recurring occurrences should be listed."""
+        weekly = factories.EventOccurrenceFactory.create(
+            event=self.detail,
+            start_date=self.now - timedelta(days=6, hours=12),
+            recurrence='RRULE:FREQ=WEEKLY;COUNT=3',
+        )
+
+        response = wagtail_events_tags.upcoming_events(self.context, self.index, 2)
+
+        self.assertEqual([occurrence.pk for occurrence in response], [weekly.pk, self.instances[1].pk])
+        self.assertEqual(response[0].start_date, weekly.start_date + timedelta(weeks=1))
+
+    def test_site(self):
+        """Every EventIndex should be listed without an index."""
+        index = factories.EventIndexFactory.create(parent=None)
+        detail = factories.EventDetailFactory.create(parent=index, show_in_menus=True)
+        instance = factories.EventOccurrenceFactory.create(event=detail, start_date=self.now + timedelta(hours=1))
+
+        response = wagtail_events_tags.upcoming_events(self.context, None, 2)
+
+        self.assertEqual(response, [instance, self.instances[1]])
+
+    @override_settings(WAGTAIL_EVENTS_AGENDA_CACHE=True)
+    def test_cached(self):
+        """Warm hits should not query the database, until the occurrences change."""
+        response = wagtail_events_tags.upcoming_events(self.context, self.index, 2)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(wagtail_events_tags.upcoming_events(self.context, self.index, 2), response)
+
+        instance = factories.EventOccurrenceFactory.create(event=self.detail, start_date=self.now + timedelta(hours=1))
+
+        self.assertEqual(wagtail_events_tags.upcoming_events(self.context, self.index, 2)[0], instance)
+        self.assertEqual(wagtail_events_tags.upcoming_events(self.context, None, 1), [instance])
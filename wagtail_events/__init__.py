@@ -7,3 +7,5 @@ from __future__ import unicode_literals
 
 
 __version__ = '1.1.2'
+
+default_app_config = 'wagtail_events.apps.WagtailEventsAppConfig'
@@ -8,8 +8,10 @@ from django.db import models
 from wagtail.wagtailadmin.edit_handlers import FieldPanel
 from wagtail.wagtailcore.models import Page
 
+from wagtail_events import instrumentation
+from wagtail_events import recurrence
 from wagtail_events.managers import EventOccurrenceManager
-from wagtail_events.utils import _DATE_FORMAT_RE
+from wagtail_events.utils import _DATE_FORMAT_RE, get_duration_bucket
 
 
 class AbstractPaginatedIndex(Page):
@@ -66,6 +68,7 @@ class AbstractPaginatedIndex(Page):
         paginator_class = self.get_paginator_class()
         return paginator_class(*args, **kwargs)
 
+    @instrumentation.instrumented('paginate_queryset', rows=lambda value: instrumentation.count_rows(value[0]))
     def paginate_queryset(self, queryset, page):
         """
         Helper method for paginating the queryset provided.
@@ -87,6 +90,7 @@ class AbstractPaginatedIndex(Page):
             queryset = paginator.page(paginator.num_pages)
         return queryset, paginator
 
+    @instrumentation.instrumented('get_context', rows=lambda value: instrumentation.count_rows(value['children']))
     def get_context(self, request, *args, **kwargs):
         """
         Adds child pages to the context and paginates them.
@@ -105,10 +109,15 @@ class AbstractPaginatedIndex(Page):
         is_paginated = False
         paginator = None
 
-        # Paginate the child nodes if paginate_by has been specified
-        if self.paginate_by:
+        # Paginators can read their position from a different querystring
+        # value, e.g. 'cursor' for the CursorPaginator.
+        page_kwarg = getattr(self.get_paginator_class(), 'page_kwarg', 'page')
+
+        # Paginate the child nodes if paginate_by has been specified, calendar
+        # grids list the first occurrences of each day instead.
+        if self.paginate_by and 'weeks' not in queryset:
             is_paginated = True
-            page_num = request.GET.get('page', 1) or 1
+            page_num = request.GET.get(page_kwarg, 1) or 1
             queryset['items'], paginator = self.paginate_queryset(
                 queryset['items'],
                 page_num
@@ -117,7 +126,8 @@ class AbstractPaginatedIndex(Page):
         context.update(
             children=queryset,
             paginator=paginator,
-            is_paginated=is_paginated
+            is_paginated=is_paginated,
+            page_kwarg=page_kwarg,
         )
         return context
 
@@ -128,21 +138,62 @@ class AbstractEventIndex(AbstractPaginatedIndex):
         """Django model meta options."""
         abstract = True
 
+    #: Occurrence fields fetched for the agenda listing, so RichText bodies
+    #: aren't loaded. Subclasses can add the fields their templates display,
+    #: or set it to None to fetch every field.
+    listing_fields = ('pk', 'title', 'start_date', 'end_date', 'event_id')
+
     def get_dateformat(self):
         """Returns the dateformat."""
         return _DATE_FORMAT_RE
 
+    def get_listing_fields(self):
+        """
+        Returns the occurrence fields fetched for the agenda listing, with
+        the fields needed to expand recurring occurrences and link to them.
+
+        :return: list of field names, or None to fetch every field
+        """
+        if self.listing_fields is None:
+            return None
+        return list(self.listing_fields) + ['recurrence', 'event__title', 'event__url_path']
+
 
 class AbstractEventOccurrence(models.Model):
     """ """
     title = models.CharField(max_length=255)
     start_date = models.DateTimeField()
     end_date = models.DateTimeField(blank=True, null=True)
+    recurrence = models.TextField(
+        blank=True,
+        help_text=(
+            'Repeat this date using RFC 5545 RRULE, RDATE and EXDATE lines, '
+            'e.g. "RRULE:FREQ=WEEKLY;COUNT=10". Dates are read as local times.'
+        ),
+    )
+    recurrence_id = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text=(
+            'Replace a single date of a repeating date of the same event, '
+            'by entering the original start date of that date.'
+        ),
+    )
+    is_recurring = models.BooleanField(default=False, editable=False, db_index=True)
+    recurrence_end = models.DateTimeField(blank=True, null=True, editable=False)
+    duration_bucket = models.PositiveSmallIntegerField(default=0, editable=False)
+    uid = models.CharField(
+        max_length=255,
+        blank=True,
+        editable=False,
+        help_text='Identifier of the date in the system it was imported from.',
+    )
 
     class Meta(object):
         """Django model meta options."""
         abstract = True
         ordering = ['start_date']
+        index_together = [['start_date', 'end_date'], ['duration_bucket', 'start_date']]
 
     objects = EventOccurrenceManager()
 
@@ -150,6 +201,8 @@ class AbstractEventOccurrence(models.Model):
         FieldPanel('title'),
         FieldPanel('start_date'),
         FieldPanel('end_date'),
+        FieldPanel('recurrence'),
+        FieldPanel('recurrence_id'),
     ]
 
     def clean(self):
@@ -160,3 +213,25 @@ class AbstractEventOccurrence(models.Model):
                 raise ValidationError({
                     'end_date': 'The end date cannot be before the start date.'
                 })
+        if self.recurrence.strip() and self.start_date:
+            try:
+                recurrence.validate_recurrence(self.recurrence, self.start_date)
+            except ValueError as e:
+                raise ValidationError({'recurrence': '{}'.format(e)})
+
+    def set_range_fields(self):
+        """Store the duration & range covered by the recurrence rules, for range queries."""
+        self.duration_bucket = get_duration_bucket(self.start_date, self.end_date)
+        self.is_recurring = bool(self.recurrence.strip())
+        self.recurrence_end = None
+        if self.is_recurring:
+            self.recurrence_end = recurrence.get_recurrence_end(
+                self.recurrence,
+                self.start_date,
+                self.end_date,
+            )
+
+    def save(self, *args, **kwargs):
+        """Set the range fields, which bulk inserts & updates have to set themselves."""
+        self.set_range_fields()
+        super(AbstractEventOccurrence, self).save(*args, **kwargs)
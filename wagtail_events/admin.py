@@ -0,0 +1,142 @@
+# -*- coding:utf8 -*-
+"""
+Wagtail events admin listing & rescheduling of occurrences, see wagtail_hooks.
+"""
+
+from __future__ import unicode_literals
+
+from datetime import timedelta
+
+from django import forms
+from django.contrib import messages
+from django.core.exceptions import PermissionDenied
+from django.http import Http404
+from django.shortcuts import get_object_or_404, redirect, render
+from wagtail.contrib.modeladmin.options import ModelAdmin
+from wagtail.contrib.modeladmin.views import CreateView, EditView
+from wagtail.wagtailadmin.edit_handlers import ObjectList, PageChooserPanel
+from wagtail.wagtailadmin.widgets import AdminDateTimeInput
+
+from wagtail_events.models import EventDetail, EventOccurrence
+from wagtail_events.utils import occurrences_detached
+
+
+class EventOccurrenceFormMixin(object):
+    """Edit occurrences with their panels & an EventDetail chooser."""
+    def get_edit_handler_class(self):
+        """Returns the edit handler of the occurrence form."""
+        panels = [PageChooserPanel('event', 'wagtail_events.EventDetail')] + self.model.panels
+        return ObjectList(panels).bind_to_model(self.model)
+
+
+class EventOccurrenceCreateView(EventOccurrenceFormMixin, CreateView):
+    """Create an occurrence."""
+
+
+class EventOccurrenceEditView(EventOccurrenceFormMixin, EditView):
+    """Edit an occurrence."""
+
+
+class EventOccurrenceAdmin(ModelAdmin):
+    """Paginated & searchable admin listing of the occurrences."""
+    model = EventOccurrence
+    menu_label = 'Event dates'
+    menu_icon = 'date'
+    list_display = ('title', 'event', 'start_date', 'end_date', 'live')
+    list_filter = ('live',)
+    list_per_page = 50
+    list_select_related = ('event',)
+    search_fields = ('title', 'event__title')
+    ordering = ('-start_date',)
+    create_view_class = EventOccurrenceCreateView
+    edit_view_class = EventOccurrenceEditView
+
+
+class RescheduleForm(forms.Form):
+    """Move, copy or delete the occurrences of an event within a date range."""
+    action = forms.ChoiceField(choices=(
+        ('shift', 'Move the dates'),
+        ('clone', 'Copy the dates'),
+        ('delete', 'Delete the dates'),
+    ))
+    start_date = forms.DateTimeField(
+        label='From',
+        widget=AdminDateTimeInput,
+        help_text='The dates starting from this date are changed.',
+    )
+    end_date = forms.DateTimeField(
+        label='Until',
+        required=False,
+        widget=AdminDateTimeInput,
+        help_text='Leave empty to change every later date.',
+    )
+    days = forms.IntegerField(initial=7, required=False, help_text='Days to move or copy the dates by.')
+    hours = forms.IntegerField(initial=0, required=False, help_text='Hours to move or copy the dates by.')
+
+    def clean(self):
+        """Check the date range & offset."""
+        cleaned_data = super(RescheduleForm, self).clean()
+        start_date = cleaned_data.get('start_date')
+        end_date = cleaned_data.get('end_date')
+        if start_date and end_date and end_date < start_date:
+            self.add_error('end_date', 'The end date cannot be before the start date.')
+        if cleaned_data.get('action') != 'delete' and not self.get_delta():
+            self.add_error('days', 'Enter the days or hours to move or copy the dates by.')
+        return cleaned_data
+
+    def get_delta(self):
+        """Returns the timedelta to move or copy the occurrences by."""
+        return timedelta(
+            days=self.cleaned_data.get('days') or 0,
+            hours=self.cleaned_data.get('hours') or 0,
+        )
+
+    def get_queryset(self, event_detail):
+        """
+        Get the occurrences to change.
+
+        :param event_detail: EventDetail instance
+        :return: EventOccurrence queryset
+        """
+        queryset = EventOccurrence.objects.filter(event=event_detail, start_date__gte=self.cleaned_data['start_date'])
+        if self.cleaned_data['end_date']:
+            queryset = queryset.filter(start_date__lte=self.cleaned_data['end_date'])
+        return queryset
+
+    def save(self, event_detail):
+        """
+        Change the occurrences with a single statement.
+
+        :param event_detail: EventDetail instance
+        :return: number of occurrences changed
+        """
+        queryset = self.get_queryset(event_detail)
+        action = self.cleaned_data['action']
+        if action == 'delete':
+            return queryset.bulk_delete()
+        return getattr(queryset, 'bulk_{}'.format(action))(self.get_delta())
+
+
+def reschedule_view(request, page_id):
+    """
+    Move, copy or delete the occurrences of an event, which goes live at
+    once, so the page publish permission is required. Only detached
+    occurrences can be rescheduled, the revisions of attached occurrences
+    would revert the changes.
+
+    :param request: django request
+    :param page_id: EventDetail id
+    :return: django response
+    """
+    if not occurrences_detached():
+        raise Http404
+    page = get_object_or_404(EventDetail, pk=page_id)
+    if not page.permissions_for_user(request.user).can_publish():
+        raise PermissionDenied
+
+    form = RescheduleForm(request.POST or None)
+    if form.is_valid():
+        count = form.save(page)
+        messages.success(request, 'Changed {} dates of "{}".'.format(count, page.title))
+        return redirect('wagtailadmin_explore', page.get_parent().pk)
+    return render(request, 'wagtail_events/admin/reschedule.html', {'page': page, 'form': form})
@@ -0,0 +1,35 @@
+# -*- coding:utf8 -*-
+"""
+Wagtail events app config.
+"""
+
+from __future__ import unicode_literals
+
+from django.apps import AppConfig, apps
+from django.core.exceptions import ImproperlyConfigured
+
+
+class WagtailEventsAppConfig(AppConfig):
+    """Django app config for wagtail_events."""
+    name = 'wagtail_events'
+    verbose_name = 'Wagtail events'
+
+    def check_settings(self):
+        """
+        Check the admin listing of detached occurrences can be registered,
+        otherwise they couldn't be edited at all.
+
+        :raises ImproperlyConfigured: when the occurrences are detached
+            without wagtail.contrib.modeladmin installed
+        """
+        from wagtail_events.utils import occurrences_detached
+        if occurrences_detached() and not apps.is_installed('wagtail.contrib.modeladmin'):
+            raise ImproperlyConfigured(
+                'WAGTAIL_EVENTS_DETACHED_OCCURRENCES requires wagtail.contrib.modeladmin in INSTALLED_APPS.'
+            )
+
+    def ready(self):
+        """Check the settings & connect the signal handlers once the models are loaded."""
+        from wagtail_events.signal_handlers import register_signal_handlers
+        self.check_settings()
+        register_signal_handlers()
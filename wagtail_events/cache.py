@@ -0,0 +1,157 @@
+# -*- coding:utf8 -*-
+"""
+Wagtail events caching utilities.
+
+Cached values are keyed by a version counter which is bumped whenever the
+data they were built from changes, so stale entries are never looked up
+again and simply expire.
+"""
+
+from __future__ import unicode_literals
+
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+def get_cache():
+    """Returns the cache backend configured for wagtail_events."""
+    return caches[getattr(settings, 'WAGTAIL_EVENTS_CACHE_ALIAS', 'default')]
+
+
+def _get_version_key(name):
+    """Returns the cache key of the named version counter."""
+    return 'wagtail_events:version:{}'.format(name)
+
+
+def get_version(name):
+    """
+    Get the current value of a version counter.
+
+    Missing counters start from the current time, so a counter that has been
+    evicted from the cache never reuses a value handed out before.
+
+    :param name: version counter name
+    :return: int
+    """
+    cache = get_cache()
+    key = _get_version_key(name)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(name):
+    """
+    Increment a version counter, invalidating everything cached against it.
+
+    :param name: version counter name
+    :return: int, the new version
+    """
+    cache = get_cache()
+    key = _get_version_key(name)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # The counter doesn't exist yet.
+        return get_version(name)
+
+
+def get_index_version_name(index_id):
+    """Returns the name of the version counter for an EventIndex."""
+    return 'index:{}'.format(index_id)
+
+
+#: Bumped with the version of any EventIndex, for data read from every index.
+ALL_INDEXES_VERSION_NAME = 'index:all'
+
+
+def get_index_version(index_id):
+    """Returns the current version of the given EventIndex."""
+    return get_version(get_index_version_name(index_id))
+
+
+def get_all_indexes_version():
+    """Returns the current version of the data read from every EventIndex."""
+    return get_version(ALL_INDEXES_VERSION_NAME)
+
+
+def bump_index_version(index_id):
+    """Invalidates everything cached for the given EventIndex."""
+    bump_version(ALL_INDEXES_VERSION_NAME)
+    return bump_version(get_index_version_name(index_id))
+
+
+RICH_TEXT_VERSION_NAME = 'rich_text'
+
+
+def get_rich_text_version():
+    """Returns the current version of the rendered rich text."""
+    return get_version(RICH_TEXT_VERSION_NAME)
+
+
+def bump_rich_text_version():
+    """Invalidates all the rendered rich text, e.g. when page urls change."""
+    return bump_version(RICH_TEXT_VERSION_NAME)
+
+
+class AgendaCache(object):
+    """Caches the agendas built for an EventIndex."""
+    key_prefix = 'wagtail_events:agenda'
+
+    #: Cached instead of the agendas too large to be cached, so they're not
+    #: evaluated again to find out.
+    too_large = 'too_large'
+
+    def __init__(self, index, timeout=None, max_items=None):
+        self.index = index
+        if timeout is None:
+            timeout = getattr(settings, 'WAGTAIL_EVENTS_AGENDA_CACHE_TIMEOUT', 300)
+        self.timeout = timeout
+        if max_items is None:
+            max_items = getattr(settings, 'WAGTAIL_EVENTS_AGENDA_CACHE_MAX_ITEMS', 200)
+        self.max_items = max_items
+
+    def make_key(self, *parts):
+        """
+        Build the cache key for an agenda.
+
+        :param parts: values identifying the agenda, e.g. scope & start_date
+        :return: cache key string
+        """
+        return ':'.join(['{}'.format(part) for part in (
+            self.key_prefix,
+            self.index.pk,
+            get_index_version(self.index.pk),
+        ) + parts])
+
+    def get(self, *parts):
+        """Returns the cached agenda, too_large when it's too large to be cached, or None."""
+        return get_cache().get(self.make_key(*parts))
+
+    def set(self, agenda, *parts):
+        """
+        Cache an agenda, evaluating its items. Agendas of more than
+        max_items items aren't cached, as cache backends limit the size of
+        the values they store, e.g. to 1 MB for memcached.
+
+        :param agenda: agenda data dictionary
+        :param parts: values identifying the agenda, e.g. scope & start_date
+        :return: the agenda, with its items evaluated to a list, or unchanged
+            when it's too large to be cached, too_large is cached instead
+        """
+        if 'weeks' in agenda:
+            # Keep the occurrences listed in the calendar grid rather than
+            # fetching every occurrence in its range.
+            items = [item for week in agenda['weeks'] for day in week for item in day['items']]
+        else:
+            items = list(agenda['items'][:self.max_items + 1])
+        if len(items) > self.max_items:
+            get_cache().set(self.make_key(*parts), self.too_large, self.timeout)
+            return agenda
+        agenda = dict(agenda, items=items)
+        get_cache().set(self.make_key(*parts), agenda, self.timeout)
+        return agenda
@@ -0,0 +1,115 @@
+# -*- coding:utf8 -*-
+"""
+Wagtail events conflict detection.
+
+Overlapping occurrences are found with a sweep over their start dates: the
+occurrences still running are kept in a heap ordered by their end date, so
+each occurrence is only compared with the occurrences it overlaps, rather
+than with every other occurrence.
+"""
+
+from __future__ import unicode_literals
+
+import heapq
+import itertools
+from collections import namedtuple
+from operator import attrgetter
+
+from django.utils import timezone
+
+#: The period of an occurrence, occurrences without an end date last an instant.
+Interval = namedtuple('Interval', ['start', 'end', 'pk', 'event_id'])
+
+
+def get_conflict_message(interval):
+    """
+    Describe a conflict with an interval, for validation errors.
+
+    :param interval: Interval tuple of the overlapped occurrence
+    :return: message
+    """
+    return 'This date overlaps the date starting {}.'.format(
+        timezone.localtime(interval.start).strftime('%Y-%m-%d %H:%M'),
+    )
+
+
+def iter_conflicts(intervals):
+    """
+    Find the overlapping pairs of intervals, in O(n log n + k) for n
+    intervals & k pairs. Intervals overlap when one starts before the other
+    ends, or when both start at the same time.
+
+    :param intervals: iterable of Interval tuples, sorted by start
+    :return: generator of (Interval, Interval) tuples, the earliest first
+    """
+    running = []
+    counter = itertools.count()
+    for start, group in itertools.groupby(intervals, key=attrgetter('start')):
+        while running and running[0][0] <= start:
+            heapq.heappop(running)
+        group = list(group)
+        for position, interval in enumerate(group):
+            for end, index, other in running:
+                yield other, interval
+            for other in group[:position]:
+                yield other, interval
+        for interval in group:
+            heapq.heappush(running, (interval.end, next(counter), interval))
+
+
+def find_conflicts(intervals, same_event=False):
+    """
+    Find the overlapping pairs of intervals.
+
+    :param intervals: iterable of Interval tuples, in any order
+    :param same_event: only find the pairs of the same EventDetail
+    :return: list of (Interval, Interval) tuples
+    """
+    if not same_event:
+        return list(iter_conflicts(sorted(intervals, key=attrgetter('start'))))
+    conflicts = []
+    intervals = sorted(intervals, key=attrgetter('event_id', 'start'))
+    for event_id, group in itertools.groupby(intervals, key=attrgetter('event_id')):
+        conflicts.extend(iter_conflicts(group))
+    return conflicts
+
+
+def get_intervals(queryset, start=None, end=None):
+    """
+    Read the intervals of occurrences, without building model instances.
+
+    :param queryset: EventOccurrence queryset
+    :param start: aware datetime, recurring occurrences are expanded from
+        then, otherwise they're only read at their first date
+    :param end: aware datetime, the end of the range to expand
+    :return: generator of Interval tuples, sorted by start
+    """
+    if start is not None:
+        queryset = queryset.in_date_range(start, end, overlap=True)
+    rows = queryset.order_by('start_date').values('pk', 'event_id', 'start_date', 'end_date', 'recurrence')
+    for row in rows.iterator():
+        yield Interval(row['start_date'], row['end_date'] or row['start_date'], row['pk'], row['event_id'])
+
+
+def find_occurrence_conflicts(occurrence, queryset):
+    """
+    Find the occurrences overlapping one occurrence.
+
+    :param occurrence: EventOccurrence instance, saved or not
+    :param queryset: EventOccurrence queryset of the occurrences to compare
+        it with, e.g. the other occurrences of its EventDetail
+    :return: list of Interval tuples
+    """
+    interval = Interval(
+        occurrence.start_date,
+        occurrence.end_date or occurrence.start_date,
+        occurrence.pk,
+        occurrence.event_id,
+    )
+    others = get_intervals(queryset.exclude(pk=occurrence.pk), interval.start, interval.end)
+    intervals = sorted(itertools.chain([interval], others), key=attrgetter('start'))
+    return [
+        first if second is interval else second
+        for first, second in iter_conflicts(intervals)
+        if first is interval or second is interval
+    ]
@@ -5,19 +5,135 @@ Wagtail events date filters.
 
 from __future__ import unicode_literals
 
+from bisect import bisect_left
+from collections import defaultdict
 from datetime import datetime, timedelta
 from isoweek import Week
+from operator import attrgetter
 
-from wagtail_events import utils
+from django.db import connections
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
 
+from wagtail_events import recurrence, utils
 
-def get_year_agenda(model, queryset, start_date):
+
+def get_occurrences(model, queryset):
+    """
+    Get the occurrences to list.
+
+    :param model: EventInstance model class
+    :param queryset: EventInstance queryset of the occurrences to list, or
+        queryset of the events to list the occurrences of
+    :return: EventInstance queryset
+    """
+    if queryset.model is model:
+        # A single table scan, rather than a subquery on the events.
+        return queryset
+    return model.objects.filter(event__in=queryset)
+
+
+def get_items(model, queryset, start_date, end_date, overlap=False):
+    """
+    Get the occurrences starting within a date range.
+
+    :param model: EventInstance model class
+    :param queryset: EventInstance or event queryset, see get_occurrences
+    :param start_date: start of the range
+    :param end_date: end of the range, inclusive
+    :param overlap: also get the occurrences which started before the range
+        and end within or after it
+    :return: EventInstance queryset
+    """
+    occurrences = get_occurrences(model, queryset).in_date_range(start_date, end_date, overlap)
+    return occurrences.select_related('event')
+
+
+def get_upcoming(model, queryset, count, now=None):
+    """
+    Get the next occurrences, without evaluating every future occurrence.
+
+    The concrete occurrences are read with a single start_date >= now LIMIT
+    count query, and the recurring occurrences are only expanded until the
+    last of them.
+
+    :param model: EventInstance model class
+    :param queryset: EventInstance or event queryset, see get_occurrences
+    :param count: number of occurrences
+    :param now: aware datetime, defaults to the current time
+    :return: list of EventInstance instances, with their events selected
+    """
+    if count <= 0:
+        return []
+    now = now or timezone.now()
+    occurrences = get_occurrences(model, queryset).select_related('event')
+    items = list(occurrences.filter(is_recurring=False, start_date__gte=now).order_by('start_date', 'pk')[:count])
+    end = items[-1].start_date if len(items) == count else now + timedelta(days=366)
+    instances = [
+        instance
+        for instance in occurrences.filter(is_recurring=True).in_date_range(now, end)
+        if instance.start_date >= now
+    ]
+    if instances:
+        items = sorted(items + instances, key=attrgetter('start_date'))[:count]
+    return items
+
+
+def get_nonempty_date(model, queryset, date, before=False):
+    """
+    Get the first day after a date on which an event occurs, or the last
+    day before it.
+
+    Concrete occurrences are found with a single query ordered by start_date
+    & limited to one row, recurring occurrences are checked separately.
+
+    :param model: EventInstance model class
+    :param queryset: EventInstance or event queryset, see get_occurrences
+    :param date: datetime to look from, the start of a period to look
+        before it, or the exclusive end of a period to look after it
+    :param before: look for the last day before the date
+    :return: start of the day, or None when no event occurs from the date
+    """
+    occurrences = get_occurrences(model, queryset)
+    if before:
+        concrete = occurrences.filter(start_date__lt=date).order_by('-start_date')
+        recurring = occurrences.filter(start_date__lt=date)
+    else:
+        concrete = occurrences.filter(start_date__gte=date).order_by('start_date')
+        recurring = occurrences.filter(Q(recurrence_end__isnull=True) | Q(recurrence_end__gte=date))
+
+    dates = list(concrete.filter(is_recurring=False).values_list('start_date', flat=True)[:1])
+    for start_date, rules in recurring.filter(is_recurring=True).values_list('start_date', 'recurrence'):
+        value = recurrence.get_adjacent_instance(rules, start_date, date, before, inc=not before)
+        if value is not None:
+            dates.append(value)
+
+    if not dates:
+        return None
+    value = max(dates) if before else min(dates)
+    return utils.date_to_datetime(timezone.localtime(value).date())
+
+
+def lazy_nonempty_date(model, queryset, date, before=False):
+    """
+    Get the day with events after or before a date, looked up only if it's
+    used, see get_nonempty_date.
+
+    :return: lazy datetime or None
+    """
+    return SimpleLazyObject(lambda: get_nonempty_date(model, queryset, date, before))
+
+
+def get_year_agenda(model, queryset, start_date, overlap=False):
     """
     Get list of events that will occur in the given year.
 
     :param queryset: EventInstance queryset
     :param start_date: period start_date
     :type start_date: datetime.datetime()
+    :param overlap: include the events which started before the year
     :return: data dictionary
     """
 
@@ -28,56 +144,69 @@ def get_year_agenda(model, queryset, start_date):
         'start_date': start_date,
         'end_date': end_date,
         'scope': 'Year',
-        'items': model.objects.in_date_range(
+        'items': get_items(
+            model,
+            queryset,
             start_date,
-            utils.date_to_datetime(end_date, 'max')
-        ).filter(event__in=queryset),
+            utils.date_to_datetime(end_date) - timedelta(microseconds=1),
+            overlap,
+        ),
         'next_date': utils.date_to_datetime(
             utils.add_months(start_date.date(), 12)
         ),
         'previous_date': utils.date_to_datetime(
             utils.remove_months(start_date.date(), 12)
         ),
+        'next_nonempty_date': lazy_nonempty_date(model, queryset, utils.date_to_datetime(end_date)),
+        'previous_nonempty_date': lazy_nonempty_date(
+            model,
+            queryset,
+            utils.date_to_datetime(start_date.date()),
+            before=True,
+        ),
     }
 
 
-def get_month_agenda(model, queryset, start_date):
+def get_month_agenda(model, queryset, start_date, overlap=False):
     """
     Get list of events that will occur in the given week.
 
     :param queryset: EventInstance queryset
     :param start_date: period start_date
     :type start_date: datetime.datetime()
+    :param overlap: include the events which started before the month
     :return: data dictionary
     """
     start_date = datetime(start_date.year, start_date.month, 1)
-    end_date = utils.date_to_datetime(
-        utils.add_months(start_date.date(), 1),
-        'max'
-    )
+    next_date = utils.date_to_datetime(utils.add_months(start_date.date(), 1))
+    end_date = next_date - timedelta(microseconds=1)
     return {
         'start_date': start_date,
         'end_date': end_date,
         'scope': 'Month',
-        'items': model.objects.in_date_range(start_date, end_date).filter(
-            event__in=queryset
-        ),
-        'next_date': utils.date_to_datetime(
-            utils.add_months(start_date.date(), 1)
-        ),
+        'items': get_items(model, queryset, start_date, end_date, overlap),
+        'next_date': next_date,
         'previous_date': utils.date_to_datetime(
             utils.remove_months(start_date.date(), 1)
         ),
+        'next_nonempty_date': lazy_nonempty_date(model, queryset, next_date),
+        'previous_nonempty_date': lazy_nonempty_date(
+            model,
+            queryset,
+            utils.date_to_datetime(start_date.date()),
+            before=True,
+        ),
     }
 
 
-def get_week_agenda(model, queryset, start_date):
+def get_week_agenda(model, queryset, start_date, overlap=False):
     """
     Get list of events that will occur in the given week.
 
     :param queryset: EventInstance queryset
     :param start_date: period start_date
     :type start_date: datetime.datetime()
+    :param overlap: include the events which started before the week
     :return: data dictionary
     """
     period = Week(start_date.year, start_date.date().isocalendar()[1])
@@ -87,31 +216,195 @@ def get_week_agenda(model, queryset, start_date):
         'start_date': start_date,
         'end_date': end_date,
         'scope': 'Week',
-        'items': model.objects.in_date_range(start_date, end_date).filter(
-            event__in=queryset
-        ),
+        'items': get_items(model, queryset, start_date, end_date, overlap),
         'next_date': start_date + timedelta(days=7),
         'previous_date': start_date + timedelta(days=-7),
+        'next_nonempty_date': lazy_nonempty_date(model, queryset, start_date + timedelta(days=7)),
+        'previous_nonempty_date': lazy_nonempty_date(model, queryset, start_date, before=True),
     }
 
 
-def get_day_agenda(model, queryset, start_date):
+def get_day_agenda(model, queryset, start_date, overlap=False):
     """
     Get list of events that will occur in the given date
 
     :param queryset: EventInstance queryset
     :param start_date: period start_date
     :type start_date: datetime.datetime()
+    :param overlap: include the events which started before the day
     :return: data dictionary
     """
     next_date = start_date + timedelta(days=1)
+    end_date = utils.date_to_datetime(start_date.date(), 'max')
     return {
         'start_date': start_date,
-        'end_date': utils.date_to_datetime(start_date.date(), 'max'),
+        'end_date': end_date,
         'scope': 'Day',
-        'items': model.objects.in_date_range(start_date, next_date).filter(
-            event__in=queryset
-        ),
+        'items': get_items(model, queryset, start_date, end_date, overlap),
         'next_date': next_date,
         'previous_date': start_date + timedelta(days=-1),
+        'next_nonempty_date': lazy_nonempty_date(model, queryset, next_date),
+        'previous_nonempty_date': lazy_nonempty_date(model, queryset, start_date, before=True),
+    }
+
+
+def get_period_start(scope, start_date, offset=0):
+    """
+    Get the first day of a period, or of a period before or after it.
+
+    :param scope: 'year', 'month', 'week' or 'day'
+    :param start_date: date within the period
+    :type start_date: datetime.date()
+    :param offset: number of periods to move by
+    :return: datetime.date()
+    """
+    if scope == 'year':
+        return start_date.replace(year=start_date.year + offset, month=1, day=1)
+    if scope == 'month':
+        return utils.add_months(start_date.replace(day=1), offset)
+    if scope == 'week':
+        return start_date + timedelta(days=7 * offset - start_date.weekday())
+    if scope == 'day':
+        return start_date + timedelta(days=offset)
+    raise ValueError('Unknown scope: {}'.format(scope))
+
+
+def get_agendas(model, queryset, scope, start_date, count):
+    """
+    Get the agendas of consecutive periods with a single query.
+
+    :param queryset: EventInstance queryset
+    :param scope: 'year', 'month', 'week' or 'day'
+    :param start_date: start_date of the first period
+    :type start_date: datetime.datetime()
+    :param count: number of periods
+    :return: list of data dictionaries
+    """
+    if isinstance(start_date, datetime):
+        start_date = start_date.date()
+    starts = [
+        utils.date_to_datetime(get_period_start(scope, start_date, offset))
+        for offset in range(-1, count + 1)
+    ]
+    end_date = starts[-1] - timedelta(microseconds=1)
+
+    items = list(get_items(model, queryset, starts[1], end_date))
+    item_dates = [item.start_date for item in items]
+
+    agendas = []
+    for index in range(1, count + 1):
+        first = bisect_left(item_dates, starts[index])
+        last = bisect_left(item_dates, starts[index + 1])
+        agendas.append({
+            'start_date': starts[index],
+            'end_date': starts[index + 1] - timedelta(microseconds=1),
+            'scope': scope.capitalize(),
+            'items': items[first:last],
+            'next_date': starts[index + 1],
+            'previous_date': starts[index - 1],
+            'next_nonempty_date': lazy_nonempty_date(model, queryset, starts[index + 1]),
+            'previous_nonempty_date': lazy_nonempty_date(model, queryset, starts[index], before=True),
+        })
+    return agendas
+
+
+def get_first_pks(queryset, ranges, count):
+    """
+    Get the ids of the first occurrences starting within each date range,
+    with a single UNION ALL of a LIMIT query for each range, as the ORM has
+    no window functions.
+
+    :param queryset: EventInstance queryset, ordered
+    :param ranges: list of (start, end) tuples of aware datetimes, inclusive
+    :param count: number of ids of each range
+    :return: list of ids
+    """
+    selects = []
+    params = []
+    for position, date_range in enumerate(ranges):
+        rows = queryset.filter(start_date__range=date_range).values_list('pk', flat=True)[:count]
+        select, select_params = rows.query.get_compiler(queryset.db).as_sql()
+        selects.append('SELECT * FROM ({}) first_{}'.format(select, position))
+        params.extend(select_params)
+    if not selects:
+        return []
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(' UNION ALL '.join(selects), params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def get_month_grid(model, queryset, start_date, per_day=0):
+    """
+    Get a calendar grid for the given month: six weeks of days, starting on
+    a Monday, with the number of events occurring on each day.
+
+    The occurrences are counted with a single query grouped by their start
+    date in the current timezone, and the first per_day occurrences of each
+    day are read with a second one, or two when a day has more, see
+    get_first_pks. Recurring occurrences are expanded only if the range
+    contains any.
+
+    :param queryset: EventInstance queryset
+    :param start_date: period start_date
+    :type start_date: datetime.datetime()
+    :param per_day: number of occurrences to include for each day
+    :return: data dictionary
+    """
+    first = start_date.date().replace(day=1)
+    days = [first - timedelta(days=first.weekday() - i) for i in range(42)]
+    range_start = utils.date_to_datetime(days[0])
+    range_end = utils.date_to_datetime(days[-1], 'max')
+    items = get_items(model, queryset, range_start, range_end)
+
+    counts = defaultdict(int)
+    has_recurring = False
+    rows = items.expand_recurrences(None, None).annotate(
+        day=TruncDate('start_date')
+    ).order_by().values('day', 'is_recurring').annotate(count=Count('pk'))
+    for row in rows:
+        has_recurring = has_recurring or row['is_recurring']
+        if not row['is_recurring']:
+            counts[row['day']] += row['count']
+
+    day_items = defaultdict(list)
+    if per_day:
+        concrete = items.concrete_occurrences().order_by('start_date', 'pk')
+        if any(count > per_day for count in counts.values()):
+            # Only the first occurrences of the busy days are read.
+            concrete = concrete.filter(pk__in=get_first_pks(concrete, [
+                (utils.date_to_datetime(day), utils.date_to_datetime(day, 'max'))
+                for day, count in sorted(counts.items()) if count
+            ], per_day))
+        for occurrence in concrete:
+            day_items[timezone.localtime(occurrence.start_date).date()].append(occurrence)
+
+    if has_recurring:
+        for occurrence in items.filter(is_recurring=True):
+            day = timezone.localtime(occurrence.start_date).date()
+            counts[day] += 1
+            if per_day:
+                day_items[day].append(occurrence)
+        for day, occurrences in day_items.items():
+            day_items[day] = sorted(occurrences, key=lambda o: o.start_date)[:per_day]
+
+    return {
+        'start_date': range_start,
+        'end_date': range_end,
+        'scope': 'Calendar',
+        'items': items,
+        'weeks': [
+            [
+                {
+                    'date': day,
+                    'count': counts[day],
+                    'items': day_items[day],
+                    'in_month': day.month == first.month,
+                }
+                for day in days[week:week + 7]
+            ]
+            for week in range(0, 42, 7)
+        ],
+        'count': sum(counts[day] for day in days),
+        'next_date': utils.date_to_datetime(utils.add_months(first, 1)),
+        'previous_date': utils.date_to_datetime(utils.remove_months(first, 1)),
     }
@@ -0,0 +1,34 @@
+# -*- coding:utf8 -*-
+"""
+Wagtail events admin forms.
+"""
+
+from __future__ import unicode_literals
+
+from wagtail.wagtailadmin.forms import WagtailAdminPageForm
+
+from wagtail_events.conflicts import Interval, find_conflicts, get_conflict_message
+
+
+class EventDetailForm(WagtailAdminPageForm):
+    """Page form of the EventDetail, checking its dates don't overlap."""
+    def clean(self):
+        """
+        Check the dates of the occurrences formset against each other with a
+        single sweep, recurring dates are checked at their first date.
+        """
+        cleaned_data = super(EventDetailForm, self).clean()
+        formset = self.formsets.get('events')
+        if formset is None or self.instance.allow_overlapping_occurrences:
+            return cleaned_data
+
+        intervals = []
+        for position, form in enumerate(formset.forms):
+            if not form.is_valid() or form.cleaned_data.get('DELETE') or not form.cleaned_data.get('start_date'):
+                continue
+            start_date = form.cleaned_data['start_date']
+            intervals.append(Interval(start_date, form.cleaned_data.get('end_date') or start_date, position, None))
+
+        for first, second in find_conflicts(intervals):
+            formset.forms[second.pk].add_error('start_date', get_conflict_message(first))
+        return cleaned_data
@@ -0,0 +1,412 @@
+# -*- coding:utf8 -*-
+"""
+Wagtail events iCalendar (RFC 5545) output & parsing.
+"""
+
+from __future__ import unicode_literals
+
+import bisect
+import calendar
+import datetime
+import re
+
+import pytz
+from dateutil import rrule
+from django.utils import timezone
+from django.utils.encoding import force_bytes, force_text
+from django.utils.html import linebreaks, strip_tags
+
+_DURATION_RE = re.compile(
+    r'^(?P<sign>[+-])?P(?:(?P<weeks>\d+)W)?(?:(?P<days>\d+)D)?'
+    r'(?:T(?:(?P<hours>\d+)H)?(?:(?P<minutes>\d+)M)?(?:(?P<seconds>\d+)S)?)?$'
+)
+
+#: UNTIL values of the recurrence rules stored as floating local times.
+_LOCAL_UNTIL_RE = re.compile(r'UNTIL=(\d{8}(?:T\d{6})?)(?=;|$)')
+
+#: UNTIL values in UTC, as required with a DTSTART in a timezone.
+_UTC_UNTIL_RE = re.compile(r'UNTIL=(\d{8}T\d{6}Z)')
+
+#: BYDAY values of the days of the week, from Monday.
+WEEKDAYS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+
+
+def escape(value):
+    """
+    Escape a TEXT property value.
+
+    :param value: text
+    :return: escaped text
+    """
+    value = force_text(value)
+    for char, replacement in (('\\', '\\\\'), (';', '\\;'), (',', '\\,'), ('\r\n', '\\n'), ('\n', '\\n')):
+        value = value.replace(char, replacement)
+    return value
+
+
+def unescape(value):
+    """
+    Unescape a TEXT property value.
+
+    :param value: escaped text
+    :return: text
+    """
+    return re.sub(r'\\([\\;,nN])', lambda match: '\n' if match.group(1) in 'nN' else match.group(1), value)
+
+
+def fold(line):
+    """
+    Fold a content line so no line is longer than 75 octets.
+
+    :param line: content line
+    :return: folded content line, ending with CRLF
+    """
+    parts = []
+    current = []
+    size = 0
+    for char in line:
+        char_size = len(force_bytes(char))
+        # Continuation lines start with a space, which counts towards the limit.
+        if size + char_size > (75 if not parts else 74):
+            parts.append(''.join(current))
+            current = []
+            size = 0
+        current.append(char)
+        size += char_size
+    parts.append(''.join(current))
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def format_datetime(value):
+    """
+    Format a datetime as UTC.
+
+    :param value: aware datetime
+    :return: date-time string
+    """
+    return value.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def format_local_datetime(value):
+    """
+    Format a datetime as a floating local time, as used by recurrence rules.
+
+    :param value: aware datetime
+    :return: date-time string
+    """
+    return timezone.localtime(value).strftime('%Y%m%dT%H%M%S')
+
+
+def format_offset(offset):
+    """
+    Format a UTC offset.
+
+    :param offset: timedelta
+    :return: UTC offset string, e.g. "+0100"
+    """
+    minutes = int(offset.total_seconds()) // 60
+    return '{}{:02d}{:02d}'.format('-' if minutes < 0 else '+', *divmod(abs(minutes), 60))
+
+
+def get_transition_rule(value):
+    """
+    Get the yearly rule of a daylight saving time transition, e.g. on the
+    last Sunday of March.
+
+    :param value: naive local datetime of the transition
+    :return: RRULE value
+    """
+    nth = (value.day - 1) // 7 + 1
+    if value.day + 7 > calendar.monthrange(value.year, value.month)[1]:
+        nth = -1
+    return 'FREQ=YEARLY;BYMONTH={};BYDAY={}{}'.format(value.month, nth, WEEKDAYS[value.weekday()])
+
+
+def get_timezone_lines(now=None):
+    """
+    Get the content lines of the VTIMEZONE of the current timezone, which
+    the recurring occurrences are written in. Its daylight saving time
+    transitions are described by yearly rules matching the next two.
+
+    :param now: aware datetime, defaults to the current time
+    :return: list of content lines
+    """
+    tz = timezone.get_current_timezone()
+    now = (now or timezone.now()).astimezone(timezone.utc).replace(tzinfo=None)
+    transitions = getattr(tz, '_utc_transition_times', [])
+    position = bisect.bisect_right(transitions, now)
+    lines = ['BEGIN:VTIMEZONE', 'TZID:{}'.format(timezone.get_current_timezone_name())]
+
+    if position == 0 or position + 2 > len(transitions):
+        # The offset doesn't change anymore.
+        offset = format_offset(tz.utcoffset(now))
+        return lines + [
+            'BEGIN:STANDARD',
+            'DTSTART:19700101T000000',
+            'TZOFFSETFROM:{}'.format(offset),
+            'TZOFFSETTO:{}'.format(offset),
+            'END:STANDARD',
+            'END:VTIMEZONE',
+        ]
+
+    for index in (position, position + 1):
+        offset_from = tz._transition_info[index - 1][0]
+        offset_to, dst, name = tz._transition_info[index]
+        # Transitions happen at a local time before the change.
+        value = transitions[index] + offset_from
+        rule = get_transition_rule(value)
+        # The rules are applied from 1970, so past occurrences are covered too.
+        start = rrule.rrulestr(rule, dtstart=value.replace(year=1970, month=1, day=1))[0]
+        component = 'DAYLIGHT' if dst else 'STANDARD'
+        lines += [
+            'BEGIN:{}'.format(component),
+            'DTSTART:{}'.format(start.strftime('%Y%m%dT%H%M%S')),
+            'RRULE:{}'.format(rule),
+            'TZOFFSETFROM:{}'.format(format_offset(offset_from)),
+            'TZOFFSETTO:{}'.format(format_offset(offset_to)),
+            'TZNAME:{}'.format(name),
+            'END:{}'.format(component),
+        ]
+    lines.append('END:VTIMEZONE')
+    return lines
+
+
+def get_recurrence_line(line, tzid):
+    """
+    Get the content line of a stored recurrence line, reading its floating
+    local times in the current timezone.
+
+    :param line: RRULE, RDATE or EXDATE line, a bare rule is an RRULE
+    :param tzid: TZID parameter of the current timezone
+    :return: content line
+    """
+    name, _, value = line.partition(':') if ':' in line else ('RRULE', '', line)
+    if name.upper() == 'RRULE':
+        value = _LOCAL_UNTIL_RE.sub(
+            lambda match: 'UNTIL={}'.format(format_datetime(parse_datetime(match.group(1)))),
+            value,
+        )
+    elif ';' not in name and not value.endswith('Z'):
+        name = '{};{}'.format(name, tzid)
+    return '{}:{}'.format(name, value)
+
+
+def get_event_lines(occurrence, url, uid_domain, overridden=()):
+    """
+    Get the content lines of the VEVENT for an occurrence.
+
+    :param occurrence: EventOccurrence instance
+    :param url: absolute url of the occurrence
+    :param uid_domain: domain used to build globally unique UIDs
+    :param overridden: start dates of the recurring occurrence's instances
+        which have been replaced by other occurrences
+    :return: list of content lines
+    """
+    stamp = occurrence.event.last_published_at or timezone.now()
+    lines = [
+        'BEGIN:VEVENT',
+        'UID:{}'.format(occurrence.uid or 'wagtail-events-occurrence-{}@{}'.format(occurrence.pk, uid_domain)),
+        'DTSTAMP:{}'.format(format_datetime(stamp)),
+    ]
+
+    if occurrence.is_recurring:
+        # Recurrence rules are read as local times, so DTSTART has to be too,
+        # in the timezone of the calendar's VTIMEZONE.
+        tzid = 'TZID={}'.format(timezone.get_current_timezone_name())
+        lines.append('DTSTART;{}:{}'.format(tzid, format_local_datetime(occurrence.start_date)))
+        if occurrence.end_date:
+            lines.append('DTEND;{}:{}'.format(tzid, format_local_datetime(occurrence.end_date)))
+        for line in occurrence.recurrence.split():
+            lines.append(get_recurrence_line(line, tzid))
+        for value in overridden:
+            lines.append('EXDATE;{}:{}'.format(tzid, format_local_datetime(value)))
+    else:
+        lines.append('DTSTART:{}'.format(format_datetime(occurrence.start_date)))
+        if occurrence.end_date:
+            lines.append('DTEND:{}'.format(format_datetime(occurrence.end_date)))
+
+    lines += [
+        'SUMMARY:{}'.format(escape('{} | {}'.format(occurrence.event.title, occurrence.title))),
+        'DESCRIPTION:{}'.format(escape(strip_tags(occurrence.body))),
+        'URL:{}'.format(url),
+        'END:VEVENT',
+    ]
+    return lines
+
+
+def iter_calendar(occurrences, request, name='', overridden=None):
+    """
+    Generate an iCalendar document, one VEVENT at a time.
+
+    :param occurrences: iterable of EventOccurrence instances, with the
+        related EventDetail selected
+    :param request: django request, used to build absolute urls
+    :param name: calendar name
+    :param overridden: dict mapping EventDetail ids to the start dates of
+        instances which have been replaced by other occurrences
+    :return: generator of strings of folded content lines
+    """
+    overridden = overridden or {}
+    uid_domain = request.get_host().split(':')[0]
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//Omni Digital//Wagtail Events//EN',
+        'CALSCALE:GREGORIAN',
+        'X-WR-CALNAME:{}'.format(escape(name)),
+        'X-WR-TIMEZONE:{}'.format(timezone.get_current_timezone_name()),
+    ] + get_timezone_lines()
+    yield ''.join(fold(line) for line in lines)
+
+    event_urls = {}
+    for occurrence in occurrences:
+        if occurrence.event_id not in event_urls:
+            event_urls[occurrence.event_id] = request.build_absolute_uri(occurrence.event.url)
+        url = occurrence.get_url(event_urls[occurrence.event_id])
+        lines = get_event_lines(
+            occurrence,
+            url,
+            uid_domain,
+            overridden.get(occurrence.event_id, ()) if occurrence.is_recurring else (),
+        )
+        yield ''.join(fold(line) for line in lines)
+
+    yield fold('END:VCALENDAR')
+
+
+def unfold(lines):
+    """
+    Join folded content lines.
+
+    :param lines: iterable of lines, e.g. a file
+    :return: generator of content lines
+    """
+    current = None
+    for line in lines:
+        line = force_text(line).rstrip('\r\n')
+        if line[:1] in (' ', '\t') and current is not None:
+            current += line[1:]
+            continue
+        if current:
+            yield current
+        current = line
+    if current:
+        yield current
+
+
+def parse_line(line):
+    """
+    Split a content line into its name, parameters & value.
+
+    :param line: unfolded content line
+    :return: tuple of (name, dict of parameters, value)
+    """
+    quoted = False
+    for position, char in enumerate(line):
+        if char == '"':
+            quoted = not quoted
+        elif char == ':' and not quoted:
+            break
+    else:
+        raise ValueError('Invalid content line "{}".'.format(line))
+
+    parts = line[:position].split(';')
+    params = {}
+    for part in parts[1:]:
+        key, _, value = part.partition('=')
+        params[key.upper()] = value.strip('"')
+    return parts[0].upper(), params, line[position + 1:]
+
+
+def parse_datetime(value, params=None):
+    """
+    Parse a DATE or DATE-TIME value.
+
+    :param value: value of a content line
+    :param params: parameters of the content line
+    :return: aware datetime, dates start at midnight in the current timezone
+    """
+    params = params or {}
+    if params.get('VALUE') == 'DATE' or len(value) == 8:
+        return timezone.make_aware(
+            datetime.datetime.strptime(value, '%Y%m%d'),
+            timezone.get_current_timezone(),
+        )
+    if value.endswith('Z'):
+        return datetime.datetime.strptime(value, '%Y%m%dT%H%M%SZ').replace(tzinfo=timezone.utc)
+    try:
+        tz = pytz.timezone(params['TZID']) if 'TZID' in params else timezone.get_current_timezone()
+    except pytz.UnknownTimeZoneError:
+        tz = timezone.get_current_timezone()
+    return timezone.make_aware(datetime.datetime.strptime(value, '%Y%m%dT%H%M%S'), tz)
+
+
+def parse_duration(value):
+    """
+    Parse a DURATION value.
+
+    :param value: value of a content line, e.g. "PT1H30M"
+    :return: timedelta
+    """
+    match = _DURATION_RE.match(value)
+    if match is None:
+        raise ValueError('Invalid duration "{}".'.format(value))
+    parts = dict((key, int(number or 0)) for key, number in match.groupdict().items() if key != 'sign')
+    duration = datetime.timedelta(**parts)
+    return -duration if match.group('sign') == '-' else duration
+
+
+def iter_events(lines):
+    """
+    Read the VEVENTs of an iCalendar document, one at a time.
+
+    RDATE, EXDATE & UTC UNTIL values are converted to the floating local
+    times the recurrence field is read in.
+
+    :param lines: iterable of lines, e.g. a file
+    :return: generator of dicts of uid, title, body, start_date, end_date,
+        recurrence & recurrence_id values
+    """
+    event = None
+    for line in unfold(lines):
+        name, params, value = parse_line(line)
+        if name == 'BEGIN' and value.upper() == 'VEVENT':
+            event = {'recurrence': [], 'duration': None}
+        elif event is None:
+            continue
+        elif name == 'END' and value.upper() == 'VEVENT':
+            if event.get('end_date') is None and event['duration'] is not None:
+                event['end_date'] = event['start_date'] + event['duration']
+            yield {
+                'uid': event.get('uid', ''),
+                'title': event.get('title', ''),
+                'body': event.get('body', ''),
+                'start_date': event.get('start_date'),
+                'end_date': event.get('end_date'),
+                'recurrence': '\n'.join(event['recurrence']),
+                'recurrence_id': event.get('recurrence_id'),
+            }
+            event = None
+        elif name == 'UID':
+            event['uid'] = value
+        elif name == 'SUMMARY':
+            event['title'] = unescape(value)
+        elif name == 'DESCRIPTION':
+            event['body'] = linebreaks(unescape(value), autoescape=True) if value else ''
+        elif name == 'DTSTART':
+            event['start_date'] = parse_datetime(value, params)
+        elif name == 'DTEND':
+            event['end_date'] = parse_datetime(value, params)
+        elif name == 'DURATION':
+            event['duration'] = parse_duration(value)
+        elif name == 'RECURRENCE-ID':
+            event['recurrence_id'] = parse_datetime(value, params)
+        elif name == 'RRULE':
+            value = _UTC_UNTIL_RE.sub(
+                lambda match: 'UNTIL={}'.format(format_local_datetime(parse_datetime(match.group(1)))),
+                value,
+            )
+            event['recurrence'].append('RRULE:{}'.format(value))
+        elif name in ('RDATE', 'EXDATE') and params.get('VALUE') != 'PERIOD':
+            dates = [format_local_datetime(parse_datetime(date, params)) for date in value.split(',')]
+            event['recurrence'].append('{}:{}'.format(name, ','.join(dates)))
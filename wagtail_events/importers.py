@@ -0,0 +1,323 @@
+# -*- coding:utf8 -*-
+"""
+Wagtail events occurrence imports.
+
+Occurrences are matched to the rows of an import by their uid, so importing
+the same file again only changes the rows which differ. The rows are streamed
+& applied in bounded chunks of each EventDetail, with batched inserts,
+updates & deletes within a single transaction, and each EventIndex is
+invalidated once.
+"""
+
+from __future__ import unicode_literals
+
+import csv
+from collections import OrderedDict
+
+from dateutil import parser as date_parser
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.db import transaction
+from django.db.models import Case, Value, When
+from django.utils import six, timezone
+
+from wagtail_events import conflicts, ical
+from wagtail_events.models import EventDetail, EventOccurrence
+from wagtail_events.signal_handlers import invalidate_event_detail, occurrence_invalidation_suspended
+from wagtail_events.utils import occurrences_detached
+
+#: Occurrence fields read from an import.
+IMPORT_FIELDS = ('title', 'body', 'start_date', 'end_date', 'recurrence', 'recurrence_id')
+
+#: Fields derived from the imported fields by set_range_fields.
+RANGE_FIELDS = ('is_recurring', 'recurrence_end', 'duration_bucket')
+
+
+def parse_csv_datetime(value):
+    """
+    Parse a date of a CSV file.
+
+    :param value: ISO 8601 date string, naive dates are read in the current timezone
+    :return: aware datetime, or None when the value is empty
+    """
+    value = (value or '').strip()
+    if not value:
+        return None
+    date = date_parser.parse(value)
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date, timezone.get_current_timezone())
+    return date
+
+
+def read_csv(lines):
+    """
+    Read the occurrences of a CSV file with a header row of uid, title,
+    start_date, end_date, body, recurrence, recurrence_id & event columns.
+    Only the uid & start_date columns are required.
+
+    :param lines: iterable of lines, e.g. a file opened with newline=''
+    :return: generator of dicts of occurrence values, with the EventDetail id
+        under 'event' when given
+    """
+    if six.PY2:
+        lines = (line.encode('utf-8') for line in lines)
+    for row in csv.DictReader(lines):
+        if six.PY2:
+            row = dict((key, value.decode('utf-8') if value else value) for key, value in row.items())
+        yield {
+            'uid': (row.get('uid') or '').strip(),
+            'event': (row.get('event') or '').strip() or None,
+            'title': row.get('title') or '',
+            'body': row.get('body') or '',
+            'start_date': parse_csv_datetime(row.get('start_date')),
+            'end_date': parse_csv_datetime(row.get('end_date')),
+            'recurrence': (row.get('recurrence') or '').strip(),
+            'recurrence_id': parse_csv_datetime(row.get('recurrence_id')),
+        }
+
+
+def read_ics(lines):
+    """
+    Read the occurrences of an iCalendar file. Overridden instances of a
+    repeating event share its UID, so their uid also includes their
+    RECURRENCE-ID.
+
+    :param lines: iterable of lines, e.g. a file
+    :return: generator of dicts of occurrence values
+    """
+    for row in ical.iter_events(lines):
+        if row['recurrence_id'] is not None:
+            row['uid'] = '{}/{}'.format(row['uid'], ical.format_datetime(row['recurrence_id']))
+        yield row
+
+
+READERS = {
+    'csv': read_csv,
+    'ics': read_ics,
+}
+
+
+def bulk_update(instances, fields, batch_size=500):
+    """
+    Update the fields of saved instances with a single UPDATE statement for
+    each batch, selecting the value of each row with a CASE expression.
+
+    :param instances: list of model instances of the same model
+    :param fields: names of the fields to update
+    :param batch_size: number of rows updated by each statement
+    """
+    if not instances:
+        return
+    model = type(instances[0])
+    model_fields = [model._meta.get_field(name) for name in fields]
+    for start in range(0, len(instances), batch_size):
+        batch = instances[start:start + batch_size]
+        values = {}
+        for field in model_fields:
+            values[field.attname] = Case(
+                *[When(pk=instance.pk, then=Value(getattr(instance, field.attname), output_field=field))
+                  for instance in batch],
+                output_field=field
+            )
+        model._default_manager.filter(pk__in=[instance.pk for instance in batch]).update(**values)
+
+
+def sync_occurrences(event_detail, rows, visibility=None, batch_size=500):
+    """
+    Create or update the imported occurrences of an EventDetail matching a
+    chunk of the rows of an import.
+
+    The rows are only checked on their own, the conflicts between the
+    occurrences are checked for every row at once by check_conflicts.
+
+    :param event_detail: EventDetail instance
+    :param rows: dict mapping uids to dicts of occurrence values
+    :param visibility: dict of the visibility values of the occurrences of
+        the EventDetail, see EventDetail.get_occurrence_visibility
+    :param batch_size: number of rows inserted or updated by each statement
+    :return: dict of the number of created, updated & unchanged occurrences
+    :raises ValidationError: when a row is invalid
+    """
+    counts = {'created': 0, 'updated': 0, 'unchanged': 0}
+    existing = dict(
+        (values[0], values[1:])
+        for values in EventOccurrence.objects.filter(event=event_detail, uid__in=list(rows)).values_list(
+            'uid',
+            'pk',
+            *IMPORT_FIELDS
+        )
+    )
+    if visibility is None:
+        visibility = event_detail.get_occurrence_visibility()
+
+    created = []
+    updated = []
+    for uid, row in rows.items():
+        occurrence = EventOccurrence(event=event_detail, uid=uid, **visibility)
+        for name in IMPORT_FIELDS:
+            setattr(occurrence, name, row[name])
+        try:
+            occurrence.clean_fields(exclude=['body', 'event', 'index_page'])
+            # The conflict check of EventOccurrence.clean runs a query.
+            super(EventOccurrence, occurrence).clean()
+        except ValidationError as e:
+            raise ValidationError('Row "{}": {}'.format(uid, ' '.join(e.messages)))
+        occurrence.set_range_fields()
+
+        if uid not in existing:
+            created.append(occurrence)
+        elif tuple(row[name] for name in IMPORT_FIELDS) != existing[uid][1:]:
+            occurrence.pk = existing[uid][0]
+            updated.append(occurrence)
+        else:
+            counts['unchanged'] += 1
+
+    EventOccurrence.objects.bulk_create(created, batch_size=batch_size)
+    bulk_update(updated, IMPORT_FIELDS + RANGE_FIELDS, batch_size)
+    counts.update(created=len(created), updated=len(updated))
+    return counts
+
+
+def delete_missing(event_detail, uids, batch_size=500):
+    """
+    Delete the imported occurrences of an EventDetail missing from an import.
+
+    Occurrences without a uid, e.g. added in the admin, are left unchanged.
+
+    :param event_detail: EventDetail instance
+    :param uids: set of the uids of the import
+    :param batch_size: number of rows deleted by each statement
+    :return: number of occurrences deleted
+    """
+    occurrences = EventOccurrence.objects.filter(event=event_detail).exclude(uid='').values_list('pk', 'uid')
+    deleted = [pk for pk, uid in occurrences.iterator() if uid not in uids]
+    for start in range(0, len(deleted), batch_size):
+        EventOccurrence.objects.filter(pk__in=deleted[start:start + batch_size]).delete()
+    return len(deleted)
+
+
+def check_conflicts(event_detail, start, end):
+    """
+    Check the imported occurrences of an EventDetail don't overlap its other
+    occurrences, with a single sweep, unless it allows overlaps.
+
+    :param event_detail: EventDetail instance
+    :param start: aware datetime, the start of the imported dates
+    :param end: aware datetime, the end of the imported dates
+    :raises ValidationError: when an imported occurrence overlaps another one
+    """
+    if event_detail.specific_class.allow_overlapping_occurrences:
+        return
+    occurrences = EventOccurrence.objects.filter(event=event_detail)
+    # The overlaps between the occurrences added in the admin are left alone.
+    manual = set(occurrences.filter(uid='', start_date__lte=end).values_list('pk', flat=True))
+    for first, second in conflicts.iter_conflicts(conflicts.get_intervals(occurrences, start, end)):
+        if first.pk == second.pk or (first.pk in manual and second.pk in manual):
+            continue
+        imported, other = (first, second) if second.pk in manual else (second, first)
+        raise ValidationError('Row "{}": {}'.format(
+            occurrences.filter(pk=imported.pk).values_list('uid', flat=True)[0],
+            conflicts.get_conflict_message(other),
+        ))
+
+
+class EventImport(object):
+    """The state of the import of the occurrences of an EventDetail."""
+    def __init__(self, event_detail):
+        self.event_detail = event_detail
+        self.visibility = event_detail.get_occurrence_visibility()
+        self.rows = OrderedDict()
+        self.uids = set()
+        self.start = None
+        self.end = None
+        self.counts = {'created': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0}
+
+    def add(self, row):
+        """
+        Add a row to the next chunk.
+
+        :param row: dict of occurrence values
+        """
+        # A later row with the same uid replaces an earlier one.
+        self.rows[row['uid']] = row
+        self.uids.add(row['uid'])
+        if row['start_date'] is not None:
+            end_date = max(row['end_date'] or row['start_date'], row['start_date'])
+            self.start = row['start_date'] if self.start is None else min(self.start, row['start_date'])
+            self.end = end_date if self.end is None else max(self.end, end_date)
+
+    def flush(self, batch_size):
+        """
+        Write the chunk of rows.
+
+        :param batch_size: number of rows written by each statement
+        """
+        if self.rows:
+            counts = sync_occurrences(self.event_detail, self.rows, self.visibility, batch_size)
+            for key, value in counts.items():
+                self.counts[key] += value
+            self.rows = OrderedDict()
+
+
+def import_occurrences(rows, event=None, delete=True, batch_size=500):
+    """
+    Make the imported occurrences match the rows of an import, in a single
+    transaction.
+
+    The rows are streamed: the rows of each EventDetail are written in
+    chunks of batch_size rows, only their uids are kept until the end of the
+    import, to delete the missing occurrences. The conflicts of each
+    EventDetail are then checked with a single sweep, and its EventIndex is
+    invalidated once.
+
+    :param rows: iterable of dicts of occurrence values, see READERS, with
+        the EventDetail id under 'event' when given
+    :param event: EventDetail id of the rows without one
+    :param delete: delete the imported occurrences missing from the rows
+    :param batch_size: number of rows inserted, updated or deleted at a time
+    :return: tuple of the number of rows & an OrderedDict mapping EventDetail
+        ids to dicts of the number of created, updated, deleted & unchanged
+        occurrences
+    :raises ImproperlyConfigured: unless the occurrences are detached, as
+        publishing a revision of the EventDetail would revert the import
+    :raises ValidationError: when a row is invalid, nothing is changed
+    """
+    if not occurrences_detached():
+        raise ImproperlyConfigured(
+            'Occurrences can only be imported when WAGTAIL_EVENTS_DETACHED_OCCURRENCES is enabled.'
+        )
+
+    imports = OrderedDict()
+    count = 0
+    with transaction.atomic(), occurrence_invalidation_suspended():
+        for row in rows:
+            count += 1
+            if not row['uid']:
+                raise ValidationError('Row {} has no uid.'.format(count))
+            event_id = row.pop('event', None) or event
+            if event_id is None:
+                raise ValidationError('Row "{}" has no event.'.format(row['uid']))
+            event_id = int(event_id)
+            if event_id not in imports:
+                event_detail = EventDetail.objects.filter(pk=event_id).first()
+                if event_detail is None:
+                    raise ValidationError('EventDetail {} could not be found.'.format(event_id))
+                imports[event_id] = EventImport(event_detail)
+            imports[event_id].add(row)
+            if len(imports[event_id].rows) >= batch_size:
+                imports[event_id].flush(batch_size)
+
+        for event_import in imports.values():
+            event_import.flush(batch_size)
+            if delete:
+                event_import.counts['deleted'] = delete_missing(
+                    event_import.event_detail,
+                    event_import.uids,
+                    batch_size,
+                )
+            if event_import.start is not None:
+                check_conflicts(event_import.event_detail, event_import.start, event_import.end)
+
+    for event_import in imports.values():
+        if any(event_import.counts[key] for key in ('created', 'updated', 'deleted')):
+            invalidate_event_detail(event_import.event_detail)
+    return count, OrderedDict((event_id, event_import.counts) for event_id, event_import in imports.items())
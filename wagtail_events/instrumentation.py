@@ -0,0 +1,164 @@
+# -*- coding:utf8 -*-
+"""
+Wagtail events instrumentation.
+
+Measures the wall time, query count & row count of each stage of agenda
+rendering, e.g. building the agenda, paginating it or resolving occurrence
+urls, and sends them with the stage_finished signal. The measurements are
+logged to the 'wagtail_events.instrumentation' logger by default.
+
+Instrumentation is disabled unless WAGTAIL_EVENTS_INSTRUMENTATION is True,
+instrumented methods then only check the setting before being called.
+"""
+
+from __future__ import unicode_literals
+
+import logging
+import threading
+from functools import wraps
+from timeit import default_timer
+
+from django.conf import settings
+from django.db import connection
+from django.db.models.query import QuerySet
+from django.http import HttpRequest
+
+from wagtail_events.signals import stage_finished
+
+
+logger = logging.getLogger(__name__)
+
+_state = threading.local()
+
+
+def is_enabled():
+    """Returns True if the instrumentation is enabled."""
+    return getattr(settings, 'WAGTAIL_EVENTS_INSTRUMENTATION', False)
+
+
+def get_stack():
+    """Returns the list of stages running in this thread, innermost last."""
+    return _state.__dict__.setdefault('stack', [])
+
+
+def get_scope(page, request):
+    """
+    Get the time period requested from a page.
+
+    :param page: page instance, e.g. an EventIndex
+    :param request: django request
+    :return: time period name, or None
+    """
+    get_period = getattr(page, 'get_period', None)
+    if get_period is None:
+        return None
+    return get_period(request)[0]
+
+
+def count_rows(value):
+    """
+    Count the rows returned by a stage, without fetching anything.
+
+    :param value: value returned by the stage, e.g. an agenda, a page of
+        occurrences or a queryset
+    :return: int, or None when the rows haven't been fetched
+    """
+    if isinstance(value, dict):
+        return count_rows(value.get('items'))
+    if isinstance(value, QuerySet):
+        return None if value._result_cache is None else len(value._result_cache)
+    if hasattr(value, 'object_list'):
+        return count_rows(value.object_list)
+    if hasattr(value, '__len__'):
+        return len(value)
+    return None
+
+
+class Stage(object):
+    """
+    Context manager measuring a stage of agenda rendering.
+
+    Stages can be nested, stages without a scope take the scope of the stage
+    they're nested in. The number of rows can be set on the stage before it
+    finishes.
+    """
+    def __init__(self, name, sender=None, scope=None):
+        """
+        :param name: stage name
+        :param sender: class sending the stage_finished signal
+        :param scope: time period name
+        """
+        self.name = name
+        self.sender = sender
+        self.scope = scope
+        self.rows = None
+
+    def __enter__(self):
+        stack = get_stack()
+        if self.scope is None and stack:
+            self.scope = stack[-1].scope
+        stack.append(self)
+
+        # Queries are only logged by the debug cursor.
+        self.force_debug_cursor = connection.force_debug_cursor
+        connection.force_debug_cursor = True
+        self.queries = len(connection.queries_log)
+        self.start = default_timer()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        duration = default_timer() - self.start
+        queries = len(connection.queries_log) - self.queries
+        connection.force_debug_cursor = self.force_debug_cursor
+        get_stack().pop()
+
+        if exc_type is None:
+            stage_finished.send(
+                sender=self.sender,
+                stage=self.name,
+                scope=self.scope,
+                duration=duration,
+                queries=queries,
+                rows=self.rows,
+            )
+
+
+def instrumented(name, rows=count_rows):
+    """
+    Decorator measuring a method as a stage when instrumentation is enabled.
+
+    The scope is read from the request when it's the first argument. Methods
+    calling the method they override are only measured once.
+
+    :param name: stage name
+    :param rows: function counting the rows of the value returned, or None
+    :return: decorator
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if not is_enabled() or any(stage.name == name for stage in get_stack()):
+                return method(self, *args, **kwargs)
+
+            scope = None
+            if args and isinstance(args[0], HttpRequest):
+                scope = get_scope(self, args[0])
+            with Stage(name, self.__class__, scope) as stage:
+                value = method(self, *args, **kwargs)
+                if rows is not None:
+                    stage.rows = rows(value)
+            return value
+        return wrapper
+    return decorator
+
+
+def log_stage(sender, stage, scope, duration, queries, rows, **kwargs):
+    """Default stage_finished handler, logging the measurements."""
+    logger.debug(
+        '%s %s: %.2fms, %d queries, %s rows',
+        stage,
+        scope or '-',
+        duration * 1000,
+        queries,
+        '-' if rows is None else rows,
+    )
@@ -0,0 +1,70 @@
+# -*- coding:utf8 -*-
+"""
+Copy the visibility of EventDetail pages onto their occurrences.
+"""
+
+from __future__ import unicode_literals
+
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from wagtail.wagtailcore.models import Page
+
+from wagtail_events.cache import bump_index_version
+from wagtail_events.models import EventDetail, EventOccurrence
+
+
+class Command(BaseCommand):
+    """Backfill the visibility copied onto EventOccurrence rows."""
+    help = (
+        'Copy the index page, live and show_in_menus values of EventDetail '
+        'pages onto their occurrences, e.g. after upgrading.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of EventDetail pages updated at a time.',
+        )
+
+    def handle(self, *args, **options):
+        events = EventDetail.objects.order_by('pk').values_list('pk', 'path', 'live', 'show_in_menus')
+        index_ids = set()
+        updated = 0
+        last_pk = 0
+
+        while True:
+            batch = list(events.filter(pk__gt=last_pk)[:options['batch_size']])
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+
+            parents = dict(Page.objects.filter(
+                path__in=set(path[:-Page.steplen] for pk, path, live, show_in_menus in batch),
+            ).values_list('path', 'pk'))
+
+            # One update for each combination of values in the batch.
+            groups = defaultdict(list)
+            for pk, path, live, show_in_menus in batch:
+                groups[(parents.get(path[:-Page.steplen]), live, show_in_menus)].append(pk)
+
+            with transaction.atomic():
+                for (index_id, live, show_in_menus), event_ids in groups.items():
+                    updated += EventOccurrence.objects.filter(event_id__in=event_ids).update(
+                        index_page_id=index_id,
+                        live=live,
+                        show_in_menus=show_in_menus,
+                    )
+                    index_ids.add(index_id)
+
+            if options['verbosity'] > 1:
+                self.stdout.write('Updated the occurrences of {} events.'.format(len(batch)))
+
+        index_ids.discard(None)
+        for index_id in index_ids:
+            bump_index_version(index_id)
+
+        self.stdout.write('Updated {} occurrences.'.format(updated))
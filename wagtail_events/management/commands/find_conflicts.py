@@ -0,0 +1,111 @@
+# -*- coding:utf8 -*-
+"""
+Report the overlapping occurrences of each EventIndex.
+"""
+
+from __future__ import unicode_literals
+
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from wagtail.wagtailcore.models import Site
+
+from wagtail_events.conflicts import find_conflicts, get_intervals
+from wagtail_events.models import EventIndex, EventOccurrence
+
+
+def format_interval(interval):
+    """Describe an Interval tuple."""
+    return 'occurrence {} of event {} ({} - {})'.format(
+        interval.pk,
+        interval.event_id,
+        timezone.localtime(interval.start).strftime('%Y-%m-%d %H:%M'),
+        timezone.localtime(interval.end).strftime('%Y-%m-%d %H:%M'),
+    )
+
+
+class Command(BaseCommand):
+    """Find the occurrences overlapping each other."""
+    help = (
+        'Report the occurrences overlapping each other within each EventIndex, '
+        'or within each EventDetail with --same-event.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--site', type=int, help='Id of the site to check, defaults to every site.')
+        parser.add_argument('--index', type=int, help='Id of the EventIndex to check.')
+        parser.add_argument(
+            '--same-event',
+            action='store_true',
+            default=False,
+            help='Only report the occurrences overlapping others of the same EventDetail.',
+        )
+        parser.add_argument(
+            '--start',
+            help='First day checked as YYYY-MM-DD, defaults to today.',
+        )
+        parser.add_argument('--days', type=int, default=365, help='Number of days checked.')
+
+    def get_indexes(self, options):
+        """
+        Get the EventIndex pages to check.
+
+        :param options: command options
+        :return: EventIndex queryset
+        """
+        indexes = EventIndex.objects.order_by('path')
+        if options['index'] is not None:
+            indexes = indexes.filter(pk=options['index'])
+        if options['site'] is not None:
+            try:
+                site = Site.objects.get(pk=options['site'])
+            except Site.DoesNotExist:
+                raise CommandError('Site {} could not be found.'.format(options['site']))
+            indexes = indexes.descendant_of(site.root_page, inclusive=True)
+        return indexes
+
+    def get_start(self, value):
+        """
+        Get the start of the checked range.
+
+        :param value: YYYY-MM-DD string, or None for today
+        :return: aware datetime
+        """
+        if value is None:
+            day = timezone.localtime(timezone.now()).date()
+        else:
+            try:
+                day = datetime.datetime.strptime(value, '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--start should be a YYYY-MM-DD date.')
+        return timezone.make_aware(
+            datetime.datetime.combine(day, datetime.time()),
+            timezone.get_current_timezone(),
+        )
+
+    def handle(self, *args, **options):
+        started = time.time()
+        start = self.get_start(options['start'])
+        end = start + datetime.timedelta(days=max(options['days'], 1)) - datetime.timedelta(microseconds=1)
+
+        checked = 0
+        found = 0
+        for index in self.get_indexes(options):
+            intervals = list(get_intervals(EventOccurrence.objects.filter(index_page=index), start, end))
+            checked += len(intervals)
+            for first, second in find_conflicts(intervals, same_event=options['same_event']):
+                found += 1
+                self.stdout.write('{} "{}": {} overlaps {}'.format(
+                    index.pk,
+                    index.title,
+                    format_interval(first),
+                    format_interval(second),
+                ))
+
+        self.stdout.write('Found {} conflicts between {} occurrences in {:.2f}s.'.format(
+            found,
+            checked,
+            time.time() - started,
+        ))
@@ -0,0 +1,205 @@
+# -*- coding:utf8 -*-
+"""
+Generate a synthetic calendar of events.
+"""
+
+from __future__ import unicode_literals
+
+import datetime
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models, transaction
+from django.utils import timezone
+from wagtail.wagtailcore.models import Page, Site
+
+from wagtail_events.cache import bump_index_version
+from wagtail_events.models import EventDetail, EventIndex, EventOccurrence
+from wagtail_events.utils import get_duration_bucket
+
+
+def sparse_dates(rng, start, days):
+    """Occurrences of a few hours on any day."""
+    day = start + datetime.timedelta(days=rng.randrange(days), hours=rng.randint(8, 20))
+    return day, day + datetime.timedelta(hours=rng.randint(1, 3))
+
+
+def weekend_dates(rng, start, days):
+    """Occurrences of a few hours clustered on Saturdays & Sundays."""
+    first_saturday = (5 - start.weekday()) % 7
+    weeks = max((days - first_saturday) // 7, 1)
+    day = start + datetime.timedelta(
+        days=first_saturday + rng.randrange(weeks) * 7 + rng.randint(0, 1),
+        hours=rng.randint(10, 22),
+    )
+    return day, day + datetime.timedelta(hours=rng.randint(1, 4))
+
+
+def long_dates(rng, start, days):
+    """Occurrences spanning several days, e.g. festivals & exhibitions."""
+    day = start + datetime.timedelta(days=rng.randrange(days), hours=rng.randint(8, 12))
+    return day, day + datetime.timedelta(days=rng.randint(2, 14), hours=rng.randint(0, 8))
+
+
+DISTRIBUTIONS = {
+    'sparse': sparse_dates,
+    'weekend': weekend_dates,
+    'long': long_dates,
+}
+
+
+class Command(BaseCommand):
+    """Populate a site with an EventIndex, EventDetail pages & occurrences."""
+    help = (
+        'Create an EventIndex with EventDetail pages and occurrences spread '
+        'according to a distribution, for benchmarking & profiling.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=100, help='Number of EventDetail pages.')
+        parser.add_argument(
+            '--occurrences',
+            type=int,
+            default=10,
+            help='Number of occurrences of each EventDetail.',
+        )
+        parser.add_argument(
+            '--distribution',
+            choices=sorted(DISTRIBUTIONS.keys()),
+            default='sparse',
+            help='How the occurrences are spread over time.',
+        )
+        parser.add_argument(
+            '--start',
+            help='First day of the occurrences as YYYY-MM-DD, defaults to today.',
+        )
+        parser.add_argument('--days', type=int, default=365, help='Number of days the occurrences span.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed, for repeatable datasets.')
+        parser.add_argument(
+            '--parent',
+            type=int,
+            help='Id of the page the EventIndex is added to, defaults to the root page of the default site.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of occurrences inserted at a time.',
+        )
+
+    def get_parent(self, parent_id):
+        """
+        Get the page the EventIndex is added to.
+
+        :param parent_id: page id, or None for the default site root page
+        :return: Page instance
+        """
+        try:
+            if parent_id is not None:
+                return Page.objects.get(pk=parent_id)
+            return Site.objects.get(is_default_site=True).root_page
+        except (Page.DoesNotExist, Site.DoesNotExist):
+            raise CommandError('The parent page could not be found, use --parent.')
+
+    def get_start(self, value):
+        """
+        Get the first day of the occurrences.
+
+        :param value: YYYY-MM-DD string, or None for today
+        :return: aware datetime
+        """
+        if value is None:
+            day = timezone.localtime(timezone.now()).date()
+        else:
+            try:
+                day = datetime.datetime.strptime(value, '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--start should be a YYYY-MM-DD date.')
+        return timezone.make_aware(
+            datetime.datetime.combine(day, datetime.time()),
+            timezone.get_current_timezone(),
+        )
+
+    def create_details(self, index, count, seed):
+        """
+        Add EventDetail pages to an EventIndex.
+
+        The tree paths are computed up front rather than looked up for each
+        page by add_child, and the parent's child count is updated once.
+
+        :param index: EventIndex instance
+        :param count: number of pages
+        :param seed: random seed, used in the page slugs
+        :return: list of EventDetail instances
+        """
+        # Page.draft_title was added in Wagtail 1.12.
+        has_draft_title = any(field.name == 'draft_title' for field in EventDetail._meta.concrete_fields)
+        details = []
+        for position in range(index.numchild + 1, index.numchild + count + 1):
+            detail = EventDetail(
+                title='Event {}'.format(position),
+                slug='event-{}-{}'.format(seed, position),
+                body='<p>Event {} information.</p>'.format(position),
+                live=True,
+                show_in_menus=True,
+                path=EventDetail._get_path(index.path, index.depth + 1, position),
+                depth=index.depth + 1,
+                numchild=0,
+            )
+            if has_draft_title:
+                detail.draft_title = detail.title
+            detail.set_url_path(index)
+            # Skip the slug validation & parent lookups of Page.save.
+            models.Model.save(detail)
+            details.append(detail)
+
+        Page.objects.filter(pk=index.pk).update(numchild=models.F('numchild') + count)
+        index.numchild += count
+        return details
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        get_dates = DISTRIBUTIONS[options['distribution']]
+        start = self.get_start(options['start'])
+        days = max(options['days'], 1)
+        parent = self.get_parent(options['parent'])
+
+        with transaction.atomic():
+            index = parent.add_child(instance=EventIndex(
+                title='Events {}'.format(options['seed']),
+                slug='events-{}-{}'.format(options['seed'], parent.numchild + 1),
+                body='<p>Generated events.</p>',
+                paginate_by=10,
+                live=True,
+            ))
+            details = self.create_details(index, options['pages'], options['seed'])
+
+            created = 0
+            occurrences = []
+            for detail in details:
+                for position in range(options['occurrences']):
+                    start_date, end_date = get_dates(rng, start, days)
+                    occurrences.append(EventOccurrence(
+                        event=detail,
+                        title='{} #{}'.format(detail.title, position + 1),
+                        body='<p>{} #{} information.</p>'.format(detail.title, position + 1),
+                        start_date=start_date,
+                        end_date=end_date,
+                        duration_bucket=get_duration_bucket(start_date, end_date),
+                        index_page_id=index.pk,
+                        live=detail.live,
+                        show_in_menus=detail.show_in_menus,
+                    ))
+                    if len(occurrences) >= options['batch_size']:
+                        EventOccurrence.objects.bulk_create(occurrences)
+                        created += len(occurrences)
+                        occurrences = []
+            EventOccurrence.objects.bulk_create(occurrences)
+            created += len(occurrences)
+        bump_index_version(index.pk)
+
+        self.stdout.write('Created the EventIndex {} with {} pages and {} occurrences.'.format(
+            index.pk,
+            len(details),
+            created,
+        ))
@@ -0,0 +1,99 @@
+# -*- coding:utf8 -*-
+"""
+Import event occurrences from an iCalendar or CSV file.
+"""
+
+from __future__ import unicode_literals
+
+import io
+import os
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from wagtail_events.importers import READERS, import_occurrences
+from wagtail_events.utils import occurrences_detached
+
+
+class Command(BaseCommand):
+    """Create, update & delete occurrences to match an external export."""
+    help = (
+        'Import occurrences from an .ics or .csv file, matched to existing '
+        'occurrences by their uid, so importing the same file again only '
+        'applies the changes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path of the .ics or .csv file.')
+        parser.add_argument(
+            '--event',
+            type=int,
+            help='Id of the EventDetail of the occurrences, unless given by the event column of a CSV file.',
+        )
+        parser.add_argument(
+            '--format',
+            choices=sorted(READERS.keys()),
+            help='Format of the file, defaults to its extension.',
+        )
+        parser.add_argument(
+            '--keep-missing',
+            action='store_true',
+            default=False,
+            help='Keep the imported occurrences which are missing from the file, rather than deleting them.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of occurrences of each EventDetail read, inserted, updated or deleted at a time.',
+        )
+
+    def get_format(self, path, value):
+        """
+        Get the format of the file.
+
+        :param path: path of the file
+        :param value: --format value, or None
+        :return: format name
+        """
+        value = value or os.path.splitext(path)[1].lstrip('.').lower()
+        if value not in READERS:
+            raise CommandError('Unknown format "{}", use --format.'.format(value))
+        return value
+
+    def handle(self, *args, **options):
+        started = time.time()
+        format_name = self.get_format(options['path'], options['format'])
+        if not occurrences_detached():
+            raise CommandError(
+                'Occurrences can only be imported when WAGTAIL_EVENTS_DETACHED_OCCURRENCES is enabled, '
+                'otherwise publishing a revision of their EventDetail would revert the import.'
+            )
+
+        with io.open(options['path'], encoding='utf-8', newline='') as lines:
+            try:
+                count, imports = import_occurrences(
+                    READERS[format_name](lines),
+                    event=options['event'],
+                    delete=not options['keep_missing'],
+                    batch_size=options['batch_size'],
+                )
+            except ValidationError as e:
+                raise CommandError(' '.join(e.messages))
+
+        totals = {'created': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0}
+        for event_id, counts in imports.items():
+            for key, value in counts.items():
+                totals[key] += value
+            if options['verbosity'] > 1:
+                self.stdout.write('EventDetail {}: {created} created, {updated} updated, {deleted} deleted.'.format(
+                    event_id,
+                    **counts
+                ))
+
+        duration = max(time.time() - started, 1e-6)
+        self.stdout.write(
+            'Imported {} rows in {:.2f}s ({:.0f} rows/sec): {created} created, {updated} updated, '
+            '{deleted} deleted, {unchanged} unchanged.'.format(count, duration, count / duration, **totals)
+        )
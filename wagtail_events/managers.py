@@ -5,10 +5,41 @@ Wagtail events model managers
 
 from __future__ import unicode_literals
 
-from django.db.models import Manager
+from collections import OrderedDict
+from datetime import timedelta
 
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.db import connections, transaction
+from django.db.models import (
+    Case, Count, ExpressionWrapper, F, Manager, PositiveSmallIntegerField, Q, QuerySet, Value, When,
+)
+from django.db.models.query import ModelIterable, ValuesIterable
+
+from wagtail_events import recurrence
+from wagtail_events.cache import bump_index_version
+from wagtail_events.utils import MAX_DURATION_BUCKET, occurrences_detached
+
+
+class EventOccurrenceQuerySet(QuerySet):
+    """
+    QuerySet for event occurrences.
+
+    Once a date range has been given with expand_recurrences, evaluating the
+    queryset yields every instance of the recurring occurrences within that
+    range, merged in start_date order with the concrete occurrences.
+
+    Slices & counts still run in SQL on the concrete occurrences, only the
+    recurring rows are fetched & expanded in python.
+    """
+    _recurrence_window = None
+    #: Instances of the recurring occurrences, see get_recurring_instances.
+    _recurring_cache = None
+
+    def _clone(self, **kwargs):
+        clone = super(EventOccurrenceQuerySet, self)._clone(**kwargs)
+        clone._recurrence_window = self._recurrence_window
+        return clone
 
-class EventOccurrenceManager(Manager):
     @staticmethod
     def _get_min_time(dt):
         """
@@ -18,11 +49,399 @@ class EventOccurrenceManager(Manager):
         """
         return dt.replace(hour=0, minute=0, second=0)
 
-    def in_date_range(self, start, end):
+    @property
+    def expands_recurrences(self):
+        """True when recurring occurrences will be expanded."""
+        return self._recurrence_window is not None
+
+    def expand_recurrences(self, start, end, overlap=False):
+        """
+        Expand recurring occurrences into their instances within a date range.
+
+        :param start: aware datetime, the start of the range, or None to
+            stop expanding recurring occurrences
+        :param end: aware datetime, the end of the range
+        :param overlap: also expand the instances which started before the
+            range and end within or after it
+        :return: EventOccurrenceQuerySet
+        """
+        clone = self._clone()
+        clone._recurrence_window = (start, end, overlap) if start is not None else None
+        return clone
+
+    def _get_overlap_filter(self, start, end):
+        """
+        Build the filter of the concrete occurrences overlapping a date range.
+
+        The occurrences of each duration bucket can only have started so long
+        before the range, so every bucket is a bounded range of its
+        (duration_bucket, start_date) index. The terms are kept separate so
+        each of them can be answered from an index.
+
+        :param start: aware datetime, the start of the range
+        :param end: aware datetime, the end of the range
+        :return: Q object
+        """
+        overlap = Q(end_date__isnull=True, start_date__gte=start, start_date__lte=end)
+        overlap |= Q(duration_bucket__gte=MAX_DURATION_BUCKET, start_date__lte=end, end_date__gte=start)
+        for bucket in range(MAX_DURATION_BUCKET):
+            overlap |= Q(
+                duration_bucket=bucket,
+                start_date__gte=start - timedelta(days=2 ** bucket),
+                start_date__lte=end,
+                end_date__gte=start,
+            )
+        return overlap
+
+    def _filter_range_overlap(self, start, end):
+        """
+        Filter the occurrences overlapping a date range, concrete & recurring,
+        on PostgreSQL using the GiST index of their tstzrange.
+
+        :param start: datetime, the start of the range, naive datetimes are
+            read in the default timezone like the field lookups read them
+        :param end: datetime, the end of the range
+        :return: EventOccurrenceQuerySet
+        """
+        quote_name = connections[self.db].ops.quote_name
+        # Raw params skip the conversion of naive datetimes the field lookups
+        # make, e.g. of the month & year starts.
+        field = self.model._meta.get_field('start_date')
+        start, end = [field.get_prep_value(value) for value in (start, end)]
+        columns = dict(
+            (name, '{}.{}'.format(quote_name(self.model._meta.db_table), quote_name(name)))
+            for name in ('start_date', 'end_date', 'is_recurring', 'recurrence_end')
+        )
+        return self.extra(
+            where=[
+                "tstzrange({start_date}, greatest({start_date}, {end_date}), '[]') && tstzrange(%s, %s, '[]')"
+                " OR ({is_recurring} AND {start_date} <= %s"
+                " AND ({recurrence_end} IS NULL OR {recurrence_end} >= %s))".format(**columns),
+            ],
+            params=[start, end, end, start],
+        )
+
+    def in_date_range(self, start, end, overlap=False):
         """
         Get event dates that appear between the start and end dates
+
+        :param start: datetime, the range starts at midnight of its day
+        :param end: datetime, the end of the range, inclusive
+        :param overlap: also get the occurrences which started before the
+            range and end within or after it, rather than only the
+            occurrences starting within the range
         :return: Filtered django model queryset
         """
         start = self._get_min_time(start)
-        end = self._get_min_time(end)
-        return self.filter(start_date__gte=start, start_date__lte=end)
+        if overlap and connections[self.db].vendor == 'postgresql':
+            return self._filter_range_overlap(start, end).expand_recurrences(start, end, overlap)
+
+        if overlap:
+            concrete = self._get_overlap_filter(start, end)
+        else:
+            concrete = Q(start_date__gte=start, start_date__lte=end)
+        return self.filter(
+            concrete |
+            Q(is_recurring=True, start_date__lte=end) & (
+                Q(recurrence_end__isnull=True) | Q(recurrence_end__gte=start)
+            )
+        ).expand_recurrences(start, end, overlap)
+
+    def _check_detached(self):
+        """
+        Check the occurrences can be changed in bulk: while they're stored in
+        the EventDetail revisions, publishing a revision would revert them.
+
+        :raises ImproperlyConfigured: unless WAGTAIL_EVENTS_DETACHED_OCCURRENCES is enabled
+        """
+        if not occurrences_detached():
+            raise ImproperlyConfigured(
+                'Occurrences can only be changed in bulk when WAGTAIL_EVENTS_DETACHED_OCCURRENCES is enabled.'
+            )
+
+    def _get_bulk_targets(self):
+        """
+        Add the overrides of the recurring occurrences to the occurrences,
+        so the instances they replace are changed together with the rules.
+
+        :return: tuple of the queryset of the occurrences & overrides, the
+            set of the ids of the index pages listing them & the set of the
+            ids of the events with recurring occurrences
+        """
+        names = [
+            name for name in ('event', 'index_page')
+            if any(field.name == name for field in self.model._meta.concrete_fields)
+        ]
+        index_ids = set()
+        recurring_event_ids = set()
+        rows = self.order_by().values_list('is_recurring', *['{}_id'.format(name) for name in names]).distinct()
+        for row in rows:
+            values = dict(zip(names, row[1:]))
+            if row[0] and values.get('event') is not None:
+                recurring_event_ids.add(values['event'])
+            index_ids.add(values.get('index_page'))
+
+        queryset = self.order_by()
+        if recurring_event_ids:
+            queryset |= self.model._default_manager.filter(
+                event_id__in=recurring_event_ids,
+                recurrence_id__isnull=False,
+            ).order_by()
+        return queryset, index_ids, recurring_event_ids
+
+    def _get_recurrence_id_expression(self, delta, recurring_event_ids, default):
+        """
+        Build the expression moving the recurrence ids of the overrides of
+        the recurring occurrences moved or copied.
+
+        :param delta: timedelta
+        :param recurring_event_ids: ids of the events with recurring occurrences
+        :param default: expression of the other recurrence ids
+        :return: expression
+        """
+        if not recurring_event_ids:
+            return default
+        field = self.model._meta.get_field('recurrence_id')
+        moved = ExpressionWrapper(F('recurrence_id') + delta, output_field=field)
+        return Case(When(event_id__in=recurring_event_ids, then=moved), default=default, output_field=field)
+
+    @staticmethod
+    def _invalidate(index_ids):
+        """
+        Invalidate the cached data of index pages once, as the bulk
+        operations don't send the save & delete signals of each occurrence.
+
+        :param index_ids: set of index page ids, may contain None
+        """
+        for index_id in index_ids:
+            if index_id is not None:
+                bump_index_version(index_id)
+
+    @staticmethod
+    def _get_duration_bucket_expression(offset):
+        """
+        Build the expression of the duration bucket of the occurrences once
+        their start date is moved by offset more than their end date, so the
+        buckets are computed by the UPDATE statement, see get_duration_bucket.
+
+        :param offset: timedelta
+        :return: Case expression
+        """
+        whens = [When(end_date__isnull=True, then=Value(0))]
+        for bucket in range(MAX_DURATION_BUCKET):
+            whens.append(When(
+                end_date__lte=F('start_date') + (offset + timedelta(days=2 ** bucket)),
+                then=Value(bucket),
+            ))
+        return Case(*whens, default=Value(MAX_DURATION_BUCKET), output_field=PositiveSmallIntegerField())
+
+    def bulk_shift(self, delta, end_delta=None):
+        """
+        Move the occurrences with a single UPDATE statement, without sending
+        their save signals.
+
+        The overrides of the recurring occurrences are moved with them,
+        including their recurrence ids. Recurrence rules are left unchanged.
+
+        :param delta: timedelta added to the start dates
+        :param end_delta: timedelta added to the end dates, defaults to delta
+        :return: number of occurrences moved
+        :raises ImproperlyConfigured: unless the occurrences are detached
+        :raises ValidationError: when an occurrence would end before it starts,
+            nothing is changed
+        """
+        self._check_detached()
+        end_delta = delta if end_delta is None else end_delta
+        queryset, index_ids, recurring_event_ids = self._get_bulk_targets()
+        values = {
+            'start_date': F('start_date') + delta,
+            'end_date': F('end_date') + end_delta,
+            'recurrence_end': F('recurrence_end') + delta,
+            'recurrence_id': self._get_recurrence_id_expression(delta, recurring_event_ids, F('recurrence_id')),
+        }
+        if end_delta == delta:
+            count = queryset.update(**values)
+        else:
+            with transaction.atomic(using=self.db):
+                # The end-before-start check of clean, for every row at once.
+                if queryset.filter(end_date__lt=F('start_date') + (delta - end_delta)).exists():
+                    raise ValidationError({'end_date': 'The end date cannot be before the start date.'})
+                values['duration_bucket'] = self._get_duration_bucket_expression(delta - end_delta)
+                count = queryset.update(**values)
+        self._invalidate(index_ids)
+        return count
+
+    def bulk_clone(self, delta, **values):
+        """
+        Copy the occurrences with a single INSERT ... SELECT statement,
+        without sending their save signals.
+
+        The overrides of the recurring occurrences are copied with them, the
+        copies of other overrides become plain occurrences. The copies don't
+        keep the uid of imported occurrences.
+
+        :param delta: timedelta added to the dates of the copies
+        :param values: field values of the copies, rather than the values of
+            the occurrences copied, e.g. event_id
+        :return: number of occurrences copied
+        :raises ImproperlyConfigured: unless the occurrences are detached
+        """
+        self._check_detached()
+        queryset, index_ids, recurring_event_ids = self._get_bulk_targets()
+        meta = self.model._meta
+        columns = OrderedDict()
+        for field in meta.concrete_fields:
+            if not field.primary_key:
+                columns[field.attname] = F(field.attname)
+        for name in ('start_date', 'end_date', 'recurrence_end'):
+            columns[name] = ExpressionWrapper(F(name) + delta, output_field=meta.get_field(name))
+        columns['recurrence_id'] = self._get_recurrence_id_expression(
+            delta,
+            recurring_event_ids,
+            Value(None, output_field=meta.get_field('recurrence_id')),
+        )
+        values.setdefault('uid', '')
+        for name, value in values.items():
+            field = meta.get_field(name)
+            columns[field.attname] = Value(value, output_field=field)
+
+        # Annotations are selected in the order they're added.
+        names = []
+        for position, expression in enumerate(columns.values()):
+            names.append('_bulk_clone_{}'.format(position))
+            queryset = queryset.annotate(**{names[-1]: expression})
+        select, params = queryset.values_list(*names).query.get_compiler(self.db).as_sql()
+
+        connection = connections[self.db]
+        sql = 'INSERT INTO {} ({}) {}'.format(
+            connection.ops.quote_name(meta.db_table),
+            ', '.join(connection.ops.quote_name(meta.get_field(name).column) for name in columns),
+            select,
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            count = cursor.rowcount
+        index_ids.add(values.get('index_page_id'))
+        self._invalidate(index_ids)
+        return count
+
+    def bulk_delete(self):
+        """
+        Delete the occurrences with a single DELETE statement, without
+        sending their delete signals or deleting the rows referencing them.
+
+        The overrides of the recurring occurrences are deleted with them.
+
+        :return: number of occurrences deleted
+        :raises ImproperlyConfigured: unless the occurrences are detached
+        """
+        self._check_detached()
+        queryset, index_ids, recurring_event_ids = self._get_bulk_targets()
+        count = queryset._raw_delete(self.db)
+        self._invalidate(index_ids)
+        return count
+
+    @property
+    def _expands_rows(self):
+        """True when recurring occurrences will be expanded from model instances or values() dicts."""
+        return self.expands_recurrences and self._iterable_class in (ModelIterable, ValuesIterable)
+
+    def concrete_occurrences(self):
+        """
+        Get the occurrences which don't recur, without expanding anything.
+
+        :return: EventOccurrenceQuerySet
+        """
+        return self.filter(is_recurring=False).expand_recurrences(None, None)
+
+    def get_recurring_instances(self):
+        """
+        Expand the recurring occurrences within the queryset date range,
+        only fetching the recurring rows. The instances are cached on the
+        queryset.
+
+        :return: list of occurrences sorted by start_date
+        """
+        if self._recurring_cache is None:
+            rows = self.filter(is_recurring=True).expand_recurrences(None, None)
+            self._recurring_cache = list(self._expand(rows)) if self.expands_recurrences else []
+        return self._recurring_cache
+
+    def _expand(self, occurrences):
+        """Expand the recurring occurrences within the queryset date range."""
+        start, end, overlap = self._recurrence_window
+        return recurrence.expand(self.model, occurrences, start, end, overlap)
+
+    def _fetch_all(self):
+        if self._result_cache is None and self.expands_recurrences:
+            self._result_cache = list(self._expand(self._iterable_class(self)))
+        super(EventOccurrenceQuerySet, self)._fetch_all()
+
+    def iterator(self, *args, **kwargs):
+        iterator = super(EventOccurrenceQuerySet, self).iterator(*args, **kwargs)
+        if self.expands_recurrences:
+            return self._expand(iterator)
+        return iterator
+
+    def __getitem__(self, k):
+        if not self._expands_rows or self._result_cache is not None:
+            return super(EventOccurrenceQuerySet, self).__getitem__(k)
+
+        instances = self.get_recurring_instances()
+        if not instances:
+            return self.concrete_occurrences()[k]
+
+        stop = k.stop if isinstance(k, slice) else k + 1
+        if stop is None or stop < 0:
+            self._fetch_all()
+            return super(EventOccurrenceQuerySet, self).__getitem__(k)
+        # The instances of recurring occurrences only exist in python, so
+        # the first rows of the concrete occurrences are merged with them.
+        return list(recurrence.merge(self.concrete_occurrences()[:stop], instances))[k]
+
+    def count(self):
+        if not self._expands_rows or self._result_cache is not None:
+            return super(EventOccurrenceQuerySet, self).count()
+
+        if self._recurring_cache is None:
+            counts = self.order_by().aggregate(
+                concrete=Count(Case(When(is_recurring=False, then=Value(1)))),
+                recurring=Count(Case(When(is_recurring=True, then=Value(1)))),
+            )
+            if not counts['recurring']:
+                self._recurring_cache = []
+            return counts['concrete'] + len(self.get_recurring_instances())
+        return self.concrete_occurrences().count() + len(self._recurring_cache)
+
+
+class EventOccurrenceManager(Manager):
+    def get_queryset(self):
+        return EventOccurrenceQuerySet(self.model, using=self._db)
+
+    def in_date_range(self, start, end, overlap=False):
+        """
+        Get event dates that appear between the start and end dates
+        :return: Filtered django model queryset
+        """
+        return self.get_queryset().in_date_range(start, end, overlap)
+
+    def bulk_shift(self, delta, end_delta=None):
+        """
+        Move every occurrence, see EventOccurrenceQuerySet.bulk_shift.
+        :return: number of occurrences moved
+        """
+        return self.get_queryset().bulk_shift(delta, end_delta)
+
+    def bulk_clone(self, delta, **values):
+        """
+        Copy every occurrence, see EventOccurrenceQuerySet.bulk_clone.
+        :return: number of occurrences copied
+        """
+        return self.get_queryset().bulk_clone(delta, **values)
+
+    def bulk_delete(self):
+        """
+        Delete every occurrence, see EventOccurrenceQuerySet.bulk_delete.
+        :return: number of occurrences deleted
+        """
+        return self.get_queryset().bulk_delete()
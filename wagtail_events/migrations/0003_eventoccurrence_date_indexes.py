@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 09:12
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtail_events', '0002_rename_events_models'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='eventoccurrence',
+            index_together=set([('start_date', 'end_date'), ('event', 'start_date')]),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 12:02
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtail_events', '0003_eventoccurrence_date_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventoccurrence',
+            name='is_recurring',
+            field=models.BooleanField(db_index=True, default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='eventoccurrence',
+            name='recurrence',
+            field=models.TextField(blank=True, help_text='Repeat this date using RFC 5545 RRULE, RDATE and EXDATE lines, e.g. "RRULE:FREQ=WEEKLY;COUNT=10". Dates are read as local times.'),
+        ),
+        migrations.AddField(
+            model_name='eventoccurrence',
+            name='recurrence_end',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='eventoccurrence',
+            name='recurrence_id',
+            field=models.DateTimeField(blank=True, help_text='Replace a single date of a repeating date of the same event, by entering the original start date of that date.', null=True),
+        ),
+    ]
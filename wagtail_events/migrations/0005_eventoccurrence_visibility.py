@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 12:12
+from __future__ import unicode_literals
+
+from collections import defaultdict
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+#: The length of each step of the page paths, Page.steplen at the time of the migration.
+STEPLEN = 4
+
+
+def copy_visibility(apps, schema_editor):
+    """Copy the visibility of the existing EventDetail pages onto their occurrences."""
+    EventDetail = apps.get_model('wagtail_events', 'EventDetail')
+    EventOccurrence = apps.get_model('wagtail_events', 'EventOccurrence')
+    Page = apps.get_model('wagtailcore', 'Page')
+    events = list(EventDetail.objects.values_list('pk', 'path', 'live', 'show_in_menus'))
+    parents = dict(Page.objects.filter(
+        path__in=set(path[:-STEPLEN] for pk, path, live, show_in_menus in events),
+    ).values_list('path', 'pk'))
+
+    # One update for each combination of values.
+    groups = defaultdict(list)
+    for pk, path, live, show_in_menus in events:
+        groups[(parents.get(path[:-STEPLEN]), live, show_in_menus)].append(pk)
+    for (index_id, live, show_in_menus), event_ids in groups.items():
+        for first in range(0, len(event_ids), 500):
+            EventOccurrence.objects.filter(event_id__in=event_ids[first:first + 500]).update(
+                index_page_id=index_id,
+                live=live,
+                show_in_menus=show_in_menus,
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtailcore', '0030_index_on_pagerevision_created_at'),
+        ('wagtail_events', '0004_eventoccurrence_recurrence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventoccurrence',
+            name='index_page',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='wagtailcore.Page'),
+        ),
+        migrations.AddField(
+            model_name='eventoccurrence',
+            name='live',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='eventoccurrence',
+            name='show_in_menus',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AlterIndexTogether(
+            name='eventoccurrence',
+            index_together=set([('start_date', 'end_date'), ('event', 'start_date'), ('index_page', 'live', 'show_in_menus', 'start_date')]),
+        ),
+        migrations.RunPython(copy_visibility, migrations.RunPython.noop),
+    ]
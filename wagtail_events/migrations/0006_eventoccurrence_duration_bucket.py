@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 12:27
+from __future__ import unicode_literals
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def get_duration_bucket(start_date, end_date):
+    """A copy of wagtail_events.utils.get_duration_bucket at the time of the migration."""
+    if not end_date or end_date <= start_date:
+        return 0
+    days = (end_date - start_date).total_seconds() / 86400
+    bucket = 0
+    while bucket < 11 and days > 2 ** bucket:
+        bucket += 1
+    return bucket
+
+
+def set_duration_buckets(apps, schema_editor):
+    """Store the duration bucket of the existing occurrences."""
+    EventOccurrence = apps.get_model('wagtail_events', 'EventOccurrence')
+    rows = EventOccurrence.objects.filter(end_date__isnull=False).values_list('pk', 'start_date', 'end_date')
+    buckets = defaultdict(list)
+    for pk, start_date, end_date in rows.iterator():
+        bucket = get_duration_bucket(start_date, end_date)
+        if bucket:
+            buckets[bucket].append(pk)
+    for bucket, pks in buckets.items():
+        for first in range(0, len(pks), 500):
+            EventOccurrence.objects.filter(pk__in=pks[first:first + 500]).update(duration_bucket=bucket)
+
+
+RANGE_INDEX = 'wagtail_events_eventoccurrence_range_gist'
+
+
+def create_range_index(apps, schema_editor):
+    """Index the range covered by each occurrence on PostgreSQL."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "CREATE INDEX {} ON wagtail_events_eventoccurrence USING gist "
+        "(tstzrange(start_date, greatest(start_date, end_date), '[]'))".format(RANGE_INDEX)
+    )
+
+
+def drop_range_index(apps, schema_editor):
+    """Remove the PostgreSQL range index."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS {}'.format(RANGE_INDEX))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtail_events', '0005_eventoccurrence_visibility'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventoccurrence',
+            name='duration_bucket',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterIndexTogether(
+            name='eventoccurrence',
+            index_together=set([('start_date', 'end_date'), ('event', 'start_date'), ('duration_bucket', 'start_date'), ('index_page', 'live', 'show_in_menus', 'start_date')]),
+        ),
+        migrations.RunPython(set_duration_buckets, migrations.RunPython.noop),
+        migrations.RunPython(create_range_index, drop_range_index),
+    ]
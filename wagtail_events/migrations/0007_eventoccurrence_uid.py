@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 12:31
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtail_events', '0006_eventoccurrence_duration_bucket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventoccurrence',
+            name='uid',
+            field=models.CharField(blank=True, editable=False, help_text='Identifier of the date in the system it was imported from.', max_length=255),
+        ),
+        migrations.AlterIndexTogether(
+            name='eventoccurrence',
+            index_together=set([('event', 'start_date'), ('duration_bucket', 'start_date'), ('index_page', 'live', 'show_in_menus', 'start_date'), ('start_date', 'end_date'), ('event', 'uid')]),
+        ),
+    ]
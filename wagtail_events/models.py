@@ -6,8 +6,15 @@ wagtail_events models.
 from __future__ import unicode_literals
 
 import datetime
+import hashlib
 import re
 
+from dateutil import parser as date_parser
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.db.models import Count, Max
+from django.http import JsonResponse, StreamingHttpResponse
 from django.utils import timezone
 from modelcluster.fields import ParentalKey
 from wagtail.contrib.wagtailroutablepage.models import RoutablePageMixin, route
@@ -16,24 +23,130 @@ from wagtail.wagtailcore.fields import RichTextField
 from wagtail.wagtailcore.models import Page
 
 from wagtail_events import abstract_models as abstracts
+from wagtail_events import conflicts
 from wagtail_events import date_filters
+from wagtail_events import ical
+from wagtail_events import instrumentation
+from wagtail_events import occurrence_index
+from wagtail_events.cache import AgendaCache, bump_index_version, get_index_version
+from wagtail_events.forms import EventDetailForm
+from wagtail_events.navigation import AgendaNavigation
+from wagtail_events.rich_text import prime_rich_text
 from wagtail_events import utils
+from wagtail_events.utils import occurrences_detached
 
 
 class EventDetail(RoutablePageMixin, Page):
     """ """
     body = RichTextField()
 
-    content_panels = Page.content_panels + [
-        FieldPanel('body'),
-        InlinePanel('events', label='Event Dates'),
-    ]
+    # Wagtail caches the edit handler of each page type, so the setting is
+    # only read when the models are imported.
+    content_panels = Page.content_panels + [FieldPanel('body')] + (
+        [] if occurrences_detached() else [InlinePanel('events', label='Event Dates')]
+    )
+
+    base_form_class = EventDetailForm
+
+    # Set while the event is saved, see EventDetail.save.
+    _occurrence_visibility = None
+
+    #: Let the dates of the event overlap each other. Set it to False on a
+    #: subclass to reject overlapping dates when they're edited or imported.
+    allow_overlapping_occurrences = True
 
     @route(r'(?P<pk>\d+)/$', name='event_detail')
     def event_view(self, request, *args, **kwargs):
         from wagtail_events.views import EventOccurrenceDetailView
         return EventOccurrenceDetailView.as_view()(request, *args, **kwargs)
 
+    def get_context(self, request, *args, **kwargs):
+        """
+        Adds the occurrences of the event to the context, rendering their
+        bodies together with the page body.
+
+        :param request: HttpRequest instance
+        :param args: default positional args
+        :param kwargs: default keyword args
+        :return: Context data to use when rendering the template
+        """
+        context = super(EventDetail, self).get_context(request, *args, **kwargs)
+        context['occurrences'] = utils.prime_occurrence_urls(list(self.events.all()))
+        prime_rich_text([self] + context['occurrences'])
+        return context
+
+    def serializable_data(self):
+        """
+        Serialize the page for its revisions, leaving the occurrences out
+        when they're detached, so revisions stay small however many
+        occurrences the event has.
+
+        :return: dict
+        """
+        data = super(EventDetail, self).serializable_data()
+        if occurrences_detached():
+            data.pop('events', None)
+        return data
+
+    @classmethod
+    def from_serializable_data(cls, data, *args, **kwargs):
+        """
+        Build the page from a revision, ignoring the occurrences of revisions
+        saved before they were detached, which would replace the current ones
+        when published.
+
+        :param data: dict
+        :return: EventDetail instance
+        """
+        if occurrences_detached() and 'events' in data:
+            data = dict(data)
+            data.pop('events')
+        return super(EventDetail, cls).from_serializable_data(data, *args, **kwargs)
+
+    def get_occurrence_visibility(self):
+        """
+        Get the values copied onto the occurrences of the event, so they
+        can be listed without querying the page tree.
+
+        :return: dict of EventOccurrence field values
+        """
+        parent = self.get_parent()
+        return {
+            'index_page_id': parent.pk if parent is not None else None,
+            'live': self.live,
+            'show_in_menus': self.show_in_menus,
+        }
+
+    def save(self, *args, **kwargs):
+        """
+        Copy the visibility onto the occurrences saved with the event once,
+        rather than for each occurrence, and invalidate its EventIndex once
+        they're all saved.
+        """
+        from wagtail_events.signal_handlers import occurrence_invalidation_suspended
+        visibility = self._occurrence_visibility = self.get_occurrence_visibility()
+        try:
+            with occurrence_invalidation_suspended():
+                result = super(EventDetail, self).save(*args, **kwargs)
+        finally:
+            self._occurrence_visibility = None
+        # The post_save signal is sent before the occurrences are saved.
+        if visibility['index_page_id'] is not None:
+            bump_index_version(visibility['index_page_id'])
+        return result
+
+    def sync_occurrence_visibility(self):
+        """
+        Update the visibility copied onto the occurrences of the event.
+
+        :return: set of ids of the index pages which listed the occurrences
+        """
+        occurrences = EventOccurrence.objects.filter(event=self)
+        index_ids = set(occurrences.order_by().values_list('index_page_id', flat=True).distinct())
+        occurrences.update(**self.get_occurrence_visibility())
+        index_ids.discard(None)
+        return index_ids
+
     parent_page_types = ['wagtail_events.EventIndex']
     subpage_types = []
 
@@ -43,16 +156,76 @@ class EventOccurrence(abstracts.AbstractEventOccurrence):
     body = RichTextField()
     event = ParentalKey(EventDetail, related_name='events')
 
+    # Copied from the EventDetail, see EventDetail.get_occurrence_visibility.
+    index_page = models.ForeignKey(
+        'wagtailcore.Page',
+        blank=True,
+        null=True,
+        editable=False,
+        on_delete=models.SET_NULL,
+        related_name='+',
+    )
+    live = models.BooleanField(default=False, editable=False)
+    show_in_menus = models.BooleanField(default=False, editable=False)
+
+    # Populated by utils.prime_occurrence_urls or the first url lookup.
+    _url = None
+
     @property
     def url(self):
         """Returns the full url of the object."""
+        if self._url is None:
+            self._url = self.get_url()
+        return self._url
+
+    @instrumentation.instrumented('url', rows=None)
+    def get_url(self, event_url=None):
+        """
+        Build the full url of the object.
+
+        :param event_url: url of the related EventDetail, if already known
+        :return: url string, or None when the EventDetail isn't routable
+        """
+        if event_url is None:
+            event_url = self.event.url
+            if event_url is None:
+                return None
         url = self.event.reverse_subpage('event_detail', kwargs={'pk': self.pk})
-        return self.event.url + url
+        return event_url + url
 
     panels = abstracts.AbstractEventOccurrence.panels + [FieldPanel('body')]
 
+    class Meta(abstracts.AbstractEventOccurrence.Meta):
+        """Django model meta options."""
+        index_together = abstracts.AbstractEventOccurrence.Meta.index_together + [
+            ['event', 'start_date'],
+            ['index_page', 'live', 'show_in_menus', 'start_date'],
+            ['event', 'uid'],
+        ]
+
+    def clean(self):
+        """
+        Check the occurrence doesn't overlap another occurrence of its event
+        when they're detached, otherwise EventDetailForm checks them together.
+        """
+        super(EventOccurrence, self).clean()
+        if not occurrences_detached() or not self.event_id or not self.start_date:
+            return
+        if self.event.specific_class.allow_overlapping_occurrences:
+            return
+        overlapping = conflicts.find_occurrence_conflicts(self, EventOccurrence.objects.filter(event_id=self.event_id))
+        if overlapping:
+            raise ValidationError({'start_date': conflicts.get_conflict_message(overlapping[0])})
+
+    def save(self, *args, **kwargs):
+        """Copy the visibility of the EventDetail."""
+        visibility = self.event._occurrence_visibility or self.event.get_occurrence_visibility()
+        for name, value in visibility.items():
+            setattr(self, name, value)
+        super(EventOccurrence, self).save(*args, **kwargs)
 
-class EventIndex(abstracts.AbstractEventIndex):
+
+class EventIndex(RoutablePageMixin, abstracts.AbstractEventIndex):
     """ """
     body = RichTextField()
 
@@ -60,26 +233,61 @@ class EventIndex(abstracts.AbstractEventIndex):
         FieldPanel('body'),
     ]
 
-    def _get_children(self, request):
+    agenda_cache_class = AgendaCache
+
+    default_period = 'day'
+    time_periods = {
+        'year': date_filters.get_year_agenda,
+        'week': date_filters.get_week_agenda,
+        'month': date_filters.get_month_agenda,
+        'day': date_filters.get_day_agenda,
+        'calendar': date_filters.get_month_grid,
+    }
+
+    #: Number of occurrences listed on each day of the calendar.
+    calendar_per_day = 3
+
+    #: List the occurrences overlapping each year, month, week & day, e.g.
+    #: festivals which started before it, rather than only the occurrences
+    #: starting within it.
+    overlapping_occurrences = False
+
+    def get_period_kwargs(self, period):
         """
-        Gets the EventOccurrences related to the EventDetails.
+        Get extra keyword arguments for a time period function.
 
-        :param request: django request
-        :return: Queryset of child model instances
+        :param period: time period name
+        :return: dict of keyword arguments
         """
-        qs = super(EventIndex, self)._get_children(request)
+        if period == 'calendar':
+            return {'per_day': self.calendar_per_day}
+        if self.overlapping_occurrences:
+            return {'overlap': True}
+        return {}
 
-        default_period = 'day'
-        time_periods = {
-            'year': date_filters.get_year_agenda,
-            'week': date_filters.get_week_agenda,
-            'month': date_filters.get_month_agenda,
-            default_period: date_filters.get_day_agenda,
-        }
-        period = request.GET.get('scope', default_period).lower()
+    def get_agenda_cache(self):
+        """
+        Returns the cache to store agendas in, or None when caching is disabled.
 
-        if period not in time_periods.keys():
-            return {'items': EventOccurrence.objects.filter(event__in=qs)}
+        :return: AgendaCache instance or None
+        """
+        if not getattr(settings, 'WAGTAIL_EVENTS_AGENDA_CACHE', False):
+            return None
+        return self.agenda_cache_class(self)
+
+    def get_period(self, request, default_period=None):
+        """
+        Get the time period and start date requested.
+
+        :param request: django request
+        :param default_period: period used when no scope is requested,
+            defaults to default_period
+        :return: tuple of period name & start_date, the period is None
+            when the requested scope isn't a known time period
+        """
+        period = request.GET.get('scope', default_period or self.default_period).lower()
+        if period not in self.time_periods.keys():
+            return None, None
 
         start_date = request.GET.get('start_date', '')
         if re.match(self.get_dateformat(), start_date):
@@ -92,7 +300,388 @@ class EventIndex(abstracts.AbstractEventIndex):
                 second=0,
                 microsecond=0,
             )
+        return period, start_date
+
+    def get_occurrences(self, request):
+        """
+        Gets the EventOccurrences of the EventDetails listed by the index,
+        from the visibility copied onto the occurrences rather than
+        querying the page tree.
+
+        :param request: django request
+        :return: EventOccurrence queryset
+        """
+        occurrences = EventOccurrence.objects.filter(index_page=self, show_in_menus=True)
+        if not getattr(request, 'is_preview', False):
+            occurrences = occurrences.filter(live=True)
+        return occurrences
+
+    def get_agenda(self, request, default_period=None):
+        """
+        Gets the EventOccurrences related to the EventDetails.
+
+        :param request: django request
+        :param default_period: period used when no scope is requested
+        :return: agenda data dictionary, the items are a lazy queryset
+        """
+        qs = self.get_occurrences(request)
+
+        period, start_date = self.get_period(request, default_period)
+        if period is None:
+            return {'items': qs.select_related('event')}
+        return self.time_periods[period](
+            EventOccurrence,
+            qs,
+            start_date,
+            **self.get_period_kwargs(period)
+        )
+
+    #: Look up the agenda occurrences in an in-process index rather than
+    #: querying the database, see wagtail_events.occurrence_index.
+    use_occurrence_index = False
+
+    def get_indexed_agenda(self, request):
+        """
+        Gets the agenda from the in-process occurrence index.
+
+        :param request: django request
+        :return: agenda data dictionary, the items are an OccurrenceRange,
+            or None when the agenda can't be looked up in the index
+        """
+        if not self.use_occurrence_index or getattr(request, 'is_preview', False):
+            return None
+        if self.overlapping_occurrences:
+            # The index only knows when the occurrences start.
+            return None
+
+        agenda = self.get_agenda(request)
+        if 'start_date' not in agenda or 'weeks' in agenda:
+            return None
+
+        index = occurrence_index.registry.get(self, self.get_occurrences(request))
+        if index is None:
+            return None
+
+        end_date = agenda['end_date']
+        if not isinstance(end_date, datetime.datetime):
+            # The year agenda ends before the first day of the next year.
+            end_date = utils.date_to_datetime(end_date) - datetime.timedelta(microseconds=1)
+        return dict(agenda, items=index.get_range(
+            agenda['start_date'],
+            end_date,
+            self.get_listing_fields(),
+        ))
+
+    def get_listing_agenda(self, request):
+        """
+        Gets the agenda to list, only fetching the listing fields of the
+        occurrences.
 
-        return time_periods[period](EventOccurrence, qs, start_date)
+        :param request: django request
+        :return: agenda data dictionary
+        """
+        agenda = self.get_agenda(request)
+        fields = self.get_listing_fields()
+        if fields and hasattr(agenda['items'], 'only'):
+            agenda['items'] = agenda['items'].only(*fields)
+        return agenda
+
+    @instrumentation.instrumented('_get_children')
+    def _get_children(self, request):
+        """
+        Gets the EventOccurrences related to the EventDetails, from the
+        occurrence index or the agenda cache when they're enabled.
+
+        :param request: django request
+        :return: agenda data dictionary
+        """
+        agenda = self.get_indexed_agenda(request)
+        if agenda is not None:
+            return agenda
+
+        agenda_cache = self.get_agenda_cache()
+        if agenda_cache is None or request.is_preview:
+            return self.get_listing_agenda(request)
+
+        period, start_date = self.get_period(request)
+        key_parts = (period, start_date.isoformat() if start_date else None)
+        agenda = agenda_cache.get(*key_parts)
+        if agenda == agenda_cache.too_large:
+            return self.get_listing_agenda(request)
+        if agenda is None:
+            agenda = agenda_cache.set(self.get_listing_agenda(request), *key_parts)
+        return agenda
+
+    def get_items_fingerprint(self, items, *parts):
+        """
+        Get values identifying the current version of a set of occurrences,
+        using a single aggregate query.
+
+        The version of the EventIndex is included, as it's bumped by every
+        change of its occurrences, including unpublishing, deletes, imports
+        & bulk changes. No last modified date is returned: the publication
+        dates of the occurrences listed can go backwards.
+
+        :param items: EventOccurrence queryset
+        :param parts: extra values to include in the ETag
+        :return: tuple of ETag string & None
+        """
+        data = items.order_by().aggregate(
+            last_published_at=Max('event__last_published_at'),
+            max_pk=Max('pk'),
+            count=Count('pk'),
+        )
+        fingerprint = ':'.join(['{}'.format(value) for value in (
+            self.pk,
+            self.last_published_at,
+            get_index_version(self.pk),
+            data['last_published_at'],
+            data['max_pk'],
+            data['count'],
+        ) + parts])
+        etag = hashlib.md5(fingerprint.encode('utf-8')).hexdigest()
+        return etag, None
+
+    def get_agenda_fingerprint(self, request):
+        """
+        Get values identifying the current version of the requested agenda.
+
+        :param request: django request
+        :return: tuple of ETag string & last modified datetime
+        """
+        agenda = self.get_indexed_agenda(request)
+        if agenda is not None:
+            # The index is rebuilt whenever its version changes.
+            fingerprint = ':'.join(['{}'.format(value) for value in (
+                self.pk,
+                self.last_published_at,
+                get_index_version(self.pk),
+                agenda['items'].first,
+                agenda['items'].last,
+                agenda.get('scope'),
+                agenda.get('start_date'),
+            )])
+            return hashlib.md5(fingerprint.encode('utf-8')).hexdigest(), None
+
+        agenda = self.get_agenda(request)
+        return self.get_items_fingerprint(
+            agenda['items'],
+            agenda.get('scope'),
+            agenda.get('start_date'),
+        )
+
+    def serve(self, request, view=None, args=None, kwargs=None):
+        """
+        Serve the page, using the agenda route unless another route matched.
+
+        :param request: django request
+        :return: HttpResponse
+        """
+        if view is None:
+            view, args, kwargs = self.resolve_subpage('/')
+        return super(EventIndex, self).serve(request, view, args, kwargs)
+
+    @route(r'^$', name='agenda')
+    def agenda_view(self, request, *args, **kwargs):
+        """
+        Serve the agenda, answering conditional requests with a
+        304 Not Modified response when it hasn't changed.
+
+        :param request: django request
+        :return: HttpResponse
+        """
+        request.is_preview = getattr(request, 'is_preview', False)
+        view = self.render_agenda
+        if request.is_preview:
+            return view(request)
+
+        etag, last_modified = self.get_agenda_fingerprint(request)
+        return utils.conditional_response(request, view, etag, last_modified)
+
+    @instrumentation.instrumented('render', rows=None)
+    def render_agenda(self, request):
+        """
+        Render the agenda template.
+
+        :param request: django request
+        :return: TemplateResponse, already rendered when instrumentation is
+            enabled so the render stage includes the template rendering
+        """
+        response = super(EventIndex, self).serve(request)
+        if instrumentation.is_enabled() and hasattr(response, 'render'):
+            response.render()
+        return response
+
+    @route(r'^feed\.ics/$', name='feed')
+    def feed_view(self, request, *args, **kwargs):
+        """
+        Stream the occurrences as an iCalendar feed.
+
+        Without a scope every occurrence is included. The since querystring
+        value limits the feed to the events published since that date, for
+        incremental syncs.
+
+        :param request: django request
+        :return: StreamingHttpResponse
+        """
+        request.is_preview = getattr(request, 'is_preview', False)
+        items = self.get_agenda(request, default_period='all')['items']
+        # Calendar clients expand recurring occurrences themselves.
+        items = items.expand_recurrences(None, None)
+
+        since = request.GET.get('since')
+        if since:
+            try:
+                since = date_parser.parse(since)
+            except (ValueError, OverflowError):
+                since = None
+            else:
+                if timezone.is_naive(since):
+                    since = timezone.make_aware(since, timezone.get_current_timezone())
+                items = items.filter(event__last_published_at__gte=since)
+
+        etag, last_modified = self.get_items_fingerprint(items, 'feed', since)
+
+        def stream(request):
+            overridden = {}
+            for event_id, recurrence_id in EventOccurrence.objects.filter(
+                event__in=items.values('event'),
+                recurrence_id__isnull=False,
+            ).values_list('event_id', 'recurrence_id'):
+                overridden.setdefault(event_id, []).append(recurrence_id)
+
+            return StreamingHttpResponse(
+                ical.iter_calendar(items.iterator(), request, self.title, overridden),
+                content_type='text/calendar; charset=utf-8',
+            )
+
+        return utils.conditional_response(request, stream, etag, last_modified)
+
+    #: Fields available from the JSON agenda, selected with the fields querystring value.
+    json_fields = ('id', 'title', 'start_date', 'end_date', 'url', 'event_id')
+
+    def get_json_fields(self, request):
+        """
+        Get the fields requested from the JSON agenda.
+
+        :param request: django request
+        :return: list of field names
+        """
+        requested = [
+            field.strip()
+            for field in request.GET.get('fields', '').split(',')
+            if field.strip() in self.json_fields
+        ]
+        return requested or list(self.json_fields)
+
+    def get_event_urls(self, event_ids):
+        """
+        Get the urls of EventDetail pages with a single query.
+
+        :param event_ids: iterable of EventDetail ids
+        :return: dict mapping EventDetail ids to urls
+        """
+        pages = Page.objects.filter(pk__in=set(event_ids)).only('url_path')
+        return dict((page.pk, page.url) for page in pages)
+
+    @route(r'^agenda\.json/$', name='agenda_json')
+    def agenda_json_view(self, request, *args, **kwargs):
+        """
+        Serve the agenda as JSON.
+
+        Only the listing fields of the occurrences are fetched, as
+        dictionaries rather than model instances.
+
+        :param request: django request
+        :return: JsonResponse
+        """
+        request.is_preview = getattr(request, 'is_preview', False)
+        agenda = self.get_agenda(request)
+        fields = self.get_json_fields(request)
+
+        def render(request):
+            items = agenda['items'].values(
+                'pk',
+                'title',
+                'start_date',
+                'end_date',
+                'event_id',
+                'recurrence',
+            )
+            data = dict(
+                (key, agenda.get(key))
+                for key in ('scope', 'start_date', 'end_date', 'next_date', 'previous_date')
+            )
+
+            if self.paginate_by:
+                page_kwarg = getattr(self.get_paginator_class(), 'page_kwarg', 'page')
+                page, paginator = self.paginate_queryset(
+                    items,
+                    request.GET.get(page_kwarg, 1) or 1,
+                )
+                items = list(page)
+                data.update(
+                    next=utils.get_page_querystring(request, page_kwarg, page, 'next'),
+                    previous=utils.get_page_querystring(request, page_kwarg, page, 'previous'),
+                )
+
+            event_urls = self.get_event_urls(item['event_id'] for item in items) if 'url' in fields else {}
+            subpage = EventDetail()
+            data['items'] = []
+            for item in items:
+                item['id'] = item['pk']
+                if 'url' in fields:
+                    event_url = event_urls.get(item['event_id'])
+                    item['url'] = event_url and event_url + subpage.reverse_subpage(
+                        'event_detail',
+                        kwargs={'pk': item['pk']},
+                    )
+                data['items'].append(dict((field, item[field]) for field in fields))
+            return JsonResponse(data)
+
+        if request.is_preview:
+            return render(request)
+
+        etag, last_modified = self.get_items_fingerprint(
+            agenda['items'],
+            'json',
+            agenda.get('scope'),
+            agenda.get('start_date'),
+            ','.join(fields),
+        )
+        return utils.conditional_response(request, render, etag, last_modified)
+
+    @instrumentation.instrumented('get_context', rows=lambda value: instrumentation.count_rows(value['children']))
+    def get_context(self, request, *args, **kwargs):
+        """
+        Adds the agenda and its navigation links to the context, resolving
+        the occurrence urls & rendering the rich text in bulk.
+
+        :param request: HttpRequest instance
+        :param args: default positional args
+        :param kwargs: default keyword args
+        :return: Context data to use when rendering the template
+        """
+        context = super(EventIndex, self).get_context(request, *args, **kwargs)
+        children = context['children']
+        context['navigation'] = AgendaNavigation(
+            request,
+            children,
+            scopes=sorted(self.time_periods.keys()),
+            page=children['items'] if context['is_paginated'] else None,
+            page_kwarg=context['page_kwarg'],
+        )
+        if 'weeks' in children:
+            # Calendars only display the occurrences listed on each day.
+            occurrences = [item for week in children['weeks'] for day in week for item in day['items']]
+        else:
+            occurrences = list(children['items'])
+        utils.prime_occurrence_urls(occurrences)
+        # Occurrence bodies are only rendered when they're listed.
+        prime_rich_text([self] + [
+            occurrence for occurrence in occurrences
+            if 'body' not in occurrence.get_deferred_fields()
+        ])
+        return context
 
     subpage_types = ['wagtail_events.EventDetail']
@@ -0,0 +1,141 @@
+# -*- coding:utf8 -*-
+"""
+Wagtail events agenda navigation.
+"""
+
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+
+try:
+    from urllib.parse import urlencode
+except ImportError:
+    from urllib import urlencode
+
+from django.utils.functional import cached_property
+
+
+class AgendaNavigation(object):
+    """
+    The links of an agenda page.
+
+    The querystring of the request is parsed once, and each link is only
+    encoded the first time it's requested, however often it's rendered.
+    """
+    def __init__(self, request, agenda=None, scopes=(), page=None, page_kwarg='page'):
+        """
+        :param request: django request
+        :param agenda: agenda data dictionary
+        :param scopes: names of the available time periods
+        :param page: django Page or CursorPage being displayed, if paginated
+        :param page_kwarg: querystring name of the page number or cursor
+        """
+        self.params = OrderedDict((key, request.GET.getlist(key)) for key in request.GET)
+        self.agenda = agenda or {}
+        self.scopes = scopes
+        self.page = page
+        self.page_kwarg = page_kwarg
+        self._urls = {}
+
+    def patch(self, key, value):
+        """
+        Build a querystring replacing one value of the request querystring.
+
+        :param key: querystring name
+        :param value: new value
+        :return: querystring, starting with '?'
+        """
+        cache_key = ('patch', key, value)
+        if cache_key not in self._urls:
+            params = self.params.copy()
+            params[key] = [value]
+            self._urls[cache_key] = '?{0}'.format(urlencode(params, doseq=True))
+        return self._urls[cache_key]
+
+    def querystring(self, exclude=(), **kwargs):
+        """
+        Build a querystring from the last value of each request querystring
+        value, without the leading '?'.
+
+        :param exclude: names of values to remove
+        :param kwargs: values to add or replace
+        :return: querystring
+        """
+        cache_key = ('querystring', tuple(exclude), tuple(kwargs.items()))
+        if cache_key not in self._urls:
+            params = OrderedDict((key, values[-1]) for key, values in self.params.items())
+            for key in exclude:
+                params.pop(key, None)
+            params.update(kwargs)
+            self._urls[cache_key] = urlencode(params)
+        return self._urls[cache_key]
+
+    def date_url(self, date):
+        """
+        Build the querystring of the agenda starting on a date.
+
+        :param date: datetime, or None
+        :return: querystring, empty when there is no date
+        """
+        if not date:
+            return ''
+        return self.patch('start_date', date.strftime('%Y.%m.%d'))
+
+    def scope_url(self, scope):
+        """
+        Build the querystring of a time period.
+
+        :param scope: time period name
+        :return: querystring
+        """
+        return self.patch('scope', scope)
+
+    @cached_property
+    def scope_urls(self):
+        """Returns a dict of time period names to querystrings."""
+        return dict((scope, self.scope_url(scope)) for scope in self.scopes)
+
+    @cached_property
+    def previous_url(self):
+        """Returns the querystring of the previous period."""
+        return self.date_url(self.agenda.get('previous_date'))
+
+    @cached_property
+    def next_url(self):
+        """Returns the querystring of the next period."""
+        return self.date_url(self.agenda.get('next_date'))
+
+    @cached_property
+    def previous_nonempty_url(self):
+        """Returns the querystring of the previous period with events."""
+        return self.date_url(self.agenda.get('previous_nonempty_date'))
+
+    @cached_property
+    def next_nonempty_url(self):
+        """Returns the querystring of the next period with events."""
+        return self.date_url(self.agenda.get('next_nonempty_date'))
+
+    def get_page_url(self, direction):
+        """
+        Build the querystring of the next or previous page.
+
+        :param direction: 'next' or 'previous'
+        :return: querystring, or None when there is no such page
+        """
+        if self.page is None or not getattr(self.page, 'has_{}'.format(direction))():
+            return None
+        if hasattr(self.page, 'next_cursor'):
+            value = getattr(self.page, '{}_cursor'.format(direction))
+        else:
+            value = getattr(self.page, '{}_page_number'.format(direction))()
+        return '?{0}'.format(self.querystring((self.page_kwarg,), **{self.page_kwarg: value}))
+
+    @cached_property
+    def previous_page_url(self):
+        """Returns the querystring of the previous page, or None."""
+        return self.get_page_url('previous')
+
+    @cached_property
+    def next_page_url(self):
+        """Returns the querystring of the next page, or None."""
+        return self.get_page_url('next')
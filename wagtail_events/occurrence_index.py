@@ -0,0 +1,219 @@
+# -*- coding:utf8 -*-
+"""
+Wagtail events in-process occurrence index.
+
+Keeps the start dates and ids of the occurrences listed by an EventIndex
+in compact sorted arrays, so the occurrences within any date range
+are found with two bisects rather than a query. Model instances are only
+fetched for the occurrences that are displayed.
+
+The index is rebuilt when the version of its EventIndex changes, which
+happens when the cached data of the EventIndex is invalidated, so the version
+counters have to be stored in a cache shared by every process.
+"""
+
+from __future__ import unicode_literals
+
+import calendar
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+
+from django.utils import timezone
+
+from wagtail_events.cache import get_index_version
+
+
+def to_timestamp(value):
+    """
+    Convert a datetime to microseconds since the epoch.
+
+    :param value: datetime, naive datetimes are read in the current timezone
+    :return: int
+    """
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value, timezone.get_current_timezone())
+    return calendar.timegm(value.utctimetuple()) * 1000000 + value.microsecond
+
+
+class OccurrenceIndex(object):
+    """Sorted arrays of occurrence start dates & ids."""
+    def __init__(self, model, rows=()):
+        """
+        :param model: EventOccurrence model class
+        :param rows: iterable of (start_date, pk) tuples, sorted by
+            start_date & pk
+        """
+        self.model = model
+        self.starts = array('q')
+        self.pks = array('q')
+        for start_date, pk in rows:
+            self.starts.append(to_timestamp(start_date))
+            self.pks.append(pk)
+
+    @classmethod
+    def build(cls, queryset):
+        """
+        Build the index of the occurrences in a queryset.
+
+        :param queryset: EventOccurrence queryset
+        :return: OccurrenceIndex, or None when the queryset contains recurring
+            occurrences, which can't be indexed
+        """
+        rows = queryset.expand_recurrences(None, None).order_by('start_date', 'pk').values_list(
+            'start_date',
+            'pk',
+            'is_recurring',
+        )
+        occurrences = []
+        for start_date, pk, is_recurring in rows.iterator():
+            if is_recurring:
+                return None
+            occurrences.append((start_date, pk))
+        return cls(queryset.model, occurrences)
+
+    def __len__(self):
+        return len(self.pks)
+
+    def bisect(self, start_date, pk=None, right=False):
+        """
+        Find the position of an occurrence key in the index.
+
+        :param start_date: datetime
+        :param pk: occurrence id, when None every occurrence starting at
+            start_date is treated as equal
+        :param right: return the position after equal keys
+        :return: int
+        """
+        start = to_timestamp(start_date)
+        first = bisect_left(self.starts, start)
+        last = bisect_right(self.starts, start, first)
+        if pk is None:
+            return last if right else first
+        return (bisect_right if right else bisect_left)(self.pks, pk, first, last)
+
+    def get_range(self, start_date, end_date, fields=None):
+        """
+        Get the occurrences starting within a date range.
+
+        :param start_date: datetime, start of the range
+        :param end_date: datetime, end of the range, inclusive
+        :param fields: names of the fields to fetch, None to fetch every field
+        :return: OccurrenceRange
+        """
+        return OccurrenceRange(
+            self,
+            self.bisect(start_date),
+            self.bisect(end_date, right=True),
+            fields,
+        )
+
+
+class OccurrenceRange(object):
+    """
+    A lazy sequence of the occurrences in part of an OccurrenceIndex.
+
+    Occurrences are fetched with a single query for each slice taken, e.g. the
+    page being displayed, and reused when they're read again.
+    """
+    #: Number of occurrences fetched at a time when iterating.
+    chunk_size = 100
+
+    def __init__(self, index, first, last, fields=None):
+        self.index = index
+        self.first = first
+        self.last = max(first, last)
+        self.fields = fields
+        self._instances = {}
+
+    def __len__(self):
+        return self.last - self.first
+
+    def count(self):
+        """Returns the number of occurrences."""
+        return len(self)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    __nonzero__ = __bool__
+
+    def fetch(self, pks):
+        """
+        Get occurrences from their ids with a single query.
+
+        :param pks: list of occurrence ids
+        :return: list of EventOccurrence instances, in the same order
+        """
+        missing = [pk for pk in pks if pk not in self._instances]
+        if missing:
+            queryset = self.index.model.objects.select_related('event')
+            if self.fields:
+                queryset = queryset.only(*self.fields)
+            self._instances.update(queryset.in_bulk(missing))
+        # Occurrences deleted since the index was built are skipped.
+        return [self._instances[pk] for pk in pks if pk in self._instances]
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            return self.fetch(list(self.index.pks[self.first + start:self.first + stop:step]))
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError('OccurrenceRange index out of range')
+        return self[key:key + 1][0]
+
+    def __iter__(self):
+        for start in range(0, len(self), self.chunk_size):
+            for occurrence in self[start:start + self.chunk_size]:
+                yield occurrence
+
+    def bisect(self, start_date, pk, right=False):
+        """
+        Find the position of an occurrence key in the range.
+
+        :param start_date: datetime
+        :param pk: occurrence id
+        :param right: return the position after an equal key
+        :return: int
+        """
+        position = self.index.bisect(start_date, pk, right)
+        return min(max(position, self.first), self.last) - self.first
+
+
+class IndexRegistry(object):
+    """The occurrence indexes of the EventIndex pages in this process."""
+    def __init__(self):
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def get(self, page, queryset):
+        """
+        Get the occurrence index of an EventIndex, building it when the
+        cached data of the EventIndex has been invalidated.
+
+        :param page: EventIndex instance
+        :param queryset: EventOccurrence queryset of the listed occurrences
+        :return: OccurrenceIndex, or None when the occurrences can't be indexed
+        """
+        version = get_index_version(page.pk)
+        entry = self._indexes.get(page.pk)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+
+        with self._lock:
+            # Another thread may have built the index while we waited.
+            entry = self._indexes.get(page.pk)
+            if entry is None or entry[0] != version:
+                entry = (version, OccurrenceIndex.build(queryset))
+                self._indexes[page.pk] = entry
+        return entry[1]
+
+    def clear(self):
+        """Forget every index."""
+        with self._lock:
+            self._indexes.clear()
+
+
+registry = IndexRegistry()
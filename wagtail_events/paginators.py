@@ -0,0 +1,209 @@
+# -*- coding:utf8 -*-
+"""
+Wagtail events paginators.
+"""
+
+from __future__ import unicode_literals
+
+import base64
+import binascii
+import bisect
+
+from dateutil import parser
+from django.core.paginator import PageNotAnInteger
+from django.db.models import Q
+from django.utils.encoding import force_bytes, force_text
+
+
+def _get_key(obj):
+    """Returns the (start_date, pk) ordering key of a model instance or values() dict."""
+    if isinstance(obj, dict):
+        return obj['start_date'], obj['pk'] if 'pk' in obj else obj['id']
+    return obj.start_date, obj.pk
+
+
+class CursorPage(object):
+    """A single page of results returned by the CursorPaginator."""
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<CursorPage of {} items>'.format(len(self))
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        """Returns True if there is a page after this one."""
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        """Returns True if there is a page before this one."""
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        """Returns True if there is a page before or after this one."""
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator(object):
+    """
+    Keyset paginator ordering results on (start_date, pk).
+
+    Unlike django's Paginator no COUNT or OFFSET queries are issued, each
+    page is fetched by seeking past the last row of the previous page.
+    """
+    page_kwarg = 'cursor'
+    ordering = ('start_date', 'pk')
+
+    def __init__(self, object_list, per_page, **kwargs):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+
+    @staticmethod
+    def encode_cursor(direction, obj):
+        """
+        Build an opaque cursor pointing at the given object.
+
+        :param direction: 'n' to page forwards, 'p' to page backwards
+        :param obj: the object the page starts after/ends before
+        :return: url safe cursor string
+        """
+        start_date, pk = _get_key(obj)
+        value = '{}|{}|{}'.format(direction, start_date.isoformat(), pk)
+        return force_text(base64.urlsafe_b64encode(force_bytes(value)))
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """
+        Decode a cursor built by encode_cursor.
+
+        :param cursor: cursor string
+        :return: tuple of direction, start_date & pk
+        """
+        try:
+            value = force_text(base64.urlsafe_b64decode(force_bytes(cursor)))
+            direction, start_date, pk = value.split('|')
+            start_date = parser.parse(start_date)
+            pk = int(pk)
+        except (TypeError, ValueError, OverflowError, binascii.Error, UnicodeDecodeError):
+            raise PageNotAnInteger('That cursor is not valid')
+        if direction not in ('n', 'p'):
+            raise PageNotAnInteger('That cursor is not valid')
+        return direction, start_date, pk
+
+    def page(self, cursor):
+        """
+        Returns the page of results following/preceding the cursor.
+
+        :param cursor: cursor string, the first page is returned for 1 or empty values
+        :return: CursorPage instance
+        """
+        # 1 is the default page number passed in by AbstractPaginatedIndex.
+        if not cursor or cursor == 1:
+            object_list = self._seek_forwards()
+            return self._build_forward_page(object_list, has_previous=False)
+
+        direction, start_date, pk = self.decode_cursor(cursor)
+        if direction == 'n':
+            object_list = self._seek_forwards(start_date, pk)
+            return self._build_forward_page(object_list, has_previous=True)
+
+        object_list = self._seek_backwards(start_date, pk)
+        has_previous = len(object_list) > self.per_page
+        object_list = object_list[:self.per_page][::-1]
+        return self._build_page(object_list, has_next=True, has_previous=has_previous)
+
+    def _can_seek_in_sql(self):
+        """
+        Check if pages can be fetched with queries.
+
+        Lists, e.g. a cached agenda, are paged through in python instead.
+        """
+        return hasattr(self.object_list, 'filter')
+
+    def _split_recurring(self):
+        """
+        Split the queryset into the concrete occurrences, which are paged
+        through in SQL, and the instances of the recurring occurrences.
+
+        :return: tuple of a queryset & a list of recurring instances
+        """
+        if not getattr(self.object_list, 'expands_recurrences', False):
+            return self.object_list, []
+        instances = sorted(self.object_list.get_recurring_instances(), key=_get_key)
+        return self.object_list.concrete_occurrences(), instances
+
+    def _get_sorted_list(self):
+        """Sort a list of objects by the paginator ordering."""
+        object_list = sorted(self.object_list, key=_get_key)
+        keys = [_get_key(obj) for obj in object_list]
+        return object_list, keys
+
+    def _seek_forwards(self, start_date=None, pk=None):
+        """Fetch up to per_page + 1 rows after the key, in ascending order."""
+        limit = self.per_page + 1
+        if hasattr(self.object_list, 'bisect'):
+            # Occurrence index ranges are already sorted.
+            index = 0 if start_date is None else self.object_list.bisect(start_date, pk, right=True)
+            return list(self.object_list[index:index + limit])
+        if not self._can_seek_in_sql():
+            object_list, keys = self._get_sorted_list()
+            index = 0 if start_date is None else bisect.bisect_right(keys, (start_date, pk))
+            return object_list[index:index + limit]
+
+        queryset, instances = self._split_recurring()
+        if start_date is not None:
+            queryset = queryset.filter(
+                Q(start_date__gt=start_date) | Q(start_date=start_date, pk__gt=pk)
+            )
+            instances = [obj for obj in instances if _get_key(obj) > (start_date, pk)]
+        object_list = list(queryset.order_by(*self.ordering)[:limit])
+        if instances:
+            object_list = sorted(object_list + instances[:limit], key=_get_key)[:limit]
+        return object_list
+
+    def _seek_backwards(self, start_date, pk):
+        """Fetch up to per_page + 1 rows before the key, in descending order."""
+        limit = self.per_page + 1
+        if hasattr(self.object_list, 'bisect'):
+            index = self.object_list.bisect(start_date, pk)
+            return list(self.object_list[max(index - limit, 0):index])[::-1]
+        if not self._can_seek_in_sql():
+            object_list, keys = self._get_sorted_list()
+            index = bisect.bisect_left(keys, (start_date, pk))
+            return object_list[max(index - limit, 0):index][::-1]
+
+        queryset, instances = self._split_recurring()
+        queryset = queryset.filter(
+            Q(start_date__lt=start_date) | Q(start_date=start_date, pk__lt=pk)
+        ).order_by(*['-{}'.format(field) for field in self.ordering])
+        object_list = list(queryset[:limit])
+        instances = [obj for obj in instances if _get_key(obj) < (start_date, pk)]
+        if instances:
+            object_list = sorted(object_list + instances[-limit:], key=_get_key, reverse=True)[:limit]
+        return object_list
+
+    def _build_forward_page(self, object_list, has_previous):
+        """Create the CursorPage for rows fetched in ascending order."""
+        has_next = len(object_list) > self.per_page
+        object_list = object_list[:self.per_page]
+        return self._build_page(object_list, has_next=has_next, has_previous=has_previous)
+
+    def _build_page(self, object_list, has_next, has_previous):
+        """Create the CursorPage instance with next/previous cursors."""
+        next_cursor = previous_cursor = None
+        if object_list and has_next:
+            next_cursor = self.encode_cursor('n', object_list[-1])
+        if object_list and has_previous:
+            previous_cursor = self.encode_cursor('p', object_list[0])
+        return CursorPage(object_list, self, next_cursor, previous_cursor)
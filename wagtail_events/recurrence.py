@@ -0,0 +1,261 @@
+# -*- coding:utf8 -*-
+"""
+Wagtail events recurrence rules.
+
+Recurring occurrences store RFC 5545 RRULE, RDATE & EXDATE lines and are
+expanded into individual instances lazily, only within the date range that
+has been requested. Rules are expanded in local time so a weekly event keeps
+its wall clock time across daylight saving changes; for the same reason
+dates in UNTIL, RDATE & EXDATE values are read as local times.
+"""
+
+from __future__ import unicode_literals
+
+import copy
+import heapq
+import itertools
+from datetime import timedelta
+
+from dateutil import rrule
+from django.utils import timezone
+
+
+def _to_local(value):
+    """Convert an aware datetime to a naive datetime in the current timezone."""
+    if timezone.is_naive(value):
+        # Naive datetimes, e.g. the year & month agenda boundaries, are
+        # already in the current timezone.
+        return value
+    return timezone.localtime(value).replace(tzinfo=None)
+
+
+def _from_local(value):
+    """Convert a naive datetime in the current timezone to an aware datetime."""
+    return timezone.make_aware(value, timezone.get_current_timezone(), is_dst=False)
+
+
+def _get(occurrence, name):
+    """Read a value from an occurrence model instance or values() dict."""
+    if isinstance(occurrence, dict):
+        if name == 'event_id' and name not in occurrence:
+            name = 'event'
+        if name == 'pk' and name not in occurrence:
+            name = 'id'
+        return occurrence.get(name)
+    return getattr(occurrence, name)
+
+
+def get_rule_set(recurrence, dtstart):
+    """
+    Parse recurrence rules.
+
+    The start date is always the first instance, as required by RFC 5545.
+
+    :param recurrence: RRULE, RDATE & EXDATE lines
+    :param dtstart: aware datetime of the first instance
+    :return: dateutil.rrule.rruleset of naive local datetimes
+    """
+    dtstart = _to_local(dtstart)
+    rule_set = rrule.rrulestr(
+        recurrence.strip(),
+        dtstart=dtstart,
+        forceset=True,
+        ignoretz=True,
+    )
+    rule_set.rdate(dtstart)
+    return rule_set
+
+
+def is_finite(recurrence):
+    """
+    Check if recurrence rules have a last instance.
+
+    :param recurrence: RRULE, RDATE & EXDATE lines
+    :return: bool
+    """
+    for line in recurrence.upper().split():
+        name, _, value = line.rpartition(':')
+        if name in ('', 'RRULE') and 'COUNT=' not in value and 'UNTIL=' not in value:
+            return False
+    return True
+
+
+def get_recurrence_end(recurrence, start_date, end_date=None):
+    """
+    Get the date the last instance of a recurring occurrence finishes.
+
+    :param recurrence: RRULE, RDATE & EXDATE lines
+    :param start_date: start date of the first instance
+    :param end_date: end date of the first instance
+    :return: aware datetime, or None when the rules repeat forever
+    """
+    if not is_finite(recurrence):
+        return None
+    last = None
+    for last in get_rule_set(recurrence, start_date):
+        pass
+    if last is None:
+        # Every instance has been excluded.
+        return end_date or start_date
+    last = _from_local(last)
+    if end_date:
+        last += end_date - start_date
+    return last
+
+
+def validate_recurrence(recurrence, start_date):
+    """
+    Check that recurrence rules can be expanded.
+
+    :param recurrence: RRULE, RDATE & EXDATE lines
+    :param start_date: start date of the first instance
+    :raises ValueError: when the rules are invalid
+    """
+    try:
+        list(itertools.islice(get_rule_set(recurrence, start_date), 2))
+    except (TypeError, ValueError, KeyError, AttributeError) as e:
+        raise ValueError('Invalid recurrence rules: {}'.format(e))
+
+
+def get_adjacent_instance(recurrence, start_date, value, before=False, inc=False):
+    """
+    Get the first instance of a recurring occurrence after a date, or the
+    last instance before it.
+
+    :param recurrence: RRULE, RDATE & EXDATE lines
+    :param start_date: start date of the first instance
+    :param value: aware datetime
+    :param before: look for the last instance before the date
+    :param inc: also match an instance starting at the date
+    :return: aware datetime, or None when there is no such instance
+    """
+    rule_set = get_rule_set(recurrence, start_date)
+    value = _to_local(value)
+    instance = rule_set.before(value, inc=inc) if before else rule_set.after(value, inc=inc)
+    return _from_local(instance) if instance is not None else None
+
+
+def _get_duration(occurrence):
+    """Returns the duration of an occurrence, or None when it has no end date."""
+    end_date = _get(occurrence, 'end_date')
+    return end_date - _get(occurrence, 'start_date') if end_date else None
+
+
+def get_instances(occurrence, start, end, overridden=(), overlap=False):
+    """
+    Generate the instances of a recurring occurrence starting within a range.
+
+    :param occurrence: recurring occurrence, model instance or values() dict
+    :param start: aware datetime, the start of the range
+    :param end: aware datetime, the end of the range
+    :param overridden: set of (event_id, start_date) tuples of instances
+        that have been replaced by another occurrence
+    :param overlap: also generate the instances which started before the
+        range and end within or after it
+    :return: generator of occurrence copies
+    """
+    start_date = _get(occurrence, 'start_date')
+    event_id = _get(occurrence, 'event_id')
+    duration = _get_duration(occurrence)
+    rule_set = get_rule_set(_get(occurrence, 'recurrence'), start_date)
+    first = start - duration if overlap and duration is not None else start
+
+    local_start = _to_local(start)
+    for value in rule_set.between(_to_local(first), _to_local(end), inc=True):
+        if value < local_start and (duration is None or value + duration < local_start):
+            # The instance finished before the range.
+            continue
+        value = _from_local(value)
+        if (event_id, value) in overridden:
+            continue
+        instance_end = value + duration if duration is not None else None
+        if isinstance(occurrence, dict):
+            yield dict(occurrence, start_date=value, end_date=instance_end)
+        else:
+            instance = copy.copy(occurrence)
+            instance.start_date = value
+            instance.end_date = instance_end
+            yield instance
+
+
+def get_overridden(model, recurring, start, end):
+    """
+    Find the instances of recurring occurrences replaced by other occurrences.
+
+    :param model: EventOccurrence model class
+    :param recurring: list of recurring occurrences
+    :param start: aware datetime, the start of the range
+    :param end: aware datetime, the end of the range
+    :return: set of (event_id, start_date) tuples
+    """
+    event_ids = set(_get(occurrence, 'event_id') for occurrence in recurring)
+    event_ids.discard(None)
+    if not event_ids:
+        return set()
+    return set(model._default_manager.filter(
+        event_id__in=event_ids,
+        recurrence_id__gte=start,
+        recurrence_id__lte=end,
+    ).values_list('event_id', 'recurrence_id'))
+
+
+def expand(model, occurrences, start, end, overlap=False):
+    """
+    Expand recurring occurrences within a range.
+
+    Concrete occurrences are passed through, the instances of recurring
+    occurrences are merged in start_date order.
+
+    :param model: EventOccurrence model class
+    :param occurrences: iterable of occurrences sorted by start_date,
+        model instances or values() dicts
+    :param start: aware datetime, the start of the range
+    :param end: aware datetime, the end of the range
+    :param overlap: also expand the instances which started before the
+        range and end within or after it
+    :return: generator of occurrences
+    """
+    concrete = []
+    recurring = []
+    for occurrence in occurrences:
+        if not isinstance(occurrence, (dict, model)) or not _get(occurrence, 'recurrence'):
+            concrete.append(occurrence)
+        else:
+            recurring.append(occurrence)
+
+    if not recurring:
+        for occurrence in concrete:
+            yield occurrence
+        return
+
+    first = start
+    if overlap:
+        durations = [_get_duration(occurrence) for occurrence in recurring]
+        first = start - max([duration for duration in durations if duration] or [timedelta(0)])
+    overridden = get_overridden(model, recurring, first, end)
+    for occurrence in merge(concrete, *[
+        get_instances(occurrence, start, end, overridden, overlap)
+        for occurrence in recurring
+    ]):
+        yield occurrence
+
+
+def _decorate(stream, position, counter):
+    """Generate the (start_date, position, index, occurrence) merge keys of a stream."""
+    for occurrence in stream:
+        yield _get(occurrence, 'start_date'), position, next(counter), occurrence
+
+
+def merge(*streams):
+    """
+    Merge iterables of occurrences sorted by start_date.
+
+    :param streams: iterables of occurrences, model instances or values()
+        dicts, the occurrences of the earlier iterables come first when
+        they start at the same time
+    :return: generator of occurrences sorted by start_date
+    """
+    counter = itertools.count()
+    decorated = [_decorate(stream, position, counter) for position, stream in enumerate(streams)]
+    for start_date, position, index, occurrence in heapq.merge(*decorated):
+        yield occurrence
@@ -0,0 +1,152 @@
+# -*- coding:utf8 -*-
+"""
+Wagtail events rendered rich text.
+
+Expanding the database representation of rich text resolves every internal
+page link with its own query. The rendered html of each body is cached by
+instance & content hash, and the bodies displayed on a page are rendered
+together, resolving all of their page links with a single query.
+
+Page urls change when any page is published, unpublished, moved or deleted,
+so every rendered body is invalidated then, see the signal handlers.
+"""
+
+from __future__ import unicode_literals
+
+import hashlib
+
+from django.conf import settings
+from django.utils.html import escape
+from wagtail.wagtailcore.models import Page
+from wagtail.wagtailcore.rich_text import FIND_A_TAG, expand_db_html, extract_attrs
+
+from wagtail_events.cache import get_cache, get_rich_text_version
+
+
+#: Instance attribute holding the rendered html of each rich text field.
+RENDERED_ATTR = '_rendered_rich_text'
+
+
+def get_page_ids(html):
+    """
+    Find the pages linked from rich text.
+
+    :param html: database representation of the rich text
+    :return: set of page ids
+    """
+    page_ids = set()
+    for match in FIND_A_TAG.finditer(html):
+        attrs = extract_attrs(match.group(1))
+        if attrs.get('linktype') == 'page' and attrs.get('id', '').isdigit():
+            page_ids.add(int(attrs['id']))
+    return page_ids
+
+
+def get_page_urls(page_ids):
+    """
+    Look up the urls of many pages with a single query for each page type.
+
+    :param page_ids: iterable of page ids
+    :return: dict of page ids to urls
+    """
+    page_ids = set(page_ids)
+    if not page_ids:
+        return {}
+    return dict((page.pk, page.url) for page in Page.objects.filter(pk__in=page_ids).specific())
+
+
+def expand_rich_text(html, page_urls):
+    """
+    Expand the database representation of rich text like wagtail's
+    expand_db_html, using page urls which have already been looked up.
+
+    :param html: database representation of the rich text
+    :param page_urls: dict of page ids to urls, see get_page_urls
+    :return: html string
+    """
+    def replace_page_link(match):
+        attrs = extract_attrs(match.group(1))
+        if attrs.get('linktype') != 'page':
+            return match.group(0)
+        url = page_urls.get(int(attrs['id'])) if attrs.get('id', '').isdigit() else None
+        if url is None:
+            # Links to missing & unroutable pages are kept as plain anchors.
+            return '<a>'
+        return '<a href="{}">'.format(escape(url))
+
+    # Other link types & embeds are left to their wagtail handlers.
+    return expand_db_html(FIND_A_TAG.sub(replace_page_link, html))
+
+
+def get_cache_key(instance, field_name, version):
+    """
+    Build the cache key of the rendered rich text of a model field.
+
+    :param instance: model instance
+    :param field_name: name of the rich text field
+    :param version: rich text version, see get_rich_text_version
+    :return: cache key string
+    """
+    html = getattr(instance, field_name) or ''
+    return ':'.join(['{}'.format(part) for part in (
+        'wagtail_events:rich_text',
+        instance._meta.label_lower,
+        instance.pk,
+        field_name,
+        version,
+        hashlib.md5(html.encode('utf-8')).hexdigest(),
+    )])
+
+
+def prime_rich_text(instances, field_name='body', timeout=None):
+    """
+    Render the rich text of many instances at once.
+
+    Bodies which aren't cached are rendered with a single query resolving all
+    of their page links, and the rendered html is kept on each instance for
+    the render_rich_text function.
+
+    :param instances: iterable of model instances
+    :param field_name: name of the rich text field
+    :param timeout: cache timeout in seconds
+    :return: the instances
+    """
+    instances = list(instances)
+    pending = [
+        instance for instance in instances
+        if field_name not in getattr(instance, RENDERED_ATTR, {})
+    ]
+    if not pending:
+        return instances
+
+    if timeout is None:
+        timeout = getattr(settings, 'WAGTAIL_EVENTS_RICH_TEXT_CACHE_TIMEOUT', 3600)
+    version = get_rich_text_version()
+    keys = [get_cache_key(instance, field_name, version) for instance in pending]
+    rendered = get_cache().get_many(set(keys))
+
+    missing = {}
+    for key, instance in zip(keys, pending):
+        if key not in rendered:
+            missing[key] = getattr(instance, field_name) or ''
+    if missing:
+        page_urls = get_page_urls(set().union(*[get_page_ids(html) for html in missing.values()]))
+        missing = dict((key, expand_rich_text(html, page_urls)) for key, html in missing.items())
+        get_cache().set_many(missing, timeout)
+        rendered.update(missing)
+
+    for key, instance in zip(keys, pending):
+        instance.__dict__.setdefault(RENDERED_ATTR, {})[field_name] = rendered[key]
+    return instances
+
+
+def render_rich_text(instance, field_name='body'):
+    """
+    Get the rendered html of a rich text field.
+
+    :param instance: model instance
+    :param field_name: name of the rich text field
+    :return: html string
+    """
+    prime_rich_text([instance], field_name)
+    return getattr(instance, RENDERED_ATTR)[field_name]
@@ -0,0 +1,101 @@
+# -*- coding:utf8 -*-
+"""
+Wagtail events signal handlers.
+"""
+
+from __future__ import unicode_literals
+
+import threading
+from contextlib import contextmanager
+
+from django.db.models.signals import post_delete, post_save
+from wagtail.wagtailcore.models import Page
+from wagtail.wagtailcore.signals import page_published, page_unpublished
+
+from wagtail_events.cache import bump_index_version, bump_rich_text_version
+from wagtail_events.instrumentation import log_stage
+from wagtail_events.models import EventDetail, EventOccurrence
+from wagtail_events.signals import stage_finished
+
+_state = threading.local()
+
+
+@contextmanager
+def occurrence_invalidation_suspended():
+    """
+    Skip the invalidation of the EventIndex of each EventOccurrence saved or
+    deleted, for bulk changes which invalidate each EventIndex once when
+    they're done.
+    """
+    previous = getattr(_state, 'suspended', False)
+    _state.suspended = True
+    try:
+        yield
+    finally:
+        _state.suspended = previous
+
+
+def invalidate_event_detail(event_detail):
+    """
+    Invalidate the cached data of the EventIndex the EventDetail belongs to.
+
+    :param event_detail: EventDetail instance
+    """
+    parent = event_detail.get_parent()
+    if parent is not None:
+        bump_index_version(parent.pk)
+
+
+def event_detail_changed(sender, instance, **kwargs):
+    """Handler for EventDetail publish, unpublish & save signals."""
+    # The occurrences may have been listed by another EventIndex before a move.
+    for index_id in instance.sync_occurrence_visibility():
+        bump_index_version(index_id)
+    invalidate_event_detail(instance)
+
+
+def event_detail_deleted(sender, instance, **kwargs):
+    """Handler for EventDetail delete signals."""
+    invalidate_event_detail(instance)
+
+
+def page_saved(sender, instance, **kwargs):
+    """
+    Handler for Page save signals, which are sent with the generic Page
+    model when a page is moved.
+    """
+    specific_class = instance.specific_class
+    if specific_class is not None and issubclass(specific_class, EventDetail):
+        event_detail_changed(specific_class, instance.specific)
+
+
+def page_urls_changed(sender, instance, **kwargs):
+    """
+    Handler for page publish, unpublish, save & delete signals, which may
+    change the urls of the pages linked from rendered rich text.
+    """
+    if isinstance(instance, Page):
+        bump_rich_text_version()
+
+
+def event_occurrence_changed(sender, instance, **kwargs):
+    """Handler for EventOccurrence save & delete signals."""
+    if getattr(_state, 'suspended', False):
+        return
+    # The occurrence holds the id of its EventIndex, so the page tree isn't queried for each row.
+    if instance.index_page_id is not None:
+        bump_index_version(instance.index_page_id)
+
+
+def register_signal_handlers():
+    """Connect the wagtail_events signal handlers."""
+    for signal in (page_published, page_unpublished, post_save):
+        signal.connect(event_detail_changed, sender=EventDetail)
+    post_delete.connect(event_detail_deleted, sender=EventDetail)
+    post_save.connect(page_saved, sender=Page)
+    for signal in (page_published, page_unpublished, post_delete):
+        signal.connect(page_urls_changed)
+    post_save.connect(page_urls_changed, sender=Page)
+    for signal in (post_save, post_delete):
+        signal.connect(event_occurrence_changed, sender=EventOccurrence)
+    stage_finished.connect(log_stage)
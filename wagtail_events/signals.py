@@ -0,0 +1,13 @@
+# -*- coding:utf8 -*-
+"""
+Wagtail events signals.
+"""
+
+from __future__ import unicode_literals
+
+from django.dispatch import Signal
+
+
+#: Sent when an instrumented stage of agenda rendering finishes, see
+#: wagtail_events.instrumentation.
+stage_finished = Signal(providing_args=['stage', 'scope', 'duration', 'queries', 'rows'])
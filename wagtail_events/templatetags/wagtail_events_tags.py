@@ -8,11 +8,34 @@ except ImportError:
     from urllib import urlencode
 
 from django import template
+from django.conf import settings
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+
+from wagtail_events import date_filters
+from wagtail_events.cache import get_all_indexes_version, get_cache, get_index_version
+from wagtail_events.models import EventOccurrence
+from wagtail_events.navigation import AgendaNavigation
+from wagtail_events.rich_text import render_rich_text
+from wagtail_events.utils import prime_occurrence_urls
 
 
 register = template.Library()
 
 
+def _get_navigation(context):
+    """
+    Get the navigation of the agenda being rendered, if any.
+
+    :param context: template context
+    :return: AgendaNavigation instance or None
+    """
+    navigation = context.get('navigation')
+    if isinstance(navigation, AgendaNavigation):
+        return navigation
+    return None
+
+
 @register.simple_tag(takes_context=True)
 def querystring(context, *args, **kwargs):
     """
@@ -21,6 +44,10 @@ def querystring(context, *args, **kwargs):
     :param context: template context
     :return: string|encoded params as urlstring
     """
+    navigation = _get_navigation(context)
+    if navigation is not None:
+        return navigation.querystring(args, **kwargs)
+
     try:
         params = context['request'].GET.dict()
     except (KeyError, AttributeError):
@@ -56,6 +83,9 @@ def patch_scope(context, scope):
     :param scope:
     :return:
     """
+    navigation = _get_navigation(context)
+    if navigation is not None:
+        return navigation.scope_url(scope)
     return _patch(context, 'scope', scope)
 
 
@@ -65,7 +95,91 @@ def patch_start_date(context, date):
     Prepare `start_date` url for agenda
 
     :param context: template context dict
-    :param date: start_date
+    :param date: start_date, e.g. an agenda next_nonempty_date
     :return:
     """
+    navigation = _get_navigation(context)
+    if navigation is not None:
+        return navigation.date_url(date)
+
+    if not date:
+        # There is no non-empty period to link to.
+        return ''
     return _patch(context, 'start_date', date.strftime('%Y.%m.%d'))
+
+
+@register.filter
+def cached_richtext(instance, field_name='body'):
+    """
+    Render a rich text field like wagtail's richtext filter, using the
+    rendered rich text cache.
+
+    :param instance: model instance, e.g. an EventOccurrence
+    :param field_name: name of the rich text field
+    :return: html string
+    """
+    if not instance:
+        return ''
+    return mark_safe('<div class="rich-text">{}</div>'.format(render_rich_text(instance, field_name)))
+
+
+def _get_upcoming_occurrences(request, index):
+    """
+    Get the occurrences the upcoming events are read from.
+
+    :param request: django request, or None
+    :param index: EventIndex instance, or None for every EventIndex of the
+        current site
+    :return: EventOccurrence queryset
+    """
+    if index is not None:
+        return index.get_occurrences(request)
+    occurrences = EventOccurrence.objects.filter(index_page__isnull=False, live=True, show_in_menus=True)
+    site = getattr(request, 'site', None)
+    if site is not None:
+        occurrences = occurrences.filter(index_page__path__startswith=site.root_page.path)
+    return occurrences
+
+
+@register.simple_tag(takes_context=True)
+def upcoming_events(context, index=None, count=5):
+    """
+    Get the next occurrences of an EventIndex, or of every EventIndex of the
+    current site. When the agenda cache is enabled, they're cached until the
+    occurrences change or the first of them starts.
+
+        {% upcoming_events page 5 as occurrences %}
+
+    :param context: template context
+    :param index: EventIndex instance, or None
+    :param count: number of occurrences, e.g. a string from a template variable
+    :return: list of EventOccurrence instances
+    """
+    count = int(count)
+    request = context.get('request')
+    now = timezone.now()
+
+    def get_items():
+        items = date_filters.get_upcoming(EventOccurrence, _get_upcoming_occurrences(request, index), count, now)
+        return prime_occurrence_urls(items)
+
+    if not getattr(settings, 'WAGTAIL_EVENTS_AGENDA_CACHE', False) or getattr(request, 'is_preview', False):
+        return get_items()
+
+    if index is not None:
+        parts = ('index', index.pk, get_index_version(index.pk))
+    else:
+        site = getattr(request, 'site', None)
+        parts = ('site', site.pk if site is not None else None, get_all_indexes_version())
+    key = ':'.join('{}'.format(part) for part in ('wagtail_events:upcoming',) + parts + (count,))
+
+    items = get_cache().get(key)
+    if items is not None:
+        current = [item for item in items if item.start_date >= now]
+        # Fewer occurrences than requested were cached when there weren't any more.
+        if len(current) == len(items) or len(items) < count:
+            return current
+
+    items = get_items()
+    get_cache().set(key, items, getattr(settings, 'WAGTAIL_EVENTS_AGENDA_CACHE_TIMEOUT', 300))
+    return items
@@ -8,12 +8,29 @@ from __future__ import unicode_literals
 import calendar
 import datetime
 
+try:
+    from urllib.parse import urlencode
+except ImportError:
+    from urllib import urlencode
+
+from django.conf import settings
 from django.utils import timezone
+from django.views.decorators.http import condition
 
 
 _DATE_FORMAT_RE = '^([0-9]){4}\.([0-9]){2}\.([0-9]){2}$'
 
 
+def occurrences_detached():
+    """
+    Check if occurrences are stored outside of the EventDetail revisions, and
+    edited in their own admin listing rather than inline.
+
+    :return: bool
+    """
+    return getattr(settings, 'WAGTAIL_EVENTS_DETACHED_OCCURRENCES', False)
+
+
 def date_to_datetime(date, time_choice='min'):
     """
     Convert date to datetime.
@@ -29,6 +46,31 @@ def date_to_datetime(date, time_choice='min'):
     )
 
 
+#: Occurrences lasting longer than 2 ** (MAX_DURATION_BUCKET - 1) days share
+#: the last duration bucket.
+MAX_DURATION_BUCKET = 11
+
+
+def get_duration_bucket(start_date, end_date):
+    """
+    Get the duration bucket of an occurrence: the occurrences of bucket n,
+    below MAX_DURATION_BUCKET, last no longer than 2 ** n days, so the
+    occurrences overlapping a date range can be found with a bounded range
+    of start dates for each bucket.
+
+    :param start_date: datetime the occurrence starts
+    :param end_date: datetime the occurrence ends, or None
+    :return: int
+    """
+    if not end_date or end_date <= start_date:
+        return 0
+    days = (end_date - start_date).total_seconds() / 86400
+    bucket = 0
+    while bucket < MAX_DURATION_BUCKET and days > 2 ** bucket:
+        bucket += 1
+    return bucket
+
+
 def add_months(date, months):
     """
     Add months to the date.
@@ -57,3 +99,58 @@ def remove_months(date, months):
     month = month % 12 + 1
     day = min(date.day, calendar.monthrange(year, month)[1])
     return datetime.date(year, month, day)
+
+
+def prime_occurrence_urls(occurrences):
+    """
+    Resolve the urls of many occurrences at once.
+
+    The url of each EventDetail is only looked up once, rather than once
+    for every occurrence rendered.
+
+    :param occurrences: iterable of EventOccurrence instances
+    :return: the occurrences
+    """
+    event_urls = {}
+    for occurrence in occurrences:
+        if occurrence.event_id not in event_urls:
+            event_urls[occurrence.event_id] = occurrence.event.url
+        occurrence._url = occurrence.get_url(event_urls[occurrence.event_id])
+    return occurrences
+
+
+def conditional_response(request, view, etag, last_modified, *args, **kwargs):
+    """
+    Call the view unless the client already has the current version.
+
+    :param request: HttpRequest instance
+    :param view: view callable, only called when the response has changed
+    :param etag: ETag of the current version
+    :param last_modified: datetime the resource last changed, or None
+    :return: HttpResponse, 304 Not Modified when the client's copy is current
+    """
+    return condition(
+        etag_func=lambda *a, **kw: etag,
+        last_modified_func=lambda *a, **kw: last_modified,
+    )(view)(request, *args, **kwargs)
+
+
+def get_page_querystring(request, page_kwarg, page, direction):
+    """
+    Build the querystring linking to the next or previous page.
+
+    :param request: HttpRequest instance
+    :param page_kwarg: querystring name of the page number or cursor
+    :param page: current django Page or CursorPage
+    :param direction: 'next' or 'previous'
+    :return: querystring starting with '?', or None when there is no such page
+    """
+    if not getattr(page, 'has_{}'.format(direction))():
+        return None
+    if hasattr(page, 'next_cursor'):
+        value = getattr(page, '{}_cursor'.format(direction))
+    else:
+        value = getattr(page, '{}_page_number'.format(direction))()
+    params = request.GET.dict()
+    params[page_kwarg] = value
+    return '?{}'.format(urlencode(params))
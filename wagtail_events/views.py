@@ -3,11 +3,61 @@
 
 from __future__ import unicode_literals
 
+import hashlib
+
 from django.views.generic import DetailView
 
+from wagtail_events import utils
+from wagtail_events.cache import get_index_version
 from wagtail_events.models import EventOccurrence
 
 
 class EventOccurrenceDetailView(DetailView):
     """EventOccurrence detail view."""
     model = EventOccurrence
+
+    def get_fingerprint(self):
+        """
+        Get values identifying the current version of the occurrence,
+        using a single query without reading its body.
+
+        The version of its EventIndex is included, as it's bumped by every
+        change of its occurrences, including the changes of their bodies.
+        No last modified date is returned, as the publication date of the
+        event goes backwards when it's unpublished & the occurrence can
+        change without a new publication, e.g. in a bulk change.
+
+        :return: tuple of ETag string, or None when the occurrence doesn't
+            exist, & None
+        """
+        names = [field.attname for field in self.model._meta.concrete_fields if field.name != 'body']
+        data = self.get_queryset().filter(pk=self.kwargs.get(self.pk_url_kwarg)).values(
+            'event__last_published_at',
+            'event__latest_revision_created_at',
+            *names
+        ).first()
+        if data is None:
+            return None, None
+
+        index_id = data['index_page_id']
+        fingerprint = ':'.join(['{}'.format(value) for value in [
+            get_index_version(index_id) if index_id is not None else None,
+            data['event__last_published_at'],
+            data['event__latest_revision_created_at'],
+        ] + [data[name] for name in names]])
+        return hashlib.md5(fingerprint.encode('utf-8')).hexdigest(), None
+
+    def get(self, request, *args, **kwargs):
+        """
+        Render the occurrence, answering conditional requests with a
+        304 Not Modified response when it hasn't changed.
+        """
+        etag, last_modified = self.get_fingerprint()
+        return utils.conditional_response(
+            request,
+            super(EventOccurrenceDetailView, self).get,
+            etag,
+            last_modified,
+            *args,
+            **kwargs
+        )
@@ -0,0 +1,53 @@
+# -*- coding:utf8 -*-
+"""
+Wagtail events admin hooks.
+
+When occurrences are detached from the EventDetail revisions, they're edited
+in their own paginated & searchable admin listing, which requires
+wagtail.contrib.modeladmin to be installed, and the occurrences of an
+EventDetail can be moved, copied or deleted together from the "Reschedule
+dates" button of the page listing.
+"""
+
+from __future__ import unicode_literals
+
+from django.conf.urls import url
+from django.core.urlresolvers import reverse
+from wagtail.wagtailadmin.widgets import Button
+from wagtail.wagtailcore import hooks
+
+from wagtail_events.admin import reschedule_view
+from wagtail_events.models import EventDetail
+from wagtail_events.utils import occurrences_detached
+
+
+@hooks.register('register_admin_urls')
+def register_admin_urls():
+    """Add the occurrence rescheduling view to the admin."""
+    return [
+        url(r'^wagtail_events/reschedule/(?P<page_id>\d+)/$', reschedule_view, name='wagtail_events_reschedule'),
+    ]
+
+
+@hooks.register('register_page_listing_more_buttons')
+def page_listing_more_buttons(page, page_perms, is_parent=False):
+    """Link to the occurrence rescheduling view from EventDetail pages."""
+    if not occurrences_detached():
+        return
+    specific_class = page.specific_class
+    if specific_class is not None and issubclass(specific_class, EventDetail) and page_perms.can_publish():
+        yield Button(
+            'Reschedule dates',
+            reverse('wagtail_events_reschedule', args=[page.pk]),
+            attrs={'title': 'Move, copy or delete the dates of "{}"'.format(page.title)},
+            priority=60,
+        )
+
+
+# WagtailEventsAppConfig checks wagtail.contrib.modeladmin is installed.
+if occurrences_detached():
+    from wagtail.contrib.modeladmin.options import modeladmin_register
+
+    from wagtail_events.admin import EventOccurrenceAdmin
+
+    modeladmin_register(EventOccurrenceAdmin)